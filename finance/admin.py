@@ -1,5 +1,14 @@
+from datetime import timedelta
+
 from django.contrib import admin
-from .models import Category, Account, Transaction, Budget, Savings, UserProfile, BankConnection, BankTransaction
+from django.utils import timezone
+from .models import (
+    Category, Account, Transaction, Budget, Savings, UserProfile, BankConnection, BankTransaction,
+    BankSyncCursor, BTPayBucket, MerchantSketch, SyncJob, SyncRun, MonthlyCategoryTotal, AccountBalanceSnapshot, AccountDailyFlow, UserTotals,
+)
+from .bt_pay_buckets import rebuild_buckets
+from .http_cache import bump_data_version
+from .sync_runs import mark_stale_runs, run_stats
 
 
 @admin.register(UserProfile)
@@ -42,6 +51,53 @@ class BudgetAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(MonthlyCategoryTotal)
+class MonthlyCategoryTotalAdmin(admin.ModelAdmin):
+    list_display = ['month', 'category', 'type', 'total', 'count', 'user']
+    list_filter = ['type', 'month']
+    search_fields = ['user__username', 'category__name']
+    readonly_fields = ['user', 'category', 'type', 'month', 'total', 'count']
+
+
+@admin.register(BTPayBucket)
+class BTPayBucketAdmin(admin.ModelAdmin):
+    list_display = ['bucket_start', 'granularity', 'category', 'sync_status', 'total', 'count', 'user']
+    list_filter = ['granularity', 'sync_status', 'category']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'granularity', 'bucket_start', 'category', 'sync_status', 'total', 'count']
+
+
+@admin.register(MerchantSketch)
+class MerchantSketchAdmin(admin.ModelAdmin):
+    list_display = ['user', 'capacity', 'total_cents', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'total_cents', 'counters', 'updated_at']
+
+
+@admin.register(AccountBalanceSnapshot)
+class AccountBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['date', 'account', 'balance', 'created_at']
+    list_filter = ['date']
+    search_fields = ['account__name', 'account__user__username']
+    readonly_fields = ['account', 'date', 'balance', 'created_at']
+
+
+@admin.register(AccountDailyFlow)
+class AccountDailyFlowAdmin(admin.ModelAdmin):
+    list_display = ['date', 'account', 'net', 'count']
+    list_filter = ['date']
+    search_fields = ['account__name', 'account__user__username']
+    readonly_fields = ['account', 'date', 'net', 'count']
+
+
+@admin.register(UserTotals)
+class UserTotalsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'currency', 'income', 'expense', 'count', 'updated_at']
+    list_filter = ['currency']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'currency', 'income', 'expense', 'count', 'updated_at']
+
+
 @admin.register(Savings)
 class SavingsAdmin(admin.ModelAdmin):
     list_display = ['name', 'target_amount', 'current_amount', 'deadline', 'user']
@@ -52,7 +108,7 @@ class SavingsAdmin(admin.ModelAdmin):
 
 @admin.register(BankConnection)
 class BankConnectionAdmin(admin.ModelAdmin):
-    list_display = ['user', 'bank', 'account_name', 'is_active', 'api_last_sync', 'created_at']
+    list_display = ['user', 'bank', 'account_name', 'is_active', 'api_last_sync', 'next_sync_at', 'created_at']
     list_filter = ['bank', 'is_active', 'created_at']
     search_fields = ['user__username', 'account_name', 'account_number']
     readonly_fields = ['api_user_id', 'api_last_sync', 'created_at', 'updated_at']
@@ -67,6 +123,9 @@ class BankConnectionAdmin(admin.ModelAdmin):
         ('Status', {
             'fields': ('is_active', 'api_user_id', 'api_last_sync')
         }),
+        ('Planificare', {
+            'fields': ('sync_interval', 'next_sync_at'),
+        }),
         ('Timestampuri', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',),
@@ -74,12 +133,62 @@ class BankConnectionAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(BankSyncCursor)
+class BankSyncCursorAdmin(admin.ModelAdmin):
+    list_display = ['bank_connection', 'remote_account_id', 'last_booking_date', 'last_external_id', 'updated_at']
+    list_filter = ['bank_connection__bank']
+    search_fields = ['bank_connection__user__username', 'remote_account_id']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/finance/syncrun/change_list.html'
+    list_display = [
+        'bank_connection', 'status', 'full', 'started_at', 'duration', 'pages_fetched',
+        'rows_inserted', 'rows_skipped', 'http_seconds', 'db_seconds',
+    ]
+    list_filter = ['status', 'bank_connection__bank', 'full', 'started_at']
+    search_fields = ['bank_connection__user__username', 'bank_connection__account_name', 'error']
+    list_select_related = ['bank_connection__user']
+    date_hierarchy = 'started_at'
+    readonly_fields = [
+        'bank_connection', 'status', 'full', 'resumed_from', 'started_at', 'finished_at',
+        'pages_fetched', 'rows_inserted', 'rows_skipped', 'http_seconds', 'db_seconds', 'error',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        # Percentilele de latență pe ultimele 7 zile, per bancă
+        mark_stale_runs()
+        stats = run_stats(SyncRun.objects.filter(started_at__gte=timezone.now() - timedelta(days=7)))
+        extra_context = {
+            **(extra_context or {}),
+            'latency_stats': [('Toate', stats['overall'])] + list(stats['by_bank'].items()),
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(SyncJob)
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = ['user', 'kind', 'bank_connection', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['user__username', 'error']
+    list_select_related = ['user', 'bank_connection']
+    readonly_fields = ['worker', 'attempts', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+
 @admin.register(BankTransaction)
 class BankTransactionAdmin(admin.ModelAdmin):
     list_display = ['external_id', 'user', 'bank_connection', 'amount', 'currency', 'date', 'sync_status']
-    list_filter = ['bank_connection__bank', 'sync_status', 'currency', 'date']
-    search_fields = ['user__username', 'external_id', 'description', 'recipient_name']
-    readonly_fields = ['external_id', 'created_at', 'updated_at']
+    list_filter = ['bank_connection__bank', 'sync_status', 'is_bt_pay', 'category_guess', 'currency', 'date']
+    search_fields = ['user__username', 'external_id', 'description', 'recipient_name', 'merchant_normalized']
+    readonly_fields = [
+        'external_id', 'is_bt_pay', 'merchant_normalized', 'category_guess', 'classification_version',
+        'created_at', 'updated_at',
+    ]
     fieldsets = (
         ('Informații Tranzacție', {
             'fields': ('user', 'bank_connection', 'external_id', 'date')
@@ -94,6 +203,10 @@ class BankTransactionAdmin(admin.ModelAdmin):
         ('Sincronizare', {
             'fields': ('sync_status', 'synced_to_transaction')
         }),
+        ('Clasificare BT Pay', {
+            'fields': ('is_bt_pay', 'merchant_normalized', 'category_guess', 'classification_version'),
+            'classes': ('collapse',),
+        }),
         ('Timestampuri', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',),
@@ -101,14 +214,22 @@ class BankTransactionAdmin(admin.ModelAdmin):
     )
     actions = ['mark_as_pending', 'mark_as_synced', 'mark_as_ignored']
 
+    def _set_sync_status(self, queryset, sync_status):
+        """update() nu trimite semnale, deci refacem rollup-ul BT Pay și ETag-ul manual"""
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        queryset.update(sync_status=sync_status)
+        for user_id in user_ids:
+            rebuild_buckets(user_id)
+            bump_data_version(user_id)
+
     def mark_as_pending(self, request, queryset):
-        queryset.update(sync_status='pending')
+        self._set_sync_status(queryset, 'pending')
     mark_as_pending.short_description = "Marchează ca pending"
 
     def mark_as_synced(self, request, queryset):
-        queryset.update(sync_status='synced')
+        self._set_sync_status(queryset, 'synced')
     mark_as_synced.short_description = "Marchează ca sincronizat"
 
     def mark_as_ignored(self, request, queryset):
-        queryset.update(sync_status='ignored')
+        self._set_sync_status(queryset, 'ignored')
     mark_as_ignored.short_description = "Marchează ca ignorat"
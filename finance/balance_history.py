@@ -0,0 +1,191 @@
+"""
+Istoricul soldurilor pe zile (per cont și patrimoniu net per utilizator)
+Stocat compact ca variație netă pe zi (AccountDailyFlow), extins incremental din
+semnalele Transaction; seria se reconstruiește înapoi de la soldul curent
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .ledger import SIGNED_AMOUNT
+from .models import AccountDailyFlow, Transaction
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = ('day', 'week', 'month')
+
+# Numărul maxim de puncte returnate înainte de a trece la un interval mai mare
+MAX_DAILY_POINTS = 120
+MAX_WEEKLY_POINTS = 160
+
+
+def apply_flow_delta(account_id, day, amount, count):
+    """Adaugă (sau scade) o sumă în variația zilnică a contului, atomic"""
+    rows = AccountDailyFlow.objects.filter(account_id=account_id, date=day)
+    updated = rows.update(net=F('net') + amount, count=F('count') + count)
+
+    if not updated:
+        # Nu creăm rânduri pentru ștergeri (ex: contul e șters în cascadă)
+        if count <= 0:
+            return
+        try:
+            with db_transaction.atomic():
+                AccountDailyFlow.objects.create(account_id=account_id, date=day, net=amount, count=count)
+        except IntegrityError:
+            # Creat concurent de altă cerere - aplicăm peste rândul existent
+            rows.update(net=F('net') + amount, count=F('count') + count)
+    elif count < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def apply_flow_change(previous, current):
+    """
+    Actualizează variațiile zilnice pentru o tranzacție creată, editată sau ștearsă
+
+    Args:
+        previous: ledger_entry dinainte de salvare (None la creare)
+        current: ledger_entry curent (None la ștergere)
+    """
+    if previous == current:
+        return
+    if previous:
+        account_id, day, amount = previous
+        apply_flow_delta(account_id, day, -amount, -1)
+    if current:
+        account_id, day, amount = current
+        apply_flow_delta(account_id, day, amount, 1)
+
+
+def rebuild_daily_flows(user=None):
+    """Reconstruiește variațiile zilnice de la zero din tabela de tranzacții"""
+    transactions = Transaction.objects.all()
+    flows = AccountDailyFlow.objects.all()
+    if user is not None:
+        transactions = transactions.filter(account__user=user)
+        flows = flows.filter(account__user=user)
+
+    grouped = transactions.values('account_id', 'date').annotate(
+        net=Sum(SIGNED_AMOUNT),
+        count=Count('id'),
+    ).order_by()
+
+    with db_transaction.atomic():
+        flows.delete()
+        created = AccountDailyFlow.objects.bulk_create(
+            (AccountDailyFlow(**row) for row in grouped.iterator()),
+            batch_size=1000,
+        )
+
+    logger.info(f"Rebuilt {len(created)} account daily flows")
+    return len(created)
+
+
+def pick_interval(start, end):
+    """Intervalul de eșantionare potrivit pentru lungimea perioadei"""
+    days = (end - start).days + 1
+    if days <= MAX_DAILY_POINTS:
+        return 'day'
+    if days <= MAX_WEEKLY_POINTS * 7:
+        return 'week'
+    return 'month'
+
+
+def _bucket(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _series(balance, nets, start, end, interval):
+    """
+    Parcurge zilele de la end la start scăzând variațiile din soldul de la end
+
+    Păstrează soldul de la sfârșitul fiecărui interval (ultima zi din bucket).
+    """
+    points = []
+    last_bucket = None
+    day = end
+    while day >= start:
+        bucket = _bucket(day, interval)
+        if bucket != last_bucket:
+            points.append((day, balance))
+            last_bucket = bucket
+        balance -= nets.get(day, 0)
+        day -= timedelta(days=1)
+    points.reverse()
+    return points
+
+
+def _flows_after(accounts, start):
+    """Variațiile zilnice de după start, într-o singură citire pe index (account, date)"""
+    return AccountDailyFlow.objects.filter(
+        account__in=accounts, date__gt=start,
+    ).values_list('account_id', 'date', 'net')
+
+
+def _end_balances(balances, flows, end):
+    """Soldul fiecărui cont la sfârșitul zilei end și variațiile până la end"""
+    nets = defaultdict(dict)
+    end_balances = dict(balances)
+    for account_id, day, net in flows:
+        if day > end:
+            end_balances[account_id] -= net
+        else:
+            nets[account_id][day] = net
+    return end_balances, nets
+
+
+def balance_history(account, start=None, end=None, interval=None):
+    """
+    Seria soldului unui cont între start și end (inclusiv)
+
+    Returns:
+        tuple: (interval, [(date, balance), ...])
+    """
+    end = end or timezone.now().date()
+    start = start or end - timedelta(days=365)
+    interval = interval or pick_interval(start, end)
+
+    account.refresh_from_db(fields=['balance'])
+    end_balances, nets = _end_balances(
+        {account.pk: account.balance}, _flows_after([account.pk], start), end,
+    )
+    return interval, _series(end_balances[account.pk], nets[account.pk], start, end, interval)
+
+
+def net_worth_history(user, start=None, end=None, interval=None):
+    """
+    Seria patrimoniului net al unui utilizator, separat pe monedă
+
+    Returns:
+        tuple: (interval, {currency: [(date, balance), ...]})
+    """
+    end = end or timezone.now().date()
+    start = start or end - timedelta(days=365)
+    interval = interval or pick_interval(start, end)
+
+    accounts = list(user.accounts.values_list('id', 'currency', 'balance'))
+    end_balances, nets = _end_balances(
+        {account_id: balance for account_id, _, balance in accounts},
+        _flows_after([account_id for account_id, _, _ in accounts], start),
+        end,
+    )
+
+    totals = defaultdict(lambda: Decimal('0'))
+    currency_nets = defaultdict(lambda: defaultdict(lambda: Decimal('0')))
+    for account_id, currency, _ in accounts:
+        totals[currency] += end_balances[account_id]
+        for day, net in nets[account_id].items():
+            currency_nets[currency][day] += net
+
+    return interval, {
+        currency: _series(total, currency_nets[currency], start, end, interval)
+        for currency, total in totals.items()
+    }
@@ -3,40 +3,313 @@ Servicii pentru integrarea API-urilor BT și Revolut
 """
 import requests
 import logging
+import time
 from decimal import Decimal
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.conf import settings
-from .models import BankConnection, BankTransaction, Transaction, Account
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from .models import BankConnection, BankSyncCursor, BankTransaction, Transaction, Account
+from . import circuit_breaker, http_client
+from . import bt_pay_buckets, merchant_sketch
+from .bt_pay_service import BTPay
+from .http_cache import bump_data_version
+from .sync_runs import finish_run, start_run
 import hashlib
 import hmac
 
 logger = logging.getLogger(__name__)
 
+# Zilele re-descărcate înaintea cursorului, pentru tranzacțiile înregistrate cu întârziere
+DEFAULT_OVERLAP_DAYS = 3
+# Tranzacții cerute per pagină (unde API-ul permite alegerea)
+DEFAULT_PAGE_SIZE = 500
+
+
+def sync_overlap():
+    """Suprapunerea sincronizării incrementale (BANK_SYNC['OVERLAP_DAYS'])"""
+    days = getattr(settings, 'BANK_SYNC', {}).get('OVERLAP_DAYS', DEFAULT_OVERLAP_DAYS)
+    return timedelta(days=days)
+
+
+def sync_page_size():
+    """Dimensiunea paginilor cerute de la API (BANK_SYNC['PAGE_SIZE'])"""
+    return getattr(settings, 'BANK_SYNC', {}).get('PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+
+def _aware(value):
+    """Datele fără fus orar din API sunt interpretate în fusul curent"""
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+class IngestResult:
+    """Câte tranzacții dintr-o pagină au fost inserate, sărite (duplicate) sau invalide"""
+    
+    def __init__(self, inserted=0, skipped=0, invalid=0, latest=None):
+        self.inserted = inserted
+        self.skipped = skipped
+        self.invalid = invalid
+        # (data, external_id) a celei mai recente tranzacții valide din pagină
+        self.latest = latest
+    
+    @property
+    def received(self):
+        return self.inserted + self.skipped + self.invalid
+    
+    def __add__(self, other):
+        latest = max(filter(None, (self.latest, other.latest)), default=None)
+        return IngestResult(
+            self.inserted + other.inserted,
+            self.skipped + other.skipped,
+            self.invalid + other.invalid,
+            latest,
+        )
+    
+    def as_dict(self):
+        return {'inserted': self.inserted, 'skipped': self.skipped, 'invalid': self.invalid}
+
 
 class BankAPIBase:
     """Clasa de bază pentru API-uri bancare"""
     
+    # Numele serviciului în http_client (sesiune, timeout-uri, reîncercări)
+    HTTP_SERVICE = 'default'
+    # Rânduri per INSERT la bulk_create
+    INGEST_BATCH_SIZE = 500
+    
     def __init__(self, bank_connection):
         self.bank_connection = bank_connection
         self.user = bank_connection.user
+        # Contoarele acestei instanțe, salvate în SyncRun la final
+        self.ingest_result = IngestResult()
+        self.pages_fetched = 0
+        self.http_seconds = 0.0
+        self.db_seconds = 0.0
+        self.sync_run = None
+        self._cursors = None
+        self._account_list = None
+    
+    def _get(self, url, **kwargs):
+        """
+        GET prin clientul HTTP comun, cu timpul adunat în http_seconds
+        
+        Cererea trece prin circuit breaker-ul și limitatorul de rată al băncii;
+        cât timp banca e indisponibilă eșuează imediat cu BankUnavailable.
+        """
+        started = time.monotonic()
+        try:
+            return circuit_breaker.call(self.HTTP_SERVICE, http_client.get, self.HTTP_SERVICE, url, **kwargs)
+        finally:
+            self.http_seconds += time.monotonic() - started
+    
+    def _fetch_accounts(self):
+        """Lista conturilor din API (date brute)"""
+        raise NotImplementedError
+    
+    def _accounts(self):
+        """
+        Lista conturilor, cerută o singură dată per instanță
+        
+        Sincronizarea tranzacțiilor și citirea soldului din aceeași rulare folosesc
+        aceeași listă, fără un al doilea apel la /accounts.
+        """
+        if self._account_list is None:
+            self._account_list = self._fetch_accounts()
+        return self._account_list
+    
+    def _remote_account_ids(self):
+        """ID-urile conturilor din API care se sincronizează"""
+        raise NotImplementedError
+    
+    def _remember_account(self, remote_account_id):
+        """Salvează contul principal pe conexiune, doar dacă s-a schimbat"""
+        if self.bank_connection.api_user_id != remote_account_id:
+            self.bank_connection.api_user_id = remote_account_id
+            self.bank_connection.save(update_fields=['api_user_id', 'updated_at'])
+    
+    def sync_transactions(self, days_back=30, full=False):
+        """
+        Sincronizează tranzacțiile noi de la ultima sincronizare
+        
+        Fără cursor (prima sincronizare) sau cu full=True se descarcă ultimele N zile.
+        Fiecare apel e înregistrat într-un SyncRun; erorile HTTP sunt salvate acolo
+        și sincronizarea întoarce 0.
+        """
+        self.sync_run = start_run(self.bank_connection, full)
+        error = None
+        try:
+            synced_count = 0
+            for remote_account_id in self._remote_account_ids():
+                synced_count += self.sync_account(remote_account_id, days_back, full)
+            
+            self.bank_connection.api_last_sync = timezone.now()
+            self.bank_connection.save(update_fields=['api_last_sync', 'updated_at'])
+            
+            return synced_count
+        
+        except requests.RequestException as e:
+            error = str(e)
+            logger.error(f"{self.bank_connection.get_bank_display()} sync error: {error}")
+            return 0
+        
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            raise
+        
+        finally:
+            finish_run(self.sync_run, self, error)
+    
+    def _cursor_map(self):
+        if self._cursors is None:
+            self._cursors = {
+                cursor.remote_account_id: cursor
+                for cursor in self.bank_connection.sync_cursors.all()
+            }
+        return self._cursors
     
-    def sync_transactions(self, days_back=30):
-        """Sincronizează tranzacțiile din ultimele N zile"""
+    def sync_since(self, remote_account_id, days_back=30, full=False):
+        """Momentul de la care se cer tranzacțiile unui cont"""
+        cursor = self._cursor_map().get(remote_account_id)
+        if full or cursor is None or cursor.last_booking_date is None:
+            return timezone.now() - timedelta(days=days_back)
+        return cursor.last_booking_date - sync_overlap()
+    
+    def sync_start(self, remote_account_id, days_back=30, full=False):
+        """(început, token de pagină) - continuă o parcurgere întreruptă, dacă există"""
+        cursor = self._cursor_map().get(remote_account_id)
+        if not full and cursor is not None and cursor.resume_token:
+            return cursor.resume_from, cursor.resume_token
+        return self.sync_since(remote_account_id, days_back, full), None
+    
+    def advance_cursor(self, remote_account_id, result, resume_from=None, resume_token=None):
+        """
+        Salvează progresul unui cont după o pagină
+        
+        Data ultimei tranzacții avansează doar înainte; cât timp mai sunt pagini,
+        resume_from și resume_token permit reluarea de la pagina următoare.
+        """
+        cursors = self._cursor_map()
+        cursor = cursors.get(remote_account_id)
+        if cursor is None:
+            if result.latest is None and not resume_token:
+                return
+            cursor, _ = BankSyncCursor.objects.get_or_create(
+                bank_connection=self.bank_connection, remote_account_id=remote_account_id,
+            )
+            cursors[remote_account_id] = cursor
+        if result.latest and (cursor.last_booking_date is None or cursor.last_booking_date < result.latest[0]):
+            cursor.last_booking_date, cursor.last_external_id = result.latest
+        cursor.resume_from = resume_from if resume_token else None
+        cursor.resume_token = resume_token or ''
+        cursor.save(update_fields=[
+            'last_booking_date', 'last_external_id', 'resume_from', 'resume_token', 'updated_at',
+        ])
+    
+    def _transaction_pages(self, remote_account_id, since, token=None):
+        """Generator de (pagină de tranzacții, token pentru pagina următoare sau None)"""
         raise NotImplementedError
     
+    def sync_account(self, remote_account_id, days_back=30, full=False):
+        """
+        Sincronizează un cont pagină cu pagină
+        
+        Fiecare pagină e scrisă și progresul salvat în aceeași tranzacție DB înainte
+        de a cere pagina următoare, deci memoria e limitată la o pagină, iar o
+        întrerupere reia parcurgerea de la ultima pagină salvată.
+        """
+        since, token = self.sync_start(remote_account_id, days_back, full)
+        inserted = 0
+        for transactions, next_token in self._transaction_pages(remote_account_id, since, token):
+            self.pages_fetched += 1
+            started = time.monotonic()
+            with db_transaction.atomic():
+                result = self.ingest_transactions(transactions)
+                self.advance_cursor(remote_account_id, result, since, next_token)
+            self.db_seconds += time.monotonic() - started
+            inserted += result.inserted
+        return inserted
+    
     def get_balance(self):
         """Obține soldul actual al contului"""
         raise NotImplementedError
     
-    def _create_transaction_record(self, transaction_data):
-        """Creează un înregistrare de tranzacție din datele API"""
+    def _build_transaction(self, transaction_data):
+        """Construiește (nesalvat) BankTransaction din datele API; None dacă datele sunt invalide"""
         raise NotImplementedError
+    
+    def ingest_transactions(self, transactions_data):
+        """
+        Salvează o pagină de tranzacții din API cu un singur bulk_create
+        
+        Duplicatele (deja salvate sau repetate în pagină) sunt sărite după external_id;
+        ignore_conflicts acoperă și inserările concurente ale aceleiași tranzacții.
+        bulk_create nu emite semnale, deci clasificarea BT Pay, rollup-ul BT Pay,
+        schița comercianților și versiunea datelor sunt actualizate explicit.
+        
+        Returns:
+            IngestResult
+        """
+        started = timezone.now()
+        result = IngestResult()
+        candidates = {}
+        
+        for transaction_data in transactions_data:
+            record = self._build_transaction(transaction_data)
+            if record is None:
+                result.invalid += 1
+            elif record.external_id in candidates:
+                result.skipped += 1
+            else:
+                candidates[record.external_id] = record
+                result.latest = max(filter(None, (result.latest, (record.date, record.external_id))))
+        
+        if candidates:
+            existing = set(
+                BankTransaction.objects.filter(
+                    external_id__in=list(candidates)
+                ).values_list('external_id', flat=True)
+            )
+            new_records = [record for external_id, record in candidates.items() if external_id not in existing]
+            result.skipped += len(existing)
+            
+            if new_records:
+                BTPay.classify_many(new_records)
+                BankTransaction.objects.bulk_create(
+                    new_records, batch_size=self.INGEST_BATCH_SIZE, ignore_conflicts=True
+                )
+                # Rândurile inserate între timp de altă sincronizare au fost ignorate
+                result.inserted = BankTransaction.objects.filter(
+                    external_id__in=[record.external_id for record in new_records],
+                    bank_connection=self.bank_connection,
+                    created_at__gte=started,
+                ).count()
+                result.skipped += len(new_records) - result.inserted
+                
+                if result.inserted < len(new_records):
+                    new_records = BankTransaction.objects.filter(
+                        external_id__in=[record.external_id for record in new_records],
+                        bank_connection=self.bank_connection,
+                        created_at__gte=started,
+                    )
+                bt_pay_buckets.add_transactions(new_records)
+                merchant_sketch.add_transactions(new_records)
+        
+        if result.inserted:
+            bump_data_version(self.user.pk)
+        
+        self.ingest_result = self.ingest_result + result
+        logger.info(
+            f"Ingested {result.received} transactions for connection {self.bank_connection.pk}: "
+            f"{result.inserted} inserted, {result.skipped} skipped, {result.invalid} invalid"
+        )
+        return result
 
 
 class RevolutBankService(BankAPIBase):
     """Serviciu pentru API Revolut"""
     
+    HTTP_SERVICE = 'revolut'
     BASE_URL = "https://api.revolut.com/1.0"
     
     def __init__(self, bank_connection):
@@ -47,118 +320,98 @@ class RevolutBankService(BankAPIBase):
         }
     
     def get_balance(self):
-        """Obține soldul curent din Revolut"""
+        """Obține soldul curent din Revolut (direct din lista conturilor)"""
         try:
-            response = requests.get(
-                f"{self.BASE_URL}/accounts",
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            
-            accounts = response.json().get('accounts', [])
-            
             balance_data = {}
-            for account in accounts:
+            for account in self._accounts():
                 if account.get('type') == 'CURRENT':
                     balance_data = {
                         'balance': Decimal(str(account.get('balance', 0))),
                         'currency': account.get('currency', 'RON'),
                         'id': account.get('id'),
                     }
-                    self.bank_connection.api_user_id = account.get('id')
-                    self.bank_connection.save()
             
+            if balance_data:
+                self._remember_account(balance_data['id'])
             return balance_data
             
         except requests.RequestException as e:
             logger.error(f"Revolut API error: {str(e)}")
             return None
     
-    def sync_transactions(self, days_back=30):
-        """Sincronizează tranzacțiile din Revolut"""
-        try:
-            # Obține lista conturilor
-            response = requests.get(
-                f"{self.BASE_URL}/accounts",
+    def _fetch_accounts(self):
+        response = self._get(f"{self.BASE_URL}/accounts", headers=self.headers)
+        response.raise_for_status()
+        return response.json().get('accounts', [])
+    
+    def _remote_account_ids(self):
+        """Conturile curente Revolut"""
+        return [account.get('id') for account in self._accounts() if account.get('type') == 'CURRENT']
+    
+    def _transaction_pages(self, remote_account_id, since, token=None):
+        """
+        Paginile Revolut, de la cele mai noi la cele mai vechi
+        
+        Pagina următoare se cere cu 'to' = data celei mai vechi tranzacții din pagina
+        curentă; tranzacțiile de la limită repetate sunt sărite la inserare.
+        """
+        page_size = sync_page_size()
+        while True:
+            params = {'from': since.isoformat(), 'count': page_size}
+            if token:
+                params['to'] = token
+            response = self._get(
+                f"{self.BASE_URL}/accounts/{remote_account_id}/transactions",
                 headers=self.headers,
-                timeout=10
+                params=params
             )
             response.raise_for_status()
             
-            accounts = response.json().get('accounts', [])
-            synced_count = 0
-            
-            for account in accounts:
-                if account.get('type') != 'CURRENT':
-                    continue
-                
-                account_id = account.get('id')
-                
-                # Obține tranzacțiile pentru account
-                from_date = (timezone.now() - timedelta(days=days_back)).isoformat()
-                
-                trans_response = requests.get(
-                    f"{self.BASE_URL}/accounts/{account_id}/transactions",
-                    headers=self.headers,
-                    params={'from': from_date},
-                    timeout=10
-                )
-                trans_response.raise_for_status()
-                
-                transactions = trans_response.json().get('transactions', [])
-                
-                for trans in transactions:
-                    synced = self._create_transaction_record(trans)
-                    if synced:
-                        synced_count += 1
-            
-            self.bank_connection.api_last_sync = timezone.now()
-            self.bank_connection.save()
-            
-            return synced_count
-            
-        except requests.RequestException as e:
-            logger.error(f"Revolut sync error: {str(e)}")
-            return 0
+            transactions = response.json().get('transactions', [])
+            next_token = None
+            if len(transactions) >= page_size:
+                oldest = min(t.get('created_at') or t.get('completed_at') or '' for t in transactions)
+                # Fără progres (ex: o pagină întreagă cu aceeași dată) ne oprim
+                next_token = oldest if oldest and oldest != token else None
+            
+            yield transactions, next_token
+            if next_token is None:
+                return
+            token = next_token
     
-    def _create_transaction_record(self, transaction_data):
-        """Creează înregistrare de tranzacție din datele Revolut"""
+    def _build_transaction(self, transaction_data):
+        """Construiește tranzacția din datele Revolut"""
         try:
             external_id = transaction_data.get('id')
+            if not external_id:
+                raise ValueError('missing id')
             
-            # Verifică duplicatele
-            if BankTransaction.objects.filter(external_id=external_id).exists():
-                return False
-            
-            amount = Decimal(str(transaction_data.get('amount', 0)))
-            
-            bank_trans = BankTransaction.objects.create(
+            return BankTransaction(
                 user=self.user,
                 bank_connection=self.bank_connection,
                 external_id=external_id,
-                amount=amount,
+                amount=Decimal(str(transaction_data.get('amount', 0))),
                 currency=transaction_data.get('currency', 'RON'),
                 description=transaction_data.get('description', ''),
-                date=datetime.fromisoformat(transaction_data.get('completed_at', timezone.now().isoformat())),
+                date=_aware(datetime.fromisoformat(transaction_data.get('completed_at', timezone.now().isoformat()))),
                 recipient_name=transaction_data.get('counterparty', {}).get('name', ''),
                 recipient_account=transaction_data.get('counterparty', {}).get('account_number', ''),
                 sync_status='pending'
             )
             
-            logger.info(f"Created bank transaction: {bank_trans}")
-            return True
-            
         except Exception as e:
-            logger.error(f"Error creating transaction record: {str(e)}")
-            return False
+            logger.error(f"Invalid Revolut transaction {transaction_data.get('id')}: {str(e)}")
+            return None
 
 
 class BTBankService(BankAPIBase):
     """Serviciu pentru API Banca Transilvania (Open Banking)"""
     
+    HTTP_SERVICE = 'bt'
     # BT folosește Open Banking API (PSD2)
     BASE_URL = "https://openapi.banca-transilvania.ro/v3"
+    # Cât ținem minte că /balances nu e disponibil pentru o conexiune (reîncercăm zilnic)
+    NO_BULK_BALANCES_TIMEOUT = 24 * 60 * 60
     
     def __init__(self, bank_connection):
         super().__init__(bank_connection)
@@ -177,130 +430,118 @@ class BTBankService(BankAPIBase):
     def get_balance(self):
         """Obține soldul curent din BT"""
         try:
-            # Obține lista de conturi
-            accounts_response = requests.get(
-                f"{self.BASE_URL}/accounts",
-                headers=self.headers,
-                timeout=10
-            )
-            accounts_response.raise_for_status()
-            
-            accounts = accounts_response.json().get('Data', {}).get('Account', [])
+            closing = {
+                balance.get('AccountId'): balance
+                for balance in self._balances()
+                if balance.get('Type') == 'Closing.Booked'
+            }
             
             balance_data = {}
-            for account in accounts:
-                account_id = account.get('AccountId')
-                
-                # Obține detaliile contului
-                balance_response = requests.get(
-                    f"{self.BASE_URL}/accounts/{account_id}/balances",
-                    headers=self.headers,
-                    timeout=10
-                )
-                balance_response.raise_for_status()
-                
-                balances = balance_response.json().get('Data', {}).get('Balance', [])
-                
-                for balance in balances:
-                    if balance.get('Type') == 'Closing.Booked':
-                        balance_data = {
-                            'balance': Decimal(str(balance.get('Amount', {}).get('Amount', 0))),
-                            'currency': balance.get('Amount', {}).get('Currency', 'RON'),
-                            'id': account_id,
-                        }
-                        self.bank_connection.api_user_id = account_id
-                        self.bank_connection.save()
-                        break
+            for account_id in self._remote_account_ids():
+                balance = closing.get(account_id)
+                if balance:
+                    balance_data = {
+                        'balance': Decimal(str(balance.get('Amount', {}).get('Amount', 0))),
+                        'currency': balance.get('Amount', {}).get('Currency', 'RON'),
+                        'id': account_id,
+                    }
             
+            if balance_data:
+                self._remember_account(balance_data['id'])
             return balance_data
             
         except requests.RequestException as e:
             logger.error(f"BT API error: {str(e)}")
             return None
     
-    def sync_transactions(self, days_back=30):
-        """Sincronizează tranzacțiile din BT"""
-        try:
-            # Obține lista conturilor
-            accounts_response = requests.get(
-                f"{self.BASE_URL}/accounts",
-                headers=self.headers,
-                timeout=10
-            )
-            accounts_response.raise_for_status()
-            
-            accounts = accounts_response.json().get('Data', {}).get('Account', [])
-            synced_count = 0
-            
-            from_date = (timezone.now() - timedelta(days=days_back)).date().isoformat()
-            to_date = timezone.now().date().isoformat()
-            
-            for account in accounts:
-                account_id = account.get('AccountId')
-                
-                # Obține tranzacțiile pentru account
-                trans_response = requests.get(
-                    f"{self.BASE_URL}/accounts/{account_id}/transactions-booked",
+    def _fetch_accounts(self):
+        response = self._get(f"{self.BASE_URL}/accounts", headers=self.headers)
+        response.raise_for_status()
+        return response.json().get('Data', {}).get('Account', [])
+    
+    def _remote_account_ids(self):
+        """Toate conturile BT ale conexiunii"""
+        return [account.get('AccountId') for account in self._accounts()]
+    
+    def _balances(self):
+        """
+        Soldurile tuturor conturilor dintr-o singură cerere (GET /balances)
+        
+        Dacă endpoint-ul agregat nu e disponibil, revine la o cerere per cont și
+        ține minte asta, ca sincronizările următoare să nu-l mai încerce.
+        """
+        no_bulk_key = f"finance:bt:no_bulk_balances:{self.bank_connection.pk}"
+        response = None
+        if not cache.get(no_bulk_key):
+            response = self._get(f"{self.BASE_URL}/balances", headers=self.headers)
+            if response.status_code in (404, 405, 501):
+                cache.set(no_bulk_key, True, self.NO_BULK_BALANCES_TIMEOUT)
+                response = None
+        if response is None:
+            balances = []
+            for account_id in self._remote_account_ids():
+                account_response = self._get(
+                    f"{self.BASE_URL}/accounts/{account_id}/balances",
+                    headers=self.headers
+                )
+                account_response.raise_for_status()
+                balances.extend(
+                    {'AccountId': account_id, **balance}
+                    for balance in account_response.json().get('Data', {}).get('Balance', [])
+                )
+            return balances
+        response.raise_for_status()
+        return response.json().get('Data', {}).get('Balance', [])
+    
+    def _transaction_pages(self, remote_account_id, since, token=None):
+        """Paginile BT: prima cu intervalul de date, următoarele din Links.Next"""
+        while True:
+            if token:
+                response = self._get(token, headers=self.headers)
+            else:
+                response = self._get(
+                    f"{self.BASE_URL}/accounts/{remote_account_id}/transactions-booked",
                     headers=self.headers,
                     params={
-                        'bookingDateFrom': from_date,
-                        'bookingDateTo': to_date,
-                    },
-                    timeout=10
+                        'bookingDateFrom': timezone.localdate(since).isoformat(),
+                        'bookingDateTo': timezone.localdate().isoformat(),
+                    }
                 )
-                trans_response.raise_for_status()
-                
-                transactions = trans_response.json().get('Data', {}).get('Transaction', [])
-                
-                for trans in transactions:
-                    synced = self._create_transaction_record(trans)
-                    if synced:
-                        synced_count += 1
-            
-            self.bank_connection.api_last_sync = timezone.now()
-            self.bank_connection.save()
-            
-            return synced_count
+            response.raise_for_status()
             
-        except requests.RequestException as e:
-            logger.error(f"BT sync error: {str(e)}")
-            return 0
+            payload = response.json()
+            next_token = payload.get('Links', {}).get('Next') or None
+            yield payload.get('Data', {}).get('Transaction', []), next_token
+            if next_token is None:
+                return
+            token = next_token
     
-    def _create_transaction_record(self, transaction_data):
-        """Creează înregistrare de tranzacție din datele BT"""
+    def _build_transaction(self, transaction_data):
+        """Construiește tranzacția din datele BT"""
         try:
             external_id = transaction_data.get('TransactionId')
-            
-            # Verifică duplicatele
-            if BankTransaction.objects.filter(external_id=external_id).exists():
-                return False
+            if not external_id:
+                raise ValueError('missing TransactionId')
             
             amount_data = transaction_data.get('Amount', {})
-            amount = Decimal(str(amount_data.get('Amount', 0)))
-            
-            # BT returnează detalii în Credit/DebitIndicator
             booking_date = transaction_data.get('BookingDate')
-            value_date = transaction_data.get('ValueDate')
             
-            bank_trans = BankTransaction.objects.create(
+            return BankTransaction(
                 user=self.user,
                 bank_connection=self.bank_connection,
                 external_id=external_id,
-                amount=amount,
+                amount=Decimal(str(amount_data.get('Amount', 0))),
                 currency=amount_data.get('Currency', 'RON'),
                 description=transaction_data.get('SupplementaryData', {}).get('description', ''),
-                date=datetime.fromisoformat(booking_date) if booking_date else timezone.now(),
+                date=_aware(datetime.fromisoformat(booking_date)) if booking_date else timezone.now(),
                 recipient_name=transaction_data.get('Counterparty', {}).get('Name', ''),
                 recipient_account=transaction_data.get('Counterparty', {}).get('Identification', ''),
                 sync_status='pending'
             )
             
-            logger.info(f"Created bank transaction: {bank_trans}")
-            return True
-            
         except Exception as e:
-            logger.error(f"Error creating transaction record: {str(e)}")
-            return False
+            logger.error(f"Invalid BT transaction {transaction_data.get('TransactionId')}: {str(e)}")
+            return None
 
 
 class BankServiceFactory:
@@ -320,27 +561,29 @@ class BankServiceFactory:
         return service_class(bank_connection)
 
 
-def sync_all_banks(user):
-    """Sincronizează toate conturile bancare ale unui utilizator"""
+def sync_all_banks(user, days_back=30):
+    """Sincronizează toate conturile bancare ale unui utilizator, în paralel"""
+    from .sync_engine import SyncEngine
+    
     connections = BankConnection.objects.filter(user=user, is_active=True)
-    total_synced = 0
+    report = SyncEngine(days_back=days_back, update_balances=False).run(connections)
     
-    for connection in connections:
-        try:
-            service = BankServiceFactory.get_service(connection)
-            synced = service.sync_transactions()
-            total_synced += synced
-            logger.info(f"Synced {synced} transactions from {connection.get_bank_display()}")
-        except Exception as e:
-            logger.error(f"Error syncing {connection.get_bank_display()}: {str(e)}")
+    for result in report.results:
+        if result.ok:
+            logger.info(f"Synced {result.synced} transactions from {result.bank_display}")
     
-    return total_synced
+    return report.total_synced
 
 
-def update_account_balance(bank_connection, account=None):
-    """Actualizează soldul unui cont din banca"""
+def update_account_balance(bank_connection, account=None, service=None):
+    """
+    Actualizează soldul unui cont din banca
+    
+    Cu service-ul care tocmai a sincronizat tranzacțiile, lista conturilor e
+    refolosită; contul e salvat doar dacă soldul sau moneda s-au schimbat.
+    """
     try:
-        service = BankServiceFactory.get_service(bank_connection)
+        service = service or BankServiceFactory.get_service(bank_connection)
         balance_data = service.get_balance()
         
         if not balance_data:
@@ -354,11 +597,17 @@ def update_account_balance(bank_connection, account=None):
                 defaults={
                     'type': 'checking',
                     'currency': balance_data.get('currency', 'RON'),
+                    'balance': balance_data.get('balance'),
                 }
             )
         
-        account.balance = balance_data.get('balance')
-        account.currency = balance_data.get('currency', 'RON')
+        balance = balance_data.get('balance')
+        currency = balance_data.get('currency', 'RON')
+        if account.balance == balance and account.currency == currency:
+            return True
+        
+        account.balance = balance
+        account.currency = currency
         account.save()
         
         logger.info(f"Updated balance for {account.name}: {account.balance} {account.currency}")
@@ -10,14 +10,17 @@ from django.db.models import Sum, Q, Count
 from django.utils import timezone
 from datetime import timedelta
 
-from .models import BankConnection, BankTransaction, Transaction, Account, Category
-from .forms import BankConnectionForm, BankTransactionSyncForm, BankTransactionReviewForm
+from .models import BankConnection, BankTransaction, Transaction, Account, Category, SyncJob, SyncRun
+from .forms import BankConnectionForm, BankTransactionSyncForm, BankTransactionReviewForm, SyncRunFilterForm
 from .bank_services import (
     BankServiceFactory, 
     sync_all_banks, 
     update_account_balance,
     auto_sync_pending_transactions
 )
+from .sync_jobs import enqueue_connect, enqueue_sync, job_as_dict
+from .sync_runs import mark_stale_runs, run_as_dict, run_stats
+from .http_cache import compact_json_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,42 +43,28 @@ def bank_connections_list(request):
 def bank_connection_create(request):
     """Creează o nouă conectare la bancă"""
     if request.method == 'POST':
-        form = BankConnectionForm(request.POST)
+        # O încercare anterioară neverificată (api_user_id gol) e refolosită,
+        # altfel ar bloca noua conexiune prin unique_together
+        pending = BankConnection.objects.filter(
+            user=request.user, bank=request.POST.get('bank'), api_user_id='', is_active=False,
+        ).first()
+        form = BankConnectionForm(request.POST, instance=pending)
         if form.is_valid():
             connection = form.save(commit=False)
             connection.user = request.user
             
             try:
-                # Testează conexiunea
-                service = BankServiceFactory.get_service(connection)
-                balance_data = service.get_balance()
+                # Conexiunea devine activă după ce worker-ul verifică token-ul și soldul
+                connection.is_active = False
+                connection.save()
+                enqueue_connect(connection)
                 
-                if balance_data:
-                    connection.save()
-                    
-                    # Actualizează soldul
-                    account, created = Account.objects.get_or_create(
-                        user=request.user,
-                        name=connection.account_name,
-                        defaults={
-                            'type': 'checking',
-                            'currency': balance_data.get('currency', 'RON'),
-                            'balance': balance_data.get('balance', 0),
-                        }
-                    )
-                    
-                    if not created:
-                        account.balance = balance_data.get('balance', 0)
-                        account.currency = balance_data.get('currency', 'RON')
-                        account.save()
-                    
-                    messages.success(
-                        request, 
-                        f"✓ Conectare la {connection.get_bank_display()} reușită! Sold: {balance_data.get('balance')} {balance_data.get('currency')}"
-                    )
-                    return redirect('bank_connections_list')
-                else:
-                    messages.error(request, "✗ Nu s-a putut conecta la bancă. Verifică token-ul.")
+                messages.info(
+                    request,
+                    f"Conexiunea la {connection.get_bank_display()} este verificată în fundal. "
+                    f"Vei primi o notificare când este gata."
+                )
+                return redirect('finance:bank_connections_list')
             except Exception as e:
                 logger.error(f"Error connecting to bank: {str(e)}")
                 messages.error(request, f"✗ Eroare de conexiune: {str(e)}")
@@ -99,7 +88,7 @@ def bank_connection_delete(request, pk):
         bank_name = connection.get_bank_display()
         connection.delete()
         messages.success(request, f"✓ Conectarea la {bank_name} a fost ștearsă.")
-        return redirect('bank_connections_list')
+        return redirect('finance:bank_connections_list')
     
     context = {
         'connection': connection,
@@ -121,38 +110,23 @@ def bank_sync_transactions(request, pk=None):
     if request.method == 'POST':
         form = BankTransactionSyncForm(request.POST)
         if form.is_valid():
-            days_back = form.cleaned_data['days_back']
-            auto_create = form.cleaned_data['auto_create_transactions']
-            
-            total_synced = 0
-            
-            for connection in connections:
-                try:
-                    service = BankServiceFactory.get_service(connection)
-                    synced = service.sync_transactions(days_back=days_back)
-                    total_synced += synced
-                    
-                    # Actualizează soldul
-                    update_account_balance(connection)
-                    
-                except Exception as e:
-                    logger.error(f"Sync error: {str(e)}")
-                    messages.error(request, f"Eroare sincronizare {connection.get_bank_display()}: {str(e)}")
-            
-            if total_synced > 0:
-                messages.success(request, f"✓ Sincronizate {total_synced} tranzacții!")
-            else:
-                messages.info(request, "Nicio tranzacție nouă.")
-            
-            if auto_create:
-                auto_synced = auto_sync_pending_transactions(request.user)
-                if auto_synced > 0:
-                    messages.success(request, f"✓ Creată {auto_synced} tranzacție(i) automat!")
+            # Sincronizarea (tranzacții + sold) rulează în run_sync_worker
+            job = enqueue_sync(
+                request.user,
+                connection=connections[0] if pk else None,
+                days_back=form.cleaned_data['days_back'],
+                full=form.cleaned_data['full_resync'],
+                auto_create=form.cleaned_data['auto_create_transactions'],
+            )
+            messages.info(
+                request,
+                f"Sincronizarea #{job.pk} a pornit în fundal. Vei primi o notificare cu rezultatul."
+            )
             
             if pk:
-                return redirect('bank_transaction_pending', pk=pk)
+                return redirect('finance:bank_transaction_pending', pk=pk)
             else:
-                return redirect('bank_transactions_pending')
+                return redirect('finance:bank_transactions_pending')
     else:
         form = BankTransactionSyncForm()
     
@@ -165,6 +139,38 @@ def bank_sync_transactions(request, pk=None):
     return render(request, 'finance/bank_sync_form.html', context)
 
 
+@login_required
+def bank_sync_runs(request):
+    """Rulările recente de sincronizare ale utilizatorului, cu percentile de latență"""
+    form = SyncRunFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    days = form.cleaned_data['days'] or 7
+    limit = form.cleaned_data['limit'] or 50
+    
+    mark_stale_runs(user=request.user)
+    runs = SyncRun.objects.filter(
+        bank_connection__user=request.user,
+        started_at__gte=timezone.now() - timedelta(days=days),
+    )
+    if form.cleaned_data['connection']:
+        runs = runs.filter(bank_connection_id=form.cleaned_data['connection'])
+    
+    return compact_json_response({
+        'success': True,
+        'days': days,
+        'stats': run_stats(runs),
+        'runs': [run_as_dict(run) for run in runs.select_related('bank_connection')[:limit]],
+    })
+
+
+@login_required
+def bank_sync_job_status(request, job_pk):
+    """Starea unui job de sincronizare (alternativă la notificările WebSocket)"""
+    job = get_object_or_404(SyncJob, pk=job_pk, user=request.user)
+    return JsonResponse({'success': True, 'job': job_as_dict(job)})
+
+
 @login_required
 def bank_transactions_pending(request, pk=None):
     """Afișează tranzacțiile în așteptare pentru revizuire"""
@@ -222,7 +228,7 @@ def bank_transaction_accept(request, trans_pk):
         
         if not account:
             messages.error(request, "Niciun cont cu această monedă. Creaează un cont mai întâi.")
-            return redirect('bank_transactions_pending')
+            return redirect('finance:bank_transactions_pending')
         
         # Creează tranzacția
         transaction = Transaction.objects.create(
@@ -245,7 +251,7 @@ def bank_transaction_accept(request, trans_pk):
         logger.error(f"Error accepting transaction: {str(e)}")
         messages.error(request, f"Eroare: {str(e)}")
     
-    return redirect('bank_transactions_pending')
+    return redirect('finance:bank_transactions_pending')
 
 
 @login_required
@@ -258,7 +264,7 @@ def bank_transaction_ignore(request, trans_pk):
     bank_trans.save()
     
     messages.info(request, "Tranzacție ignorată.")
-    return redirect('bank_transactions_pending')
+    return redirect('finance:bank_transactions_pending')
 
 
 @login_required
@@ -0,0 +1,219 @@
+"""
+Rollup BT Pay pe oră și pe zi (BTPayBucket)
+Menținut incremental la ingestie și din semnalele BankTransaction; graficele
+pe 24h/7z/30z citesc un singur interval de rânduri, indiferent de volum
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Abs, TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import BankTransaction, BTPayBucket
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+}
+
+# Ferestrele mai lungi de atât citesc rândurile zilnice
+HOURLY_UP_TO = timedelta(days=2)
+
+
+def bucket_start(value, granularity):
+    """Începutul orei sau al zilei (în fusul orar local) care conține value"""
+    value = timezone.localtime(value)
+    if granularity == 'day':
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_snapshot(bank_transaction):
+    """Valorile unei tranzacții relevante pentru rollup (None dacă nu e BT Pay)"""
+    if not bank_transaction.is_bt_pay:
+        return None
+    return {
+        'user_id': bank_transaction.user_id,
+        'date': bank_transaction.date,
+        'category': bank_transaction.category_guess,
+        'sync_status': bank_transaction.sync_status,
+        'amount': abs(Decimal(str(bank_transaction.amount or 0))),
+    }
+
+
+def apply_delta(user_id, granularity, start, category, sync_status, amount, count):
+    """Adaugă (sau scade) o sumă în rândul de rollup corespunzător, atomic"""
+    rows = BTPayBucket.objects.filter(
+        user_id=user_id,
+        granularity=granularity,
+        bucket_start=start,
+        category=category,
+        sync_status=sync_status,
+    )
+    updated = rows.update(total=F('total') + amount, count=F('count') + count)
+
+    if not updated:
+        if count <= 0:
+            return
+        try:
+            with db_transaction.atomic():
+                BTPayBucket.objects.create(
+                    user_id=user_id,
+                    granularity=granularity,
+                    bucket_start=start,
+                    category=category,
+                    sync_status=sync_status,
+                    total=amount,
+                    count=count,
+                )
+        except IntegrityError:
+            # Creat concurent - aplicăm peste rândul existent
+            rows.update(total=F('total') + amount, count=F('count') + count)
+    elif count < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def _apply_snapshot(snapshot, sign):
+    for granularity in GRANULARITIES:
+        apply_delta(
+            snapshot['user_id'],
+            granularity,
+            bucket_start(snapshot['date'], granularity),
+            snapshot['category'],
+            snapshot['sync_status'],
+            snapshot['amount'] * sign,
+            sign,
+        )
+
+
+def apply_bucket_change(previous, current):
+    """
+    Actualizează rollup-ul pentru o tranzacție bancară creată, editată sau ștearsă
+
+    Args:
+        previous: snapshot-ul dinainte de salvare (None la creare)
+        current: snapshot-ul curent (None la ștergere)
+    """
+    if previous == current:
+        return
+    if previous:
+        _apply_snapshot(previous, -1)
+    if current:
+        _apply_snapshot(current, 1)
+
+
+def add_transactions(bank_transactions):
+    """
+    Adaugă tranzacții noi (ex: o pagină ingerată cu bulk_create) în rollup
+
+    Tranzacțiile sunt grupate întâi pe interval, deci numărul de interogări depinde
+    de câte ore/zile și categorii distincte are pagina, nu de numărul de rânduri.
+    """
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for bank_transaction in bank_transactions:
+        snapshot = bucket_snapshot(bank_transaction)
+        if snapshot is None:
+            continue
+        for granularity in GRANULARITIES:
+            key = (
+                snapshot['user_id'], granularity, bucket_start(snapshot['date'], granularity),
+                snapshot['category'], snapshot['sync_status'],
+            )
+            deltas[key][0] += snapshot['amount']
+            deltas[key][1] += 1
+
+    for key, (amount, count) in deltas.items():
+        apply_delta(*key, amount, count)
+    return len(deltas)
+
+
+def rebuild_buckets(user=None):
+    """Reconstruiește rollup-ul de la zero din tabela de tranzacții bancare"""
+    transactions = BankTransaction.objects.filter(is_bt_pay=True)
+    buckets = BTPayBucket.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        buckets = buckets.filter(user=user)
+
+    with db_transaction.atomic():
+        buckets.delete()
+        created = 0
+        for granularity, trunc in GRANULARITIES.items():
+            grouped = transactions.annotate(
+                bucket_start=trunc('date'),
+            ).values(
+                'user_id', 'bucket_start', 'sync_status', category=F('category_guess'),
+            ).annotate(
+                total=Sum(Abs('amount')),
+                count=Count('id'),
+            ).order_by()
+            created += len(BTPayBucket.objects.bulk_create(
+                (BTPayBucket(granularity=granularity, **row) for row in grouped.iterator()),
+                batch_size=1000,
+            ))
+
+    logger.info(f"Rebuilt {created} BT Pay buckets")
+    return created
+
+
+def _window(days=None, hours=None, now=None):
+    """Granularitatea și începutul (aliniat la interval) unei ferestre"""
+    # Scăderea se face în UTC: pe o oră locală ar fi aritmetică de ceas și ar greși la schimbarea orei
+    now = (now or timezone.now()).astimezone(dt_timezone.utc)
+    length = timedelta(days=days or 0, hours=hours or 0)
+    granularity = 'hour' if length <= HOURLY_UP_TO else 'day'
+    return granularity, bucket_start(now - length, granularity)
+
+
+def _synced(user, granularity, start):
+    return BTPayBucket.objects.filter(
+        user=user, granularity=granularity, sync_status='synced', bucket_start__gte=start,
+    ).order_by()
+
+
+def series(user, hours=24, now=None):
+    """
+    Tranzacțiile BT Pay sincronizate pe ore, ultimele hours ore (ora curentă inclusă)
+
+    Returns:
+        list: [{'start', 'count', 'amount'}], câte un element pe oră, și cele goale
+    """
+    now = now or timezone.now()
+    # Orele se numără în UTC, ca la schimbarea orei (DST) să nu sară sau să dubleze o oră
+    current = bucket_start(now, 'hour').astimezone(dt_timezone.utc)
+    starts = [current - timedelta(hours=i) for i in range(hours - 1, -1, -1)]
+    rows = {
+        row['bucket_start']: row
+        for row in _synced(user, 'hour', starts[0]).values('bucket_start').annotate(
+            count_sum=Sum('count'), amount=Sum('total'),
+        )
+    }
+    return [
+        {
+            'start': timezone.localtime(start),
+            'count': rows[start]['count_sum'] if start in rows else 0,
+            'amount': rows[start]['amount'] if start in rows else Decimal('0'),
+        }
+        for start in starts
+    ]
+
+
+def category_totals(user, days=None, hours=None, now=None):
+    """
+    Totalurile BT Pay sincronizate pe categorii pentru o fereastră
+
+    Fereastra începe la granița de oră (până la 2 zile) sau de zi care o conține.
+    """
+    granularity, start = _window(days, hours, now)
+    return {
+        row['category'] or 'other': {'count': row['count_sum'], 'total': row['amount']}
+        for row in _synced(user, granularity, start).values('category').annotate(
+            count_sum=Sum('count'), amount=Sum('total'),
+        )
+    }
@@ -9,12 +9,15 @@ from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Count, Q
+from django.db.models.functions import Abs
 from django.utils import timezone
 from datetime import timedelta
 import time
 
 from .models import BankTransaction, Transaction
+from . import bt_pay_buckets
 from .bt_pay_service import BTPay
+from .http_cache import compact_json_response, http_cached, layout
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -27,6 +30,7 @@ class DecimalEncoder(json.JSONEncoder):
 
 @login_required
 @require_http_methods(["GET"])
+@http_cached()
 def bt_pay_live_transactions(request):
     """
     Real-time BT Pay transactions stream
@@ -47,24 +51,21 @@ def bt_pay_live_transactions(request):
     
     transactions = []
     for trans in recent:
-        is_bt_pay = BTPay.is_bt_pay_transaction(trans.description)
-        category = BTPay.guess_category(trans.description) if is_bt_pay else None
-        
         transactions.append({
             'id': trans.id,
-            'merchant': BTPay.extract_merchant_name(trans.description),
+            'merchant': trans.merchant_normalized,
             'amount': float(trans.amount),
             'currency': trans.currency,
             'date': trans.date.isoformat(),
-            'category': category,
-            'is_bt_pay': is_bt_pay,
+            'category': (trans.category_guess or None) if trans.is_bt_pay else None,
+            'is_bt_pay': trans.is_bt_pay,
             'status': trans.sync_status,
             'description': trans.description,
         })
     
-    return JsonResponse({
+    return compact_json_response({
         'success': True,
-        'transactions': transactions,
+        'transactions': layout(request, transactions),
         'count': len(transactions),
         'timestamp': timezone.now().isoformat(),
     }, encoder=DecimalEncoder)
@@ -72,6 +73,7 @@ def bt_pay_live_transactions(request):
 
 @login_required
 @require_http_methods(["GET"])
+@http_cached()
 def bt_pay_live_stats(request):
     """
     Real-time statistics
@@ -80,18 +82,17 @@ def bt_pay_live_stats(request):
     
     today = timezone.now()
     
-    # Today
-    stats_today = BTPay.get_bt_pay_stats(request.user, days=1)
-    
-    # This month
+    # Today, this month, last 30 days - one scan
     month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     days_in_month = (today - month_start).days
-    stats_month = BTPay.get_bt_pay_stats(request.user, days=max(1, days_in_month + 1))
-    
-    # Last 30 days
-    stats_30 = BTPay.get_bt_pay_stats(request.user, days=30)
+    windows = BTPay.get_bt_pay_stats_windows(request.user, {
+        'today': 1,
+        'month': max(1, days_in_month + 1),
+        '30d': 30,
+    })
+    stats_today, stats_month, stats_30 = windows['today'], windows['month'], windows['30d']
     
-    return JsonResponse({
+    return compact_json_response({
         'success': True,
         'stats': {
             'today': {
@@ -117,44 +118,39 @@ def bt_pay_live_stats(request):
 
 @login_required
 @require_http_methods(["GET"])
+@http_cached()
 def bt_pay_live_pending(request):
     """
     Real-time pending transactions count and details
     """
     
-    pending = BankTransaction.objects.filter(
-        user=request.user,
-        sync_status='pending'
-    ).exclude(description__isnull=True).order_by('-date')
-    
-    pending_bt_pay = [
-        t for t in pending 
-        if BTPay.is_bt_pay_transaction(t.description)
-    ]
+    pending_bt_pay = BTPay.transactions(request.user, sync_status='pending')
+    pending_totals = pending_bt_pay.aggregate(count=Count('pk'), total=Sum(Abs('amount')))
     
     pending_list = []
-    for trans in pending_bt_pay[:20]:  # Top 20
+    for trans in pending_bt_pay.order_by('-date')[:20]:  # Top 20
         pending_list.append({
             'id': trans.id,
-            'merchant': BTPay.extract_merchant_name(trans.description),
+            'merchant': trans.merchant_normalized,
             'amount': float(abs(trans.amount)),
             'currency': trans.currency,
             'date': trans.date.isoformat(),
-            'category_guess': BTPay.guess_category(trans.description),
+            'category_guess': trans.category_guess or None,
             'description': trans.description,
         })
     
-    return JsonResponse({
+    return compact_json_response({
         'success': True,
-        'pending_count': len(pending_bt_pay),
-        'pending_transactions': pending_list,
-        'total_pending_amount': float(sum(abs(t.amount) for t in pending_bt_pay)),
+        'pending_count': pending_totals['count'],
+        'pending_transactions': layout(request, pending_list),
+        'total_pending_amount': float(pending_totals['total'] or 0),
         'timestamp': timezone.now().isoformat(),
     }, encoder=DecimalEncoder)
 
 
 @login_required
 @require_http_methods(["GET"])
+@http_cached()
 def bt_pay_live_dashboard_data(request):
     """
     Complete real-time dashboard data
@@ -162,19 +158,13 @@ def bt_pay_live_dashboard_data(request):
     """
     
     # Stats
-    stats_30 = BTPay.get_bt_pay_stats(request.user, days=30)
-    stats_today = BTPay.get_bt_pay_stats(request.user, days=1)
+    windows = BTPay.get_bt_pay_stats_windows(request.user, {'30d': 30, 'today': 1})
+    stats_30, stats_today = windows['30d'], windows['today']
     
     # Pending
-    pending = BankTransaction.objects.filter(
-        user=request.user,
-        sync_status='pending'
-    ).exclude(description__isnull=True).order_by('-date')
-    
-    pending_bt_pay = [
-        t for t in pending 
-        if BTPay.is_bt_pay_transaction(t.description)
-    ]
+    pending = BTPay.transactions(request.user, sync_status='pending').aggregate(
+        count=Count('pk'), total=Sum(Abs('amount')),
+    )
     
     # Recent synced
     recent = BankTransaction.objects.filter(
@@ -186,31 +176,41 @@ def bt_pay_live_dashboard_data(request):
     recent_list = []
     for trans in recent:
         recent_list.append({
-            'merchant': BTPay.extract_merchant_name(trans.description),
+            'merchant': trans.merchant_normalized,
             'amount': float(abs(trans.amount)),
             'date': trans.date.isoformat(),
-            'category': BTPay.guess_category(trans.description),
+            'category': trans.category_guess or None,
         })
     
-    return JsonResponse({
+    return compact_json_response({
         'success': True,
         'dashboard': {
-            'pending_count': len(pending_bt_pay),
-            'pending_amount': float(sum(abs(t.amount) for t in pending_bt_pay)),
+            'pending_count': pending['count'],
+            'pending_amount': float(pending['total'] or 0),
             'today_transactions': stats_today['total_transactions'],
             'today_amount': float(stats_today['total_amount']),
             'month_transactions': stats_30['total_transactions'],
             'month_amount': float(stats_30['total_amount']),
             'month_merchants': len(stats_30['top_merchants']),
-            'top_merchants': [
+            'top_merchants': layout(request, [
                 {
                     'name': name,
                     'amount': float(data['total']),
                     'count': data['count']
                 }
                 for name, data in list(stats_30['top_merchants'].items())[:5]
-            ],
-            'recent_transactions': recent_list,
+            ]),
+            # Tot istoricul, aproximat: suma reală e în [amount - error, amount]
+            'all_time_merchants': layout(request, [
+                {
+                    'name': name,
+                    'amount': float(data['total']),
+                    'error': float(data['error']),
+                    'guaranteed': data['guaranteed'],
+                }
+                for name, data in BTPay.top_merchants(request.user, k=5).items()
+            ]),
+            'recent_transactions': layout(request, recent_list),
         },
         'timestamp': timezone.now().isoformat(),
     }, encoder=DecimalEncoder)
@@ -239,15 +239,7 @@ def stream_bt_pay_events(request):
                     sync_status='pending'
                 ).exclude(description__isnull=True).count()
                 
-                pending_bt_pay = BankTransaction.objects.filter(
-                    user=request.user,
-                    sync_status='pending'
-                ).exclude(description__isnull=True)
-                
-                pending_bt_pay_count = sum(
-                    1 for t in pending_bt_pay 
-                    if BTPay.is_bt_pay_transaction(t.description)
-                )
+                pending_bt_pay_count = BTPay.transactions(request.user, sync_status='pending').count()
                 
                 # Get stats
                 stats = BTPay.get_bt_pay_stats(request.user, days=1)
@@ -276,40 +268,25 @@ def stream_bt_pay_events(request):
 
 @login_required
 @require_http_methods(["GET"])
+@http_cached()
 def bt_pay_hourly_summary(request):
     """
     Hourly summary for last 24 hours
     """
     
-    now = timezone.now()
-    hours_data = []
-    
-    for i in range(24, 0, -1):
-        hour_start = now - timedelta(hours=i)
-        hour_end = hour_start + timedelta(hours=1)
-        
-        transactions = BankTransaction.objects.filter(
-            user=request.user,
-            sync_status='synced',
-            date__gte=hour_start,
-            date__lt=hour_end
-        ).exclude(description__isnull=True)
-        
-        bt_pay_trans = [
-            t for t in transactions 
-            if BTPay.is_bt_pay_transaction(t.description)
-        ]
-        
-        hours_data.append({
-            'hour': hour_start.hour,
-            'timestamp': hour_start.isoformat(),
-            'count': len(bt_pay_trans),
-            'amount': float(sum(abs(t.amount) for t in bt_pay_trans)),
-        })
+    hours_data = [
+        {
+            'hour': timezone.localtime(hour['start']).hour,
+            'timestamp': hour['start'].isoformat(),
+            'count': hour['count'],
+            'amount': float(hour['amount']),
+        }
+        for hour in bt_pay_buckets.series(request.user, hours=24)
+    ]
     
-    return JsonResponse({
+    return compact_json_response({
         'success': True,
-        'hours': hours_data,
+        'hours': layout(request, hours_data),
         'total_transactions': sum(h['count'] for h in hours_data),
         'total_amount': sum(h['amount'] for h in hours_data),
     }, encoder=DecimalEncoder)
@@ -317,17 +294,18 @@ def bt_pay_hourly_summary(request):
 
 @login_required
 @require_http_methods(["GET"])
+@http_cached()
 def bt_pay_category_realtime(request):
     """
     Real-time category breakdown
     """
     
-    stats_24h = BTPay.get_bt_pay_stats(request.user, days=1)
-    stats_7d = BTPay.get_bt_pay_stats(request.user, days=7)
+    today = bt_pay_buckets.category_totals(request.user, hours=24)
+    week = bt_pay_buckets.category_totals(request.user, days=7)
     
     categories = {}
-    for category, data in stats_7d['transactions_by_category'].items():
-        today_data = stats_24h['transactions_by_category'].get(category, {
+    for category, data in week.items():
+        today_data = today.get(category, {
             'count': 0,
             'total': Decimal('0')
         })
@@ -343,7 +321,7 @@ def bt_pay_category_realtime(request):
             }
         }
     
-    return JsonResponse({
+    return compact_json_response({
         'success': True,
         'categories': categories,
         'timestamp': timezone.now().isoformat(),
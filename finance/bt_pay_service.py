@@ -5,17 +5,82 @@ Detectează, categorizează și gestionează tranzacții BT Pay
 
 import re
 import logging
+from bisect import bisect_right
 from decimal import Decimal
-from django.db.models import Sum, Q
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Abs
 from django.utils import timezone
 from .models import BankTransaction, Transaction, Account, Category, User
+from . import merchant_sketch
 
 logger = logging.getLogger(__name__)
 
 
+class KeywordMatcher:
+    """
+    Potrivire simultană a tuturor cuvintelor cheie, cu o singură expresie regulată
+    
+    Cuvintele cheie sunt potrivite ca întregi (limite de cuvânt); la mai multe
+    potriviri câștigă categoria cu prioritatea cea mai mare (ordinea din dict).
+    """
+    
+    def __init__(self, categories):
+        self.priority = {}
+        for rank, (category, keywords) in enumerate(categories.items()):
+            for keyword in keywords:
+                self.priority.setdefault(keyword.lower(), (rank, category))
+        # Cele mai lungi primele: 'gas station' înaintea lui 'gas' la aceeași poziție
+        alternatives = sorted(self.priority, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(?:%s)\b' % '|'.join(map(re.escape, alternatives))) if alternatives else None
+    
+    def _best(self, matches):
+        best = min((self.priority[match.group()] for match in matches), default=None)
+        return best[1] if best else None
+    
+    def match(self, text):
+        """Categoria cea mai prioritară găsită în text (sau None)"""
+        if not text or self.pattern is None:
+            return None
+        return self._best(self.pattern.finditer(text.lower()))
+    
+    def match_many(self, texts):
+        """
+        Categoriile pentru o listă de texte, într-o singură trecere
+        
+        Textele sunt unite cu '\n' (nu apare în cuvintele cheie) și fiecare potrivire
+        e atribuită textului ei după poziție.
+        """
+        texts = [(text or '').lower() for text in texts]
+        results = [None] * len(texts)
+        if self.pattern is None:
+            return results
+        
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        joined = '\n'.join(texts)
+        
+        best = {}
+        for match in self.pattern.finditer(joined):
+            index = bisect_right(starts, match.start()) - 1
+            candidate = self.priority[match.group()]
+            if index not in best or candidate < best[index]:
+                best[index] = candidate
+        for index, (rank, category) in best.items():
+            results[index] = category
+        return results
+
+
 class BTPay:
     """Serviciu pentru gestionarea tranzacțiilor BT Pay"""
     
+    # Se incrementează la orice schimbare a regulilor de mai jos, apoi
+    # `manage.py classify_bt_pay` reclasifică rândurile vechi
+    CLASSIFICATION_VERSION = 2
+    CLASSIFIED_FIELDS = ['is_bt_pay', 'merchant_normalized', 'category_guess', 'classification_version']
+    
     # Tipuri de comercianți
     MERCHANT_CATEGORIES = {
         # Food & Dining
@@ -52,6 +117,15 @@ class BTPay:
         'travel': ['hotel', 'airbnb', 'booking', 'airline', 'flight', 'tourism'],
     }
     
+    # Construit o dată; set_categories îl reconstruiește
+    _matcher = KeywordMatcher(MERCHANT_CATEGORIES)
+    
+    @classmethod
+    def set_categories(cls, categories):
+        """Înlocuiește regulile de categorisire (incrementați și CLASSIFICATION_VERSION)"""
+        cls.MERCHANT_CATEGORIES = categories
+        cls._matcher = KeywordMatcher(categories)
+    
     @staticmethod
     def is_bt_pay_transaction(description):
         """Verifică dacă e tranzacție BT Pay"""
@@ -83,29 +157,68 @@ class BTPay:
     
     @staticmethod
     def guess_category(description):
-        """Ghicește categoria pe baza descrierii"""
-        if not description:
-            return None
-        
-        desc_lower = description.lower()
-        merchant = BTPay.extract_merchant_name(description).lower()
+        """Ghicește categoria pe baza descrierii (comerciantul face parte din ea)"""
+        return BTPay._matcher.match(description)
+    
+    @staticmethod
+    def guess_categories(descriptions):
+        """Ghicește categoriile pentru multe descrieri deodată"""
+        return BTPay._matcher.match_many(descriptions)
+    
+    @staticmethod
+    def classify(bank_transaction):
+        """Completează câmpurile de clasificare BT Pay ale unei tranzacții (fără salvare)"""
+        return BTPay.classify_many([bank_transaction])[0]
+    
+    @staticmethod
+    def classify_many(bank_transactions):
+        """Clasifică o listă de tranzacții, cu categoriile ghicite într-o singură trecere"""
+        categories = BTPay.guess_categories(t.description for t in bank_transactions)
+        for bank_transaction, category in zip(bank_transactions, categories):
+            description = bank_transaction.description
+            merchant = BTPay.extract_merchant_name(description) or ''
+            bank_transaction.is_bt_pay = BTPay.is_bt_pay_transaction(description)
+            bank_transaction.merchant_normalized = ' '.join(merchant.split())[:255]
+            bank_transaction.category_guess = category or ''
+            bank_transaction.classification_version = BTPay.CLASSIFICATION_VERSION
+        return bank_transactions
+    
+    @staticmethod
+    def reclassify(queryset=None, batch_size=1000):
+        """
+        Reclasifică tranzacțiile cu o versiune de clasificare mai veche
         
-        # Cauta în categorii
-        for category_name, keywords in BTPay.MERCHANT_CATEGORIES.items():
-            for keyword in keywords:
-                if keyword in desc_lower or keyword in merchant:
-                    return category_name
+        Returns:
+            int: numărul de rânduri actualizate
+        """
+        if queryset is None:
+            queryset = BankTransaction.objects.all()
+        stale = queryset.filter(classification_version__lt=BTPay.CLASSIFICATION_VERSION).order_by('pk')
         
-        return None
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(stale.filter(pk__gt=last_pk).only('pk', 'description')[:batch_size])
+            if not batch:
+                return updated
+            BTPay.classify_many(batch)
+            BankTransaction.objects.bulk_update(batch, BTPay.CLASSIFIED_FIELDS)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+    
+    @staticmethod
+    def transactions(user, **filters):
+        """Tranzacțiile BT Pay ale utilizatorului (filtrate în SQL pe coloana is_bt_pay)"""
+        return BankTransaction.objects.filter(user=user, is_bt_pay=True, **filters)
     
     @staticmethod
     def categorize_bt_pay_transaction(bank_transaction):
         """Categorizează automat o tranzacție BT Pay"""
-        if not BTPay.is_bt_pay_transaction(bank_transaction.description):
+        if not bank_transaction.is_bt_pay:
             return False
         
-        # Ghicește categoria
-        category_name = BTPay.guess_category(bank_transaction.description)
+        # Categoria ghicită la ingestie
+        category_name = bank_transaction.category_guess
         
         if not category_name:
             logger.info(f"Could not auto-categorize: {bank_transaction.description}")
@@ -136,7 +249,7 @@ class BTPay:
                 category=category,
                 type='expense',
                 amount=abs(bank_transaction.amount),
-                description=BTPay.extract_merchant_name(bank_transaction.description),
+                description=bank_transaction.merchant_normalized,
                 date=bank_transaction.date.date(),
             )
             
@@ -155,11 +268,11 @@ class BTPay:
     @staticmethod
     def auto_categorize_all_bt_pay(user):
         """Categorizează automat toate tranzacțiile BT Pay pending"""
-        pending_bt_pay = BankTransaction.objects.filter(
-            user=user,
+        pending_bt_pay = BTPay.transactions(
+            user,
             sync_status='pending',
             synced_to_transaction__isnull=True
-        ).exclude(description__isnull=True)
+        )
         
         categorized = 0
         for bank_trans in pending_bt_pay:
@@ -171,54 +284,105 @@ class BTPay:
     @staticmethod
     def get_bt_pay_stats(user, days=30):
         """Obține statistici BT Pay"""
-        from datetime import timedelta
+        return BTPay.get_bt_pay_stats_windows(user, {'stats': days})['stats']
+    
+    @staticmethod
+    def get_bt_pay_stats_windows(user, windows, top=10):
+        """
+        Statistici BT Pay pentru mai multe ferestre de timp, din aceleași rânduri
+        
+        Toate ferestrele sunt calculate cu agregare condiționată peste cea mai largă:
+        o interogare pentru totaluri și categorii, una pentru comercianți.
+        
+        Args:
+            windows: {nume: zile}
+            top: câți comercianți se păstrează per fereastră
         
-        start_date = timezone.now() - timedelta(days=days)
+        Returns:
+            dict: {nume: statistici în formatul get_bt_pay_stats}
+        """
+        from datetime import timedelta
         
-        bt_pay_transactions = BankTransaction.objects.filter(
-            user=user,
+        now = timezone.now()
+        starts = [now - timedelta(days=days) for days in windows.values()]
+        bt_pay_transactions = BTPay.transactions(
+            user,
             sync_status='synced',
-            date__gte=start_date
-        ).exclude(description__isnull=True)
+            date__gte=min(starts)
+        ).order_by()
+        
+        amount = Abs('amount')
+        aggregates = {}
+        for i, start in enumerate(starts):
+            aggregates[f'count_{i}'] = Count('pk', filter=Q(date__gte=start))
+            aggregates[f'total_{i}'] = Sum(amount, filter=Q(date__gte=start))
         
-        bt_pay_transactions = [
-            t for t in bt_pay_transactions 
-            if BTPay.is_bt_pay_transaction(t.description)
+        stats = [
+            {
+                'total_transactions': 0,
+                'total_amount': Decimal('0'),
+                'transactions_by_category': {},
+                'top_merchants': {}
+            }
+            for _ in starts
         ]
         
-        stats = {
-            'total_transactions': len(bt_pay_transactions),
-            'total_amount': sum(abs(t.amount) for t in bt_pay_transactions),
-            'transactions_by_category': {},
-            'top_merchants': {}
-        }
+        # Totaluri și categorii
+        for row in bt_pay_transactions.values('category_guess').annotate(**aggregates):
+            category = row['category_guess'] or 'other'
+            for i, window in enumerate(stats):
+                if not row[f'count_{i}']:
+                    continue
+                window['total_transactions'] += row[f'count_{i}']
+                window['total_amount'] += row[f'total_{i}']
+                entry = window['transactions_by_category'].setdefault(category, {'count': 0, 'total': Decimal('0')})
+                entry['count'] += row[f'count_{i}']
+                entry['total'] += row[f'total_{i}']
         
-        # Categorii
-        for trans in bt_pay_transactions:
-            category = BTPay.guess_category(trans.description) or 'other'
-            if category not in stats['transactions_by_category']:
-                stats['transactions_by_category'][category] = {
-                    'count': 0,
-                    'total': Decimal('0')
-                }
-            stats['transactions_by_category'][category]['count'] += 1
-            stats['transactions_by_category'][category]['total'] += abs(trans.amount)
-        
-        # Top comercianți
-        merchants = {}
-        for trans in bt_pay_transactions:
-            merchant = BTPay.extract_merchant_name(trans.description) or 'Unknown'
-            if merchant not in merchants:
-                merchants[merchant] = {'count': 0, 'total': Decimal('0')}
-            merchants[merchant]['count'] += 1
-            merchants[merchant]['total'] += abs(trans.amount)
-        
-        # Sortează și iau top 10
-        stats['top_merchants'] = dict(
-            sorted(merchants.items(), key=lambda x: x[1]['total'], reverse=True)[:10]
-        )
+        # Top comercianți (o singură fereastră: sortare și limită în SQL)
+        merchants = bt_pay_transactions.values('merchant_normalized')
+        if len(starts) == 1:
+            rows = merchants.annotate(count_0=Count('pk'), total_0=Sum(amount)).order_by('-total_0')[:top]
+        else:
+            rows = list(merchants.annotate(**aggregates))
+        for i, window in enumerate(stats):
+            ranked = sorted((row for row in rows if row[f'count_{i}']), key=lambda row: row[f'total_{i}'], reverse=True)
+            window['top_merchants'] = {
+                row['merchant_normalized'] or 'Unknown': {'count': row[f'count_{i}'], 'total': row[f'total_{i}']}
+                for row in ranked[:top]
+            }
+        
+        return dict(zip(windows, stats))
+    
+    @staticmethod
+    def top_merchants(user, k=10, days=None, exact=False):
+        """
+        Top k comercianți BT Pay după sumă (toate tranzacțiile BT Pay, orice status)
+        
+        Fără days: tot istoricul, din schița Space-Saving (memorie fixă per utilizator);
+        suma reală e între total - error și total, iar guaranteed marchează intrările
+        sigur aflate în top k. Cu days (ferestre mici) sau exact=True: grupat exact în SQL.
+        """
+        if days is None and not exact:
+            return merchant_sketch.top_merchants(user, k)
         
-        return stats
+        from datetime import timedelta
+        
+        bt_pay_transactions = BTPay.transactions(user).order_by()
+        if days is not None:
+            bt_pay_transactions = bt_pay_transactions.filter(date__gte=timezone.now() - timedelta(days=days))
+        top = bt_pay_transactions.values('merchant_normalized').annotate(
+            count=Count('pk'), total=Sum(Abs('amount')),
+        ).order_by('-total')[:k]
+        return {
+            row['merchant_normalized'] or merchant_sketch.UNKNOWN: {
+                'count': row['count'],
+                'total': row['total'],
+                'error': Decimal('0'),
+                'guaranteed': True,
+            }
+            for row in top
+        }
     
     @staticmethod
     def notify_large_bt_pay(user, transaction, threshold=100):
@@ -6,7 +6,8 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
-from django.db.models import Sum, Count, Q
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Abs
 from datetime import timedelta
 from django.utils import timezone
 
@@ -31,21 +32,11 @@ def bt_pay_dashboard(request):
     """BT Pay Dashboard - Overview și statistici"""
     
     # Tranzacții pending
-    pending_bt_pay = BankTransaction.objects.filter(
-        user=request.user,
-        sync_status='pending'
-    ).exclude(description__isnull=True)
+    pending_bt_pay = list(BTPay.transactions(request.user, sync_status='pending'))
     
-    pending_bt_pay = [
-        t for t in pending_bt_pay 
-        if BTPay.is_bt_pay_transaction(t.description)
-    ]
-    
-    # Stats ultimele 30 zile
-    stats_30 = BTPay.get_bt_pay_stats(request.user, days=30)
-    
-    # Stats ultimele 90 zile
-    stats_90 = BTPay.get_bt_pay_stats(request.user, days=90)
+    # Stats ultimele 30 și 90 zile
+    windows = BTPay.get_bt_pay_stats_windows(request.user, {'30d': 30, '90d': 90})
+    stats_30, stats_90 = windows['30d'], windows['90d']
     
     # Trend lunar
     today = timezone.now()
@@ -55,24 +46,17 @@ def bt_pay_dashboard(request):
         start = month_date.replace(day=1)
         end = (start + timedelta(days=32)).replace(day=1)
         
-        bt_pay_trans = BankTransaction.objects.filter(
-            user=request.user,
+        month = BTPay.transactions(
+            request.user,
             sync_status='synced',
             date__gte=start,
             date__lt=end
-        ).exclude(description__isnull=True)
-        
-        bt_pay_trans = [
-            t for t in bt_pay_trans 
-            if BTPay.is_bt_pay_transaction(t.description)
-        ]
-        
-        total = sum(abs(t.amount) for t in bt_pay_trans)
+        ).aggregate(count=Count('pk'), total=Sum(Abs('amount')))
         
         months.append({
             'month': month_date.strftime('%B'),
-            'total': float(total),
-            'count': len(bt_pay_trans)
+            'total': float(month['total'] or 0),
+            'count': month['count']
         })
     
     context = {
@@ -99,32 +83,19 @@ def bt_pay_transactions(request):
     start_date = timezone.now() - timedelta(days=days)
     
     # Bază query
-    bt_pay_trans = BankTransaction.objects.filter(
-        user=request.user,
+    bt_pay_list = BTPay.transactions(
+        request.user,
         sync_status='synced',
         date__gte=start_date
-    ).exclude(description__isnull=True).order_by('-date')
-    
-    # Filtrează după BT Pay
-    bt_pay_list = [
-        t for t in bt_pay_trans 
-        if BTPay.is_bt_pay_transaction(t.description)
-    ]
+    ).order_by('-date')
     
     # Filtrare după categorie
     if category:
-        bt_pay_list = [
-            t for t in bt_pay_list 
-            if BTPay.guess_category(t.description) == category
-        ]
+        bt_pay_list = bt_pay_list.filter(category_guess=category)
     
     # Filtrare după comerciant
     if merchant:
-        merchant_lower = merchant.lower()
-        bt_pay_list = [
-            t for t in bt_pay_list 
-            if merchant_lower in BTPay.extract_merchant_name(t.description).lower()
-        ]
+        bt_pay_list = bt_pay_list.filter(merchant_normalized__icontains=merchant)
     
     context = {
         'transactions': bt_pay_list,
@@ -156,16 +127,11 @@ def bt_pay_merchant_detail(request, merchant_name):
     """Detalii despre un anumit comerciant"""
     
     # Toate tranzacțiile cu acest comerciant
-    all_transactions = BankTransaction.objects.filter(
-        user=request.user,
-        sync_status='synced'
-    ).exclude(description__isnull=True).order_by('-date')
-    
-    merchant_trans = [
-        t for t in all_transactions
-        if BTPay.is_bt_pay_transaction(t.description)
-        and merchant_name.lower() in BTPay.extract_merchant_name(t.description).lower()
-    ]
+    merchant_trans = list(BTPay.transactions(
+        request.user,
+        sync_status='synced',
+        merchant_normalized__icontains=merchant_name
+    ).order_by('-date'))
     
     # Statistici
     stats = {
@@ -190,43 +156,30 @@ def bt_pay_category_analysis(request):
     
     start_date = timezone.now() - timedelta(days=days)
     
-    all_transactions = BankTransaction.objects.filter(
-        user=request.user,
+    bt_pay_trans = BTPay.transactions(
+        request.user,
         sync_status='synced',
         date__gte=start_date
-    ).exclude(description__isnull=True)
-    
-    bt_pay_trans = [
-        t for t in all_transactions 
-        if BTPay.is_bt_pay_transaction(t.description)
-    ]
+    ).order_by()
     
-    # Analiză pe categorii
+    # Analiză pe categorii, grupată în baza de date
     categories_analysis = {}
-    for trans in bt_pay_trans:
-        category = BTPay.guess_category(trans.description) or 'other'
-        
-        if category not in categories_analysis:
-            categories_analysis[category] = {
-                'total': 0,
-                'count': 0,
-                'average': 0,
-                'max': 0,
-                'min': float('inf'),
-                'merchants': {}
-            }
-        
-        amount = abs(trans.amount)
-        categories_analysis[category]['total'] += amount
-        categories_analysis[category]['count'] += 1
-        categories_analysis[category]['max'] = max(categories_analysis[category]['max'], amount)
-        categories_analysis[category]['min'] = min(categories_analysis[category]['min'], amount)
-        
-        # Track merchants
-        merchant = BTPay.extract_merchant_name(trans.description) or 'Unknown'
-        if merchant not in categories_analysis[category]['merchants']:
-            categories_analysis[category]['merchants'][merchant] = 0
-        categories_analysis[category]['merchants'][merchant] += 1
+    for row in bt_pay_trans.values('category_guess').annotate(
+        total=Sum(Abs('amount')), count=Count('pk'), max=Max(Abs('amount')), min=Min(Abs('amount')),
+    ):
+        categories_analysis[row['category_guess'] or 'other'] = {
+            'total': row['total'],
+            'count': row['count'],
+            'average': 0,
+            'max': row['max'],
+            'min': row['min'],
+            'merchants': {}
+        }
+    
+    # Track merchants
+    for row in bt_pay_trans.values('category_guess', 'merchant_normalized').annotate(count=Count('pk')):
+        merchant = row['merchant_normalized'] or 'Unknown'
+        categories_analysis[row['category_guess'] or 'other']['merchants'][merchant] = row['count']
     
     # Calculează medii
     for cat in categories_analysis:
@@ -0,0 +1,133 @@
+"""
+Serviciu pentru evaluarea bugetelor
+Calculează cheltuit/rămas/procent pentru orice set de bugete într-o singură interogare
+"""
+import logging
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import Budget, MonthlyCategoryTotal
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetEvaluator:
+    """Evaluează bugetele pe baza rollup-ului lunar (MonthlyCategoryTotal)"""
+
+    @staticmethod
+    def annotate(queryset):
+        """Adaugă spent și remaining ca adnotări SQL pe un queryset de bugete"""
+        spent = MonthlyCategoryTotal.objects.filter(
+            user=OuterRef('user'),
+            category=OuterRef('category'),
+            type='expense',
+            month=OuterRef('budget_month'),
+        ).values('total')[:1]
+
+        return queryset.annotate(
+            budget_month=TruncMonth('month'),
+        ).annotate(
+            spent=Coalesce(
+                Subquery(spent),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        ).annotate(
+            remaining=F('amount') - F('spent'),
+        )
+
+    @staticmethod
+    def _set_percentage(budget):
+        budget.percentage = (budget.spent / budget.amount * 100) if budget.amount > 0 else 0
+        return budget
+
+    @classmethod
+    def evaluate(cls, budgets):
+        """
+        Evaluează un set de bugete (queryset sau listă de instanțe)
+
+        Returns:
+            list: bugetele cu atributele spent, remaining și percentage setate
+        """
+        if not hasattr(budgets, 'query'):
+            instances = list(budgets)
+            if not instances:
+                return []
+            evaluated = {
+                b.pk: b for b in cls.annotate(
+                    Budget.objects.filter(pk__in=[b.pk for b in instances])
+                ).only('pk', 'amount')
+            }
+            for budget in instances:
+                source = evaluated.get(budget.pk)
+                budget.spent = source.spent if source else Decimal('0')
+                budget.remaining = budget.amount - budget.spent
+                cls._set_percentage(budget)
+            return instances
+
+        return [
+            cls._set_percentage(budget)
+            for budget in cls.annotate(budgets.select_related('category'))
+        ]
+
+    @classmethod
+    def for_user(cls, user, month=None):
+        """Bugetele evaluate ale unui utilizator (opțional doar pentru o lună)"""
+        budgets = user.budgets.all()
+        if month is not None:
+            budgets = budgets.filter(month__year=month.year, month__month=month.month)
+        return cls.evaluate(budgets)
+
+    @classmethod
+    def overruns(cls, budgets=None, month=None):
+        """
+        Bugetele depășite, pentru toți utilizatorii, într-o singură trecere
+
+        Args:
+            budgets: queryset de bugete (implicit toate)
+            month: limitează la bugetele unei luni
+        """
+        if budgets is None:
+            budgets = Budget.objects.all()
+        if month is not None:
+            budgets = budgets.filter(month__year=month.year, month__month=month.month)
+
+        return [
+            cls._set_percentage(budget)
+            for budget in cls.annotate(
+                budgets.select_related('user', 'category')
+            ).filter(spent__gt=F('amount'))
+        ]
+
+    @classmethod
+    def crossed_by(cls, previous, current):
+        """
+        Bugetele depășite chiar de această modificare a unei tranzacții
+
+        Args:
+            previous: snapshot-ul tranzacției înainte de salvare (sau None)
+            current: snapshot-ul curent al tranzacției
+        """
+        if not current or current['type'] != 'expense' or not current['category_id']:
+            return []
+
+        key = ('user_id', 'category_id', 'type', 'month')
+        delta = current['amount']
+        if previous and all(previous[k] == current[k] for k in key):
+            delta -= previous['amount']
+        if delta <= 0:
+            return []
+
+        month = current['month']
+        budgets = Budget.objects.filter(
+            user_id=current['user_id'],
+            category_id=current['category_id'],
+            month__year=month.year,
+            month__month=month.month,
+        )
+        return [
+            budget for budget in cls.overruns(budgets)
+            if budget.spent - delta <= budget.amount
+        ]
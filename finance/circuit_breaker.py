@@ -0,0 +1,212 @@
+"""
+Circuit breaker și limitator de rată per bancă
+Starea e ținută în cache-ul BANK_API_LIMITS_CACHE_ALIAS, comun tuturor proceselor
+doar cu un backend partajat (Redis, DatabaseCache); cu locmem fiecare proces are
+propriul circuit și propria limită, iar la prima folosire se scrie un avertisment.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Eșecuri în FAILURE_WINDOW secunde după care circuitul se deschide
+    'FAILURE_THRESHOLD': 5,
+    'FAILURE_WINDOW': 60,
+    # Cât stă circuitul deschis înainte de o cerere de probă (half-open)
+    'RECOVERY_TIMEOUT': 30,
+    # Token bucket: cereri pe secundă, rafală maximă, așteptarea maximă după un token
+    'RATE': 10.0,
+    'BURST': 20,
+    'MAX_WAIT': 5.0,
+    # Rata scade la jumătate la 429 și revine treptat, dar nu sub MIN_RATE
+    'MIN_RATE': 0.5,
+    'RECOVERY_STEP': 0.5,
+}
+
+# Statusuri care indică o bancă degradată (pentru circuit)
+FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+_sleep = time.sleep
+_local_lock = threading.Lock()
+_warned_local_cache = False
+
+
+class BankUnavailable(requests.RequestException):
+    """Banca e considerată indisponibilă (circuit deschis sau limită de rată atinsă)"""
+
+
+def limits(name):
+    """Setările BANK_API_LIMITS pentru o bancă: implicite, apoi 'default', apoi cele proprii"""
+    configured = getattr(settings, 'BANK_API_LIMITS', {})
+    return {**DEFAULTS, **configured.get('default', {}), **configured.get(name, {})}
+
+
+def _cache():
+    global _warned_local_cache
+    cache = caches[getattr(settings, 'BANK_API_LIMITS_CACHE_ALIAS', 'default')]
+    if isinstance(cache, LocMemCache) and not _warned_local_cache:
+        _warned_local_cache = True
+        logger.warning(
+            "Bank API limits use a local-memory cache: circuit breaker and rate limit "
+            "state is per process, not shared between web and sync workers"
+        )
+    return cache
+
+
+class CircuitBreaker:
+    """
+    closed -> (FAILURE_THRESHOLD eșecuri) -> open -> (RECOVERY_TIMEOUT) -> half_open
+    În half_open trece o singură cerere de probă: succesul închide circuitul,
+    eșecul îl redeschide.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.config = limits(name)
+        self.key = f"finance:breaker:{name}"
+
+    def _opened_at(self):
+        return _cache().get(f"{self.key}:opened")
+
+    @property
+    def state(self):
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at < self.config['RECOVERY_TIMEOUT']:
+            return OPEN
+        return HALF_OPEN
+
+    def before_call(self):
+        """Ridică BankUnavailable dacă cererea nu are voie să plece"""
+        state = self.state
+        if state == CLOSED:
+            return
+        # Un singur proces câștigă proba; ceilalți eșuează rapid până la rezultat
+        if state == HALF_OPEN and _cache().add(f"{self.key}:probe", 1, self.config['RECOVERY_TIMEOUT']):
+            return
+        raise BankUnavailable(f"{self.name} API unavailable (circuit {state})")
+
+    def record_success(self):
+        keys = [f"{self.key}:opened", f"{self.key}:probe", f"{self.key}:failures"]
+        state = _cache().get_many(keys)
+        if not state:
+            return
+        if f"{self.key}:opened" in state:
+            logger.info(f"Circuit for {self.name} closed")
+        _cache().delete_many(keys)
+
+    def record_failure(self):
+        cache = _cache()
+        if self._opened_at() is not None:
+            # Proba din half_open a eșuat: redeschidem
+            self._open()
+            return
+        failures_key = f"{self.key}:failures"
+        cache.add(failures_key, 0, self.config['FAILURE_WINDOW'])
+        try:
+            failures = cache.incr(failures_key)
+        except ValueError:
+            # Cheia a expirat între add și incr
+            cache.set(failures_key, 1, self.config['FAILURE_WINDOW'])
+            failures = 1
+        if failures >= self.config['FAILURE_THRESHOLD']:
+            self._open()
+
+    def _open(self):
+        cache = _cache()
+        cache.set(f"{self.key}:opened", time.time(), None)
+        cache.delete_many([f"{self.key}:probe", f"{self.key}:failures"])
+        logger.warning(f"Circuit for {self.name} opened for {self.config['RECOVERY_TIMEOUT']}s")
+
+
+class TokenBucket:
+    """
+    Token bucket cu rată adaptivă: la 429 rata se înjumătățește, la succes crește
+    cu RECOVERY_STEP până la RATE. Citire-modificare-scriere în cache, protejată
+    local de un lock; între procese limita e aproximativă.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.config = limits(name)
+        self.key = f"finance:ratelimit:{name}"
+
+    def _state(self, now):
+        tokens, updated, rate = _cache().get(self.key) or (self.config['BURST'], now, self.config['RATE'])
+        tokens = min(self.config['BURST'], tokens + (now - updated) * rate)
+        return tokens, rate
+
+    def _save(self, tokens, now, rate):
+        _cache().set(self.key, (tokens, now, rate), 3600)
+
+    @property
+    def rate(self):
+        return self._state(time.time())[1]
+
+    def acquire(self):
+        """Ia un token, așteptând cel mult MAX_WAIT secunde; altfel BankUnavailable"""
+        deadline = time.time() + self.config['MAX_WAIT']
+        while True:
+            with _local_lock:
+                now = time.time()
+                tokens, rate = self._state(now)
+                if tokens >= 1:
+                    self._save(tokens - 1, now, rate)
+                    return
+                wait = (1 - tokens) / rate
+            if now + wait > deadline:
+                raise BankUnavailable(f"{self.name} API rate limit reached ({rate:g} req/s)")
+            _sleep(wait)
+
+    def throttle(self):
+        """Banca a răspuns 429: reducem rata"""
+        with _local_lock:
+            now = time.time()
+            tokens, rate = self._state(now)
+            rate = max(self.config['MIN_RATE'], rate / 2)
+            self._save(min(tokens, 0), now, rate)
+        logger.warning(f"{self.name} API throttled, rate lowered to {rate:g} req/s")
+
+    def recover(self):
+        """Cerere reușită: rata crește treptat înapoi spre RATE"""
+        with _local_lock:
+            now = time.time()
+            tokens, rate = self._state(now)
+            if rate < self.config['RATE']:
+                self._save(tokens, now, min(self.config['RATE'], rate + self.config['RECOVERY_STEP']))
+
+
+def call(name, func, *args, **kwargs):
+    """
+    Execută o cerere HTTP către banca name prin circuit breaker și limitator
+
+    Erorile de rețea și răspunsurile 5xx sunt eșecuri pentru circuit; 429 reduce rata.
+    """
+    breaker = CircuitBreaker(name)
+    bucket = TokenBucket(name)
+    breaker.before_call()
+    bucket.acquire()
+    try:
+        response = func(*args, **kwargs)
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+
+    if response.status_code in FAILURE_STATUSES:
+        breaker.record_failure()
+    elif response.status_code == 429:
+        bucket.throttle()
+    else:
+        breaker.record_success()
+        bucket.recover()
+    return response
@@ -6,10 +6,13 @@ import json
 import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db.models import Count, Sum
+from django.db.models.functions import Abs
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import BankTransaction
+from . import bt_pay_buckets
 from .bt_pay_service import BTPay
 
 
@@ -146,19 +149,13 @@ class BTPayliveConsumer(AsyncWebsocketConsumer):
         from django.contrib.auth.models import User
         user = User.objects.get(id=self.user_id)
         
-        stats_30 = BTPay.get_bt_pay_stats(user, days=30)
-        stats_today = BTPay.get_bt_pay_stats(user, days=1)
+        windows = BTPay.get_bt_pay_stats_windows(user, {'30d': 30, 'today': 1})
+        stats_30, stats_today = windows['30d'], windows['today']
         
         # Pending
-        pending = BankTransaction.objects.filter(
-            user=user,
-            sync_status='pending'
-        ).exclude(description__isnull=True).order_by('-date')
-        
-        pending_bt_pay = [
-            t for t in pending 
-            if BTPay.is_bt_pay_transaction(t.description)
-        ]
+        pending = BTPay.transactions(user, sync_status='pending').aggregate(
+            count=Count('pk'), total=Sum(Abs('amount')),
+        )
         
         # Recent
         recent = BankTransaction.objects.filter(
@@ -169,17 +166,17 @@ class BTPayliveConsumer(AsyncWebsocketConsumer):
         
         recent_list = [
             {
-                'merchant': BTPay.extract_merchant_name(t.description),
+                'merchant': t.merchant_normalized,
                 'amount': float(abs(t.amount)),
                 'date': t.date.isoformat(),
-                'category': BTPay.guess_category(t.description),
+                'category': t.category_guess or None,
             }
             for t in recent
         ]
         
         return {
-            'pending_count': len(pending_bt_pay),
-            'pending_amount': float(sum(abs(t.amount) for t in pending_bt_pay)),
+            'pending_count': pending['count'],
+            'pending_amount': float(pending['total'] or 0),
             'today_transactions': stats_today['total_transactions'],
             'today_amount': float(stats_today['total_amount']),
             'month_transactions': stats_30['total_transactions'],
@@ -202,27 +199,19 @@ class BTPayliveConsumer(AsyncWebsocketConsumer):
         from django.contrib.auth.models import User
         user = User.objects.get(id=self.user_id)
         
-        pending = BankTransaction.objects.filter(
-            user=user,
-            sync_status='pending'
-        ).exclude(description__isnull=True).order_by('-date')
-        
-        pending_bt_pay = [
-            t for t in pending 
-            if BTPay.is_bt_pay_transaction(t.description)
-        ]
+        pending_bt_pay = BTPay.transactions(user, sync_status='pending').order_by('-date')[:20]
         
         return [
             {
                 'id': t.id,
-                'merchant': BTPay.extract_merchant_name(t.description),
+                'merchant': t.merchant_normalized,
                 'amount': float(abs(t.amount)),
                 'currency': t.currency,
                 'date': t.date.isoformat(),
-                'category_guess': BTPay.guess_category(t.description),
+                'category_guess': t.category_guess or None,
                 'description': t.description,
             }
-            for t in pending_bt_pay[:20]
+            for t in pending_bt_pay
         ]
     
     @database_sync_to_async
@@ -231,33 +220,15 @@ class BTPayliveConsumer(AsyncWebsocketConsumer):
         from django.contrib.auth.models import User
         user = User.objects.get(id=self.user_id)
         
-        now = timezone.now()
-        hours_data = []
-        
-        for i in range(24, 0, -1):
-            hour_start = now - timedelta(hours=i)
-            hour_end = hour_start + timedelta(hours=1)
-            
-            transactions = BankTransaction.objects.filter(
-                user=user,
-                sync_status='synced',
-                date__gte=hour_start,
-                date__lt=hour_end
-            ).exclude(description__isnull=True)
-            
-            bt_pay_trans = [
-                t for t in transactions 
-                if BTPay.is_bt_pay_transaction(t.description)
-            ]
-            
-            hours_data.append({
-                'hour': hour_start.hour,
-                'timestamp': hour_start.isoformat(),
-                'count': len(bt_pay_trans),
-                'amount': float(sum(abs(t.amount) for t in bt_pay_trans)),
-            })
-        
-        return hours_data
+        return [
+            {
+                'hour': timezone.localtime(hour['start']).hour,
+                'timestamp': hour['start'].isoformat(),
+                'count': hour['count'],
+                'amount': float(hour['amount']),
+            }
+            for hour in bt_pay_buckets.series(user, hours=24)
+        ]
     
     @database_sync_to_async
     def get_category_data(self):
@@ -265,12 +236,12 @@ class BTPayliveConsumer(AsyncWebsocketConsumer):
         from django.contrib.auth.models import User
         user = User.objects.get(id=self.user_id)
         
-        stats_24h = BTPay.get_bt_pay_stats(user, days=1)
-        stats_7d = BTPay.get_bt_pay_stats(user, days=7)
+        today = bt_pay_buckets.category_totals(user, hours=24)
+        week = bt_pay_buckets.category_totals(user, days=7)
         
         categories = {}
-        for category, data in stats_7d['transactions_by_category'].items():
-            today_data = stats_24h['transactions_by_category'].get(category, {
+        for category, data in week.items():
+            today_data = today.get(category, {
                 'count': 0,
                 'total': 0
             })
@@ -294,12 +265,7 @@ class BTPayliveConsumer(AsyncWebsocketConsumer):
         from django.contrib.auth.models import User
         user = User.objects.get(id=self.user_id)
         
-        pending = BankTransaction.objects.filter(
-            user=user,
-            sync_status='pending'
-        ).exclude(description__isnull=True)
-        
-        return sum(1 for t in pending if BTPay.is_bt_pay_transaction(t.description))
+        return BTPay.transactions(user, sync_status='pending').count()
     
     @database_sync_to_async
     def run_auto_categorize(self):
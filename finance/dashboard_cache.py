@@ -0,0 +1,109 @@
+"""
+Cache per utilizator pentru datele dashboard-ului
+Payload-ul conține doar valori simple (serializabile de orice backend) și e
+invalidat din semnalele Transaction, Account și Budget
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .budget_service import BudgetEvaluator
+from .totals import user_totals
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _today():
+    return timezone.localdate()
+
+
+def cache_key(user_id, day=None):
+    """Cheia include ziua: tranzacțiile recente și bugetul lunii depind de ea"""
+    return f"finance:dashboard:{user_id}:{(day or _today()).isoformat()}"
+
+
+def build_dashboard(user, today=None):
+    """Calculează datele dashboard-ului direct din baza de date"""
+    today = today or _today()
+
+    accounts = [
+        {
+            'pk': account.pk,
+            'name': account.name,
+            'type_display': account.get_type_display(),
+            'balance': account.balance,
+            'currency': account.currency,
+        }
+        for account in user.accounts.all()
+    ]
+    total_balance = user.accounts.aggregate(Sum('balance'))['balance__sum'] or 0
+
+    recent_transactions = [
+        {
+            'date': transaction.date,
+            'category_name': transaction.category.name if transaction.category else '',
+            'type': transaction.type,
+            'type_display': transaction.get_type_display(),
+            'amount': transaction.amount,
+        }
+        for transaction in user.transactions.filter(
+            date__gte=today - timedelta(days=30)
+        ).select_related('category').order_by('-date')[:10]
+    ]
+
+    totals = user_totals(user)
+
+    budgets = [
+        {
+            'category_name': budget.category.name,
+            'amount': budget.amount,
+            'spent': budget.spent,
+            'remaining': budget.remaining,
+            'percentage': budget.percentage,
+        }
+        for budget in BudgetEvaluator.evaluate(user.budgets.filter(month=today.replace(day=1)))
+    ]
+
+    return {
+        'accounts': accounts,
+        'total_balance': total_balance,
+        'recent_transactions': recent_transactions,
+        'total_expenses': totals['expense'],
+        'total_income': totals['income'],
+        'net_income': totals['income'] - totals['expense'],
+        'totals_by_currency': totals['by_currency'],
+        'budgets': budgets,
+    }
+
+
+def get_dashboard(user):
+    """Datele dashboard-ului din cache, calculate doar la prima cerere"""
+    key = cache_key(user.pk)
+    payload = _cache().get(key)
+    if payload is None:
+        payload = build_dashboard(user)
+        _cache().set(key, payload, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return payload
+
+
+def invalidate_dashboard(user_id):
+    """
+    Șterge dashboard-ul din cache pentru un utilizator
+
+    Ștergem imediat și din nou după commit, ca o cerere concurentă să nu pună
+    înapoi în cache date citite înainte de commit.
+    """
+    if not user_id:
+        return
+    key = cache_key(user_id)
+    _cache().delete(key)
+    db_transaction.on_commit(lambda: _cache().delete(key))
@@ -9,6 +9,8 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import datetime
 
+from . import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -62,7 +64,7 @@ def send_discord_message(title: str, description: str = "", fields: dict = None,
             "embeds": [embed]
         }
         
-        response = requests.post(webhook_url, json=payload, timeout=10)
+        response = http_client.post('discord', webhook_url, json=payload)
         response.raise_for_status()
         
         logger.info(f"Discord notification sent: {title}")
@@ -169,16 +171,19 @@ def notify_budget_created(budget):
         return False
 
 
-def notify_budget_exceeded(budget, spent_amount):
+def notify_budget_exceeded(budget, spent_amount=None):
     """
     Send notification when a budget is exceeded
     
     Args:
         budget: Budget instance
-        spent_amount: Amount spent (Decimal)
+        spent_amount: Amount spent (Decimal); defaults to budget.spent
+            as set by BudgetEvaluator
     """
     try:
         user = budget.user
+        if spent_amount is None:
+            spent_amount = budget.spent
         currency = user.accounts.first().currency if user.accounts.exists() else 'RON'
         
         fields = {
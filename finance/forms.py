@@ -78,6 +78,71 @@ class FilterTransactionForm(forms.Form):
         widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
     )
 
+
+class BalanceHistoryForm(forms.Form):
+    """Form pentru parametrii istoricului de sold"""
+    MAX_DAYS = 366 * 10
+
+    start_date = forms.DateField(required=False)
+    end_date = forms.DateField(required=False)
+    interval = forms.ChoiceField(
+        choices=[('', 'Automat'), ('day', 'Zi'), ('week', 'Săptămână'), ('month', 'Lună')],
+        required=False,
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date:
+            if start_date > end_date:
+                raise forms.ValidationError('Data de început trebuie să fie înaintea datei de sfârșit.')
+            if (end_date - start_date).days > self.MAX_DAYS:
+                raise forms.ValidationError('Perioada maximă este de 10 ani.')
+        return cleaned_data
+
+
+class ReportForm(forms.Form):
+    """Form pentru perioada și granularitatea rapoartelor"""
+    MAX_DAYS = 366 * 10
+
+    period = forms.ChoiceField(
+        choices=[('month', 'Lună'), ('quarter', 'Trimestru'), ('year', 'An'), ('custom', 'Personalizat')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    granularity = forms.ChoiceField(
+        choices=[('', 'Automat'), ('day', 'Zi'), ('week', 'Săptămână'), ('month', 'Lună')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('period') == 'custom':
+            start_date = cleaned_data.get('start_date')
+            end_date = cleaned_data.get('end_date')
+            if not start_date or not end_date:
+                raise forms.ValidationError('Perioada personalizată necesită data de început și de sfârșit.')
+            if start_date > end_date:
+                raise forms.ValidationError('Data de început trebuie să fie înaintea datei de sfârșit.')
+            if (end_date - start_date).days > self.MAX_DAYS:
+                raise forms.ValidationError('Perioada maximă este de 10 ani.')
+        return cleaned_data
+
+
 class BankConnectionForm(forms.ModelForm):
     """Form pentru conectare bănci"""
     class Meta:
@@ -104,6 +169,12 @@ class BankTransactionSyncForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'form-control', 'type': 'number'}),
         label='Sincronizează tranzacții din ultimele N zile'
     )
+    full_resync = forms.BooleanField(
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        label='Resincronizare completă (ignoră ultima sincronizare)'
+    )
     auto_create_transactions = forms.BooleanField(
         required=False,
         initial=True,
@@ -112,6 +183,13 @@ class BankTransactionSyncForm(forms.Form):
     )
 
 
+class SyncRunFilterForm(forms.Form):
+    """Form pentru lista rulărilor de sincronizare"""
+    days = forms.IntegerField(min_value=1, max_value=90, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=200, required=False)
+    connection = forms.IntegerField(min_value=1, required=False)
+
+
 class BankTransactionReviewForm(forms.Form):
     """Form pentru revizuire și editare tranzacții din bănci"""
     category = forms.ModelChoiceField(
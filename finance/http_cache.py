@@ -0,0 +1,112 @@
+"""
+Cache HTTP pentru endpoint-urile JSON interogate periodic (rapoarte, BT Pay)
+ETag/Last-Modified derivate din versiunea datelor utilizatorului (UserDataVersion),
+răspunsuri gzip și un format compact pe coloane (?layout=columns)
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+
+from .models import UserDataVersion
+
+logger = logging.getLogger(__name__)
+
+# Separatori fără spații pentru JSON compact
+COMPACT_SEPARATORS = (',', ':')
+
+
+def bump_data_version(user_id, create=True):
+    """
+    Incrementează versiunea datelor unui utilizator, atomic
+
+    La ștergeri create=False: nu creăm rânduri pentru un utilizator șters în cascadă.
+    """
+    if not user_id:
+        return
+    changes = {'version': F('version') + 1, 'changed_at': timezone.now()}
+    if UserDataVersion.objects.filter(user_id=user_id).update(**changes) or not create:
+        return
+    try:
+        with db_transaction.atomic():
+            UserDataVersion.objects.create(user_id=user_id, version=1)
+    except IntegrityError:
+        # Creat concurent de altă cerere
+        UserDataVersion.objects.filter(user_id=user_id).update(**changes)
+
+
+def _version(request):
+    """(versiune, momentul ultimei modificări) - citit o singură dată per cerere"""
+    if not hasattr(request, '_data_version'):
+        row = UserDataVersion.objects.filter(user_id=request.user.pk).values_list(
+            'version', 'changed_at'
+        ).first()
+        request._data_version = row or (0, datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+    return request._data_version
+
+
+def _bucket_start(bucket_seconds):
+    now = int(timezone.now().timestamp())
+    return now - now % bucket_seconds
+
+
+def http_cached(bucket_seconds=60):
+    """
+    ETag/Last-Modified per utilizator pentru un view GET, plus gzip
+
+    Răspunsul e considerat neschimbat cât timp versiunea datelor și intervalul de
+    timp (bucket_seconds, pentru ferestrele relative la "acum") rămân aceleași.
+    """
+    def etag_func(request, *args, **kwargs):
+        version, _ = _version(request)
+        key = f"{request.user.pk}:{version}:{_bucket_start(bucket_seconds)}:{request.get_full_path()}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        _, changed_at = _version(request)
+        bucket = datetime.fromtimestamp(_bucket_start(bucket_seconds), tz=dt_timezone.utc)
+        return max(changed_at, bucket)
+
+    def decorator(view_func):
+        conditional_view = gzip_page(condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func))
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Răspuns privat, revalidat la fiecare cerere (ieftin datorită 304)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def columns(records, fields=None):
+    """Transformă o listă de dict-uri în {'fields': [...], 'values': [[...], ...]} pe coloane"""
+    if fields is None:
+        fields = list(records[0].keys()) if records else []
+    return {
+        'fields': fields,
+        'values': [[record.get(field) for record in records] for field in fields],
+    }
+
+
+def layout(request, records):
+    """Lista de înregistrări în formatul cerut (?layout=columns pentru coloane)"""
+    if request.GET.get('layout') == 'columns':
+        return columns(records)
+    return records
+
+
+def compact_json_response(data, **kwargs):
+    """JsonResponse fără spații inutile"""
+    kwargs.setdefault('json_dumps_params', {'separators': COMPACT_SEPARATORS})
+    return JsonResponse(data, **kwargs)
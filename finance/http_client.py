@@ -0,0 +1,145 @@
+"""
+Client HTTP comun pentru integrările externe (bănci, Supabase, Discord)
+O sesiune requests per serviciu, cu pool de conexiuni keep-alive per host,
+timeout-uri configurabile și reîncercări cu backoff exponențial, jitter și Retry-After
+"""
+import logging
+import random
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 20,
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 10,
+    'RETRIES': 3,
+    'BACKOFF_FACTOR': 0.5,
+    'BACKOFF_MAX': 30,
+    'BACKOFF_JITTER': 0.5,
+    'STATUS_FORCELIST': (429, 500, 502, 503, 504),
+}
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def client_settings(name):
+    """Setările HTTP_CLIENT pentru un serviciu: implicite, apoi 'default', apoi cele proprii"""
+    configured = getattr(settings, 'HTTP_CLIENT', {})
+    return {**DEFAULTS, **configured.get('default', {}), **configured.get(name, {})}
+
+
+class BackoffRetry(Retry):
+    """
+    Retry cu jitter aleator peste backoff-ul exponențial și plafon propriu
+
+    429 și 503 înseamnă că serverul nu a procesat cererea, deci le repetăm și
+    pentru metode neidempotente (ex: POST la webhook-uri); celelalte erori 5xx
+    se repetă doar pentru metodele idempotente.
+    """
+
+    REPEATABLE_STATUSES = frozenset({429, 503})
+
+    def __init__(self, *args, jitter=0.0, cap=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jitter = jitter
+        self.cap = cap
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.jitter = self.jitter
+        retry.cap = self.cap
+        return retry
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        backoff += random.uniform(0, backoff * self.jitter)
+        return min(backoff, self.cap) if self.cap else backoff
+
+    def get_retry_after(self, response):
+        # Retry-After vine de la server; fără plafon un 503 cu o oră ar bloca
+        # worker-ul (sau tranzacția din care trimitem webhook-ul) o oră
+        retry_after = super().get_retry_after(response)
+        if retry_after is not None and self.cap:
+            return min(retry_after, self.cap)
+        return retry_after
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code in self.REPEATABLE_STATUSES and not self._is_method_retryable(method):
+            return bool(self.total) and status_code in (self.status_forcelist or ())
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def build_session(name):
+    """Creează o sesiune nouă configurată pentru un serviciu"""
+    config = client_settings(name)
+    retry = BackoffRetry(
+        total=config['RETRIES'],
+        connect=config['RETRIES'],
+        read=config['RETRIES'],
+        status=config['RETRIES'],
+        backoff_factor=config['BACKOFF_FACTOR'],
+        status_forcelist=tuple(config['STATUS_FORCELIST']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        jitter=config['BACKOFF_JITTER'],
+        cap=config['BACKOFF_MAX'],
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_MAXSIZE'],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(name='default'):
+    """
+    Sesiunea partajată a unui serviciu (creată o singură dată per proces)
+
+    Pool-ul de conexiuni al adaptorului e thread-safe, deci sesiunea poate fi
+    folosită și din thread-urile motorului de sincronizare.
+    """
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = build_session(name)
+    return session
+
+
+def reset_sessions():
+    """Închide și uită toate sesiunile (ex: după schimbarea setărilor)"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def request(name, method, url, **kwargs):
+    """Trimite o cerere prin sesiunea serviciului, cu timeout-ul implicit al acestuia"""
+    if 'timeout' not in kwargs:
+        config = client_settings(name)
+        kwargs['timeout'] = (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+    return get_session(name).request(method, url, **kwargs)
+
+
+def get(name, url, **kwargs):
+    return request(name, 'GET', url, **kwargs)
+
+
+def post(name, url, **kwargs):
+    return request(name, 'POST', url, **kwargs)
@@ -0,0 +1,169 @@
+"""
+Registrul soldurilor conturilor
+Actualizări atomice ale soldului (fără read-modify-write) și snapshot-uri zilnice
+pentru calculul soldului la o dată oarecare
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Account, AccountBalanceSnapshot, Transaction
+
+logger = logging.getLogger(__name__)
+
+SIGNED_AMOUNT = Case(
+    When(type='income', then=F('amount')),
+    default=-F('amount'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def signed_amount(transaction):
+    """Efectul unei tranzacții asupra soldului: + pentru venit, - pentru cheltuială"""
+    amount = Decimal(str(transaction.amount or 0))
+    return amount if transaction.type == 'income' else -amount
+
+
+def ledger_entry(transaction):
+    """Intrarea în registru a unei tranzacții: (account_id, date, sumă cu semn)"""
+    return (
+        transaction.account_id,
+        Transaction._meta.get_field('date').to_python(transaction.date),
+        signed_amount(transaction),
+    )
+
+
+def apply_balance_delta(account_id, delta, day=None):
+    """
+    Adaugă delta la soldul contului direct în baza de date
+
+    Dacă ziua e cunoscută, corectează și snapshot-urile de la acea zi încolo,
+    ca tranzacțiile introduse retroactiv să nu le invalideze.
+    """
+    if not delta:
+        return
+    Account.objects.filter(pk=account_id).update(
+        balance=F('balance') + delta,
+        updated_at=timezone.now(),
+    )
+    if day is not None:
+        AccountBalanceSnapshot.objects.filter(account_id=account_id, date__gte=day).update(
+            balance=F('balance') + delta,
+        )
+
+
+def _apply_entry(entry, sign):
+    account_id, day, amount = entry
+    apply_balance_delta(account_id, amount * sign, day)
+
+
+def record_transaction(transaction):
+    """Salvează o tranzacție nouă și îi aplică efectul asupra soldului, atomic"""
+    with db_transaction.atomic():
+        transaction.save()
+        _apply_entry(ledger_entry(transaction), 1)
+    return transaction
+
+
+def move_transaction(previous, transaction):
+    """
+    Aplică pe sold diferența unei tranzacții editate (inclusiv schimbarea contului)
+
+    Args:
+        previous: ledger_entry(tranzacție) citit înainte de editare
+        transaction: tranzacția după salvare
+    """
+    current = ledger_entry(transaction)
+    if previous == current:
+        return
+    _apply_entry(previous, -1)
+    _apply_entry(current, 1)
+
+
+def remove_transaction(transaction):
+    """
+    Șterge o tranzacție și îi anulează efectul asupra soldului, atomic
+
+    Returns:
+        bool: False dacă tranzacția fusese deja ștearsă de altă cerere
+    """
+    with db_transaction.atomic():
+        locked = Transaction.objects.select_for_update().filter(pk=transaction.pk).first()
+        if locked is None:
+            return False
+        _apply_entry(ledger_entry(locked), -1)
+        locked.delete()
+    return True
+
+
+def net_change(account, after=None, until=None):
+    """Suma efectelor tranzacțiilor din intervalul (after, until] asupra contului"""
+    transactions = Transaction.objects.filter(account=account)
+    if after is not None:
+        transactions = transactions.filter(date__gt=after)
+    if until is not None:
+        transactions = transactions.filter(date__lte=until)
+
+    return transactions.aggregate(
+        net=Coalesce(Sum(SIGNED_AMOUNT), Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    )['net']
+
+
+def balance_at(account, day):
+    """
+    Soldul contului la sfârșitul unei zile
+
+    Pornește de la cel mai apropiat snapshot (căutare pe index) și aplică doar
+    tranzacțiile dintre snapshot și ziua cerută.
+    """
+    snapshots = AccountBalanceSnapshot.objects.filter(account=account)
+
+    before = snapshots.filter(date__lte=day).order_by('-date').first()
+    if before:
+        return before.balance + net_change(account, after=before.date, until=day)
+
+    after = snapshots.filter(date__gt=day).order_by('date').first()
+    if after:
+        return after.balance - net_change(account, after=day, until=after.date)
+
+    account.refresh_from_db(fields=['balance'])
+    return account.balance - net_change(account, after=day)
+
+
+def snapshot_balances(day=None, accounts=None):
+    """
+    Scrie snapshot-ul soldului la sfârșitul unei zile pentru conturi (implicit toate)
+
+    Soldul e cel curent minus tranzacțiile datate după acea zi, calculate într-o
+    singură interogare grupată pe cont.
+
+    Returns:
+        int: numărul de snapshot-uri scrise
+    """
+    day = day or timezone.now().date()
+    if accounts is None:
+        accounts = Account.objects.all()
+
+    later = dict(
+        Transaction.objects.filter(
+            account__in=accounts, date__gt=day,
+        ).values('account_id').annotate(net=Sum(SIGNED_AMOUNT)).order_by().values_list('account_id', 'net')
+    )
+    snapshots = [
+        AccountBalanceSnapshot(account_id=account_id, date=day, balance=balance - later.get(account_id, 0))
+        for account_id, balance in accounts.values_list('id', 'balance').iterator()
+    ]
+    AccountBalanceSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['account', 'date'],
+        update_fields=['balance'],
+    )
+
+    logger.info(f"Wrote {len(snapshots)} account balance snapshots for {day}")
+    return len(snapshots)
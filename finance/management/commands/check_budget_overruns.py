@@ -0,0 +1,50 @@
+"""
+Management command pentru detectarea bugetelor depășite
+Folosire: python manage.py check_budget_overruns [--month YYYY-MM] [--notify]
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from finance.budget_service import BudgetEvaluator
+from finance.discord_notifications import notify_budget_exceeded
+
+
+class Command(BaseCommand):
+    help = 'Detectează bugetele depășite pentru toți utilizatorii într-o singură trecere'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=str,
+            help='Luna verificată, format YYYY-MM (default: luna curentă)',
+        )
+        parser.add_argument(
+            '--notify',
+            action='store_true',
+            help='Trimite notificare Discord pentru fiecare buget depășit',
+        )
+
+    def handle(self, *args, **options):
+        month_arg = options.get('month')
+
+        if month_arg:
+            try:
+                month = datetime.strptime(month_arg, '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Lună invalidă: {month_arg} (format YYYY-MM)")
+        else:
+            month = timezone.now().date().replace(day=1)
+
+        overruns = BudgetEvaluator.overruns(month=month)
+
+        for budget in overruns:
+            self.stdout.write(
+                f"  ✗ {budget.user.username} - {budget.category.name}: "
+                f"{budget.spent} / {budget.amount} ({budget.percentage:.0f}%)"
+            )
+            if options.get('notify'):
+                notify_budget_exceeded(budget)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✓ {len(overruns)} bugete depășite în {month.strftime('%m.%Y')}")
+        )
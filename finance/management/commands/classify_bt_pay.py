@@ -0,0 +1,62 @@
+"""
+Management command pentru (re)clasificarea tranzacțiilor bancare BT Pay
+Folosire: python manage.py classify_bt_pay [--user ID] [--all]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.bt_pay_buckets import rebuild_buckets
+from finance.bt_pay_service import BTPay
+from finance.merchant_sketch import rebuild_sketch
+from finance.models import BankTransaction
+
+
+class Command(BaseCommand):
+    help = 'Completează is_bt_pay, comerciantul și categoria pentru tranzacțiile cu reguli vechi'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, toți utilizatorii)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reclasifică toate tranzacțiile, indiferent de versiune',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rânduri actualizate per lot (implicit 1000)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = BankTransaction.objects.all()
+        user_id = options.get('user')
+        user = None
+
+        if user_id:
+            try:
+                user = User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+            queryset = queryset.filter(user=user)
+            self.stdout.write(f"Clasificare BT Pay pentru utilizatorul: {user.username}")
+        else:
+            self.stdout.write("Clasificare BT Pay pentru toți utilizatorii")
+
+        if options['all']:
+            queryset.update(classification_version=0)
+
+        updated = BTPay.reclassify(queryset, batch_size=options['batch_size'])
+        if updated:
+            # Categoriile și comercianții s-au putut schimba: rollup-ul și schițele se recalculează
+            rebuild_buckets(user)
+            users = [user] if user else User.objects.filter(bank_transactions__is_bt_pay=True).distinct()
+            for owner in users:
+                rebuild_sketch(owner)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Clasificate {updated} tranzacții (versiunea {BTPay.CLASSIFICATION_VERSION})!")
+        )
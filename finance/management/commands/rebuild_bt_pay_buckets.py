@@ -0,0 +1,37 @@
+"""
+Management command pentru reconstruirea rollup-ului BT Pay pe ore și zile
+Folosire: python manage.py rebuild_bt_pay_buckets [--user ID]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.bt_pay_buckets import rebuild_buckets
+
+
+class Command(BaseCommand):
+    help = 'Reconstruiește de la zero rollup-ul BT Pay pe ore și zile din tranzacțiile bancare'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, reconstruiește pentru toți)',
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user')
+        user = None
+
+        if user_id:
+            try:
+                user = User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+            self.stdout.write(f"Reconstruire rollup BT Pay pentru utilizatorul: {user.username}")
+        else:
+            self.stdout.write("Reconstruire rollup BT Pay pentru toți utilizatorii")
+
+        rows = rebuild_buckets(user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Reconstruite {rows} intervale BT Pay!")
+        )
@@ -0,0 +1,37 @@
+"""
+Management command pentru reconstruirea variațiilor zilnice ale soldurilor
+Folosire: python manage.py rebuild_daily_flows [--user ID]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.balance_history import rebuild_daily_flows
+
+
+class Command(BaseCommand):
+    help = 'Reconstruiește de la zero variațiile zilnice ale soldurilor din tranzacții'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, reconstruiește pentru toți)',
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user')
+        user = None
+
+        if user_id:
+            try:
+                user = User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+            self.stdout.write(f"Reconstruire istoric sold pentru utilizatorul: {user.username}")
+        else:
+            self.stdout.write("Reconstruire istoric sold pentru toți utilizatorii")
+
+        rows = rebuild_daily_flows(user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Reconstruite {rows} variații zilnice!")
+        )
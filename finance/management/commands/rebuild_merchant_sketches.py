@@ -0,0 +1,43 @@
+"""
+Management command pentru reconstruirea schițelor top comercianți BT Pay
+Folosire: python manage.py rebuild_merchant_sketches [--user ID] [--capacity N]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.merchant_sketch import rebuild_sketch
+
+
+class Command(BaseCommand):
+    help = 'Reconstruiește exact, din tranzacțiile bancare, schițele Space-Saving ale comercianților BT Pay'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, toți utilizatorii cu tranzacții BT Pay)',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            help='Numărul de contoare per utilizator (implicit se păstrează cel existent)',
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user')
+
+        if user_id:
+            try:
+                users = [User.objects.get(id=user_id)]
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+        else:
+            users = User.objects.filter(bank_transactions__is_bt_pay=True).distinct()
+
+        rebuilt = 0
+        for user in users:
+            rebuild_sketch(user, capacity=options.get('capacity'))
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Reconstruite {rebuilt} schițe de comercianți!")
+        )
@@ -0,0 +1,37 @@
+"""
+Management command pentru reconstruirea rollup-ului lunar pe categorii
+Folosire: python manage.py rebuild_monthly_totals [--user ID]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.rollups import rebuild_monthly_totals
+
+
+class Command(BaseCommand):
+    help = 'Reconstruiește de la zero totalurile lunare pe categorii din tranzacții'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, reconstruiește pentru toți)',
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user')
+        user = None
+
+        if user_id:
+            try:
+                user = User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+            self.stdout.write(f"Reconstruire rollup pentru utilizatorul: {user.username}")
+        else:
+            self.stdout.write("Reconstruire rollup pentru toți utilizatorii")
+
+        rows = rebuild_monthly_totals(user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Reconstruite {rows} rânduri de totaluri lunare!")
+        )
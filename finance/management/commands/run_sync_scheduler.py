@@ -0,0 +1,49 @@
+"""
+Management command pentru planificatorul de sincronizare bancară (proces de lungă durată)
+Folosire: python manage.py run_sync_scheduler [--max-concurrent N] [--once]
+Fiecare conexiune e sincronizată la intervalul ei adaptiv, cu cel mult N sincronizări simultane
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+from finance.sync_scheduler import SyncScheduler
+
+
+class Command(BaseCommand):
+    help = 'Rulează continuu sincronizarea bancară, planificată per conexiune'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-concurrent',
+            type=int,
+            help='Sincronizări simultane (default: BANK_SYNC["SCHEDULER"]["MAX_CONCURRENT"])',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Sincronizează conexiunile scadente o singură dată și iese (ex: din cron)',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = SyncScheduler(max_concurrent=options.get('max_concurrent'))
+
+        if options.get('once'):
+            results = scheduler.run_once()
+            synced = sum(result.synced for result in results)
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ {len(results)} conexiuni scadente, {synced} tranzacții noi")
+            )
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write("Oprire după sincronizările în curs...")
+            scheduler.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write(
+            f"Planificator pornit (cel mult {scheduler.max_concurrent} sincronizări simultane)"
+        )
+        scheduler.run()
+        self.stdout.write(self.style.SUCCESS("✓ Planificator oprit"))
@@ -0,0 +1,69 @@
+"""
+Management command pentru worker-ul cozii de sincronizare bancară (SyncJob)
+Folosire: python manage.py run_sync_worker [--once] [--poll-interval SECUNDE]
+Execută joburile puse în coadă de view-uri, în afara cererilor web
+"""
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from finance.sync_jobs import claim_next_job, recover_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Execută joburile de sincronizare bancară din coadă'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Execută joburile aflate acum în coadă și iese',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Secunde între verificările cozii când e goală (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        stop = threading.Event()
+
+        if not options.get('once'):
+            def shutdown(signum, frame):
+                self.stdout.write("Oprire după jobul curent...")
+                stop.set()
+
+            signal.signal(signal.SIGTERM, shutdown)
+            signal.signal(signal.SIGINT, shutdown)
+
+        requeued, failed = recover_stale_jobs()
+        if requeued or failed:
+            self.stdout.write(f"Joburi blocate: {requeued} repuse în coadă, {failed} eșuate")
+
+        self.stdout.write(f"Worker {worker} pornit")
+        layer = (getattr(settings, 'CHANNEL_LAYERS', None) or {}).get('default', {}).get('BACKEND', '')
+        if layer.endswith('InMemoryChannelLayer'):
+            self.stdout.write(self.style.WARNING(
+                "Channel layer în memorie: notificările nu ajung la daphne (setează REDIS_URL); "
+                "starea joburilor rămâne disponibilă în /finance/api/bank-sync/jobs/<id>/"
+            ))
+        processed = 0
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_next_job(worker)
+            if job is None:
+                if options.get('once'):
+                    break
+                stop.wait(options['poll_interval'])
+                continue
+
+            job = run_job(job)
+            processed += 1
+            style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+            self.stdout.write(style(f"  Job #{job.pk} ({job.kind}, utilizator {job.user_id}): {job.status}"))
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {processed} joburi executate"))
@@ -0,0 +1,50 @@
+"""
+Management command pentru snapshot-ul zilnic al soldurilor conturilor
+Folosire: python manage.py snapshot_account_balances [--date YYYY-MM-DD] [--user ID]
+Rulat periodic (ex: cron zilnic) ca balance_at să citească doar tranzacțiile recente
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.ledger import snapshot_balances
+from finance.models import Account
+
+
+class Command(BaseCommand):
+    help = 'Scrie snapshot-ul soldului fiecărui cont la sfârșitul unei zile'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Ziua snapshot-ului (YYYY-MM-DD, implicit azi)',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, toate conturile)',
+        )
+
+    def handle(self, *args, **options):
+        day = None
+        if options.get('date'):
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Data trebuie să fie în formatul YYYY-MM-DD")
+
+        accounts = Account.objects.all()
+        user_id = options.get('user')
+        if user_id:
+            try:
+                user = User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+            accounts = accounts.filter(user=user)
+
+        written = snapshot_balances(day, accounts)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Scrise {written} snapshot-uri de sold!")
+        )
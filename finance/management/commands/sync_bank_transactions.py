@@ -1,11 +1,12 @@
 """
 Management command pentru sincronizarea periodică a tranzacțiilor bancare
-Folosire: python manage.py sync_bank_transactions
+Folosire: python manage.py sync_bank_transactions [--user ID] [--days N] [--bank bt|revolut] [--workers N] [--full] [--resume-failed]
 """
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
-from finance.bank_services import sync_all_banks, update_account_balance
 from finance.models import BankConnection
+from finance.sync_engine import SyncEngine
+from finance.sync_runs import connections_to_resume
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +25,7 @@ class Command(BaseCommand):
             '--days',
             type=int,
             default=30,
-            help='Sincronizează tranzacții din ultimele N zile (default: 30)',
+            help='Fereastra primei sincronizări / a resincronizării complete, în zile (default: 30)',
         )
         parser.add_argument(
             '--bank',
@@ -32,16 +33,33 @@ class Command(BaseCommand):
             choices=['bt', 'revolut'],
             help='Sincronizează doar o bancă specifică',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Numărul de conexiuni sincronizate în paralel (default: BANK_SYNC["MAX_WORKERS"])',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignoră cursoarele și re-descarcă ultimele N zile',
+        )
+        parser.add_argument(
+            '--resume-failed',
+            action='store_true',
+            help='Doar conexiunile a căror ultimă rulare a eșuat, reluate de la ultima pagină salvată',
+        )
 
     def handle(self, *args, **options):
         user_id = options.get('user')
         days_back = options.get('days')
         bank_filter = options.get('bank')
 
+        connections = BankConnection.objects.filter(is_active=True)
+
         if user_id:
             try:
                 user = User.objects.get(id=user_id)
-                users = [user]
+                connections = connections.filter(user=user)
                 self.stdout.write(f"Sincronizare pentru utilizatorul: {user.username}")
             except User.DoesNotExist:
                 raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
@@ -49,46 +67,35 @@ class Command(BaseCommand):
             users = User.objects.filter(bank_connections__isnull=False).distinct()
             self.stdout.write(f"Sincronizare pentru {users.count()} utilizatori")
 
-        total_synced = 0
+        if bank_filter:
+            connections = connections.filter(bank=bank_filter)
 
-        for user in users:
-            try:
-                self.stdout.write(f"\n► Sincronizare {user.username}...")
+        if options.get('resume_failed'):
+            connections = connections_to_resume(connections)
+            self.stdout.write(f"Reluare pentru {connections.count()} conexiuni eșuate")
 
-                connections = BankConnection.objects.filter(
-                    user=user,
-                    is_active=True
-                )
+        engine = SyncEngine(max_workers=options.get('workers'), days_back=days_back, full=options.get('full'))
+        report = engine.run(connections)
 
-                if bank_filter:
-                    connections = connections.filter(bank=bank_filter)
-
-                for connection in connections:
-                    try:
-                        self.stdout.write(f"  ► {connection.get_bank_display()}...", ending='')
-
-                        from finance.bank_services import BankServiceFactory
-                        service = BankServiceFactory.get_service(connection)
-                        synced = service.sync_transactions(days_back=days_back)
-
-                        # Actualizează soldul
-                        update_account_balance(connection)
-
-                        self.stdout.write(f" ✓ ({synced} tranzacții)")
-                        total_synced += synced
-
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f"  ✗ Eroare: {str(e)}")
-                        )
-                        logger.error(f"Sync error for {connection.get_bank_display()}: {str(e)}")
-
-            except Exception as e:
+        for result in report.results:
+            if result.ok:
+                self.stdout.write(
+                    f"  ✓ {result.bank_display} #{result.connection_id} "
+                    f"(utilizator {result.user_id}): {result.synced} tranzacții în {result.duration:.1f}s"
+                )
+            else:
                 self.stdout.write(
-                    self.style.ERROR(f"✗ Eroare pentru {user.username}: {str(e)}")
+                    self.style.ERROR(f"  ✗ {result.bank_display} #{result.connection_id}: {result.error}")
                 )
-                logger.error(f"Error syncing user {user.username}: {str(e)}")
+
+        if report.failed:
+            self.stdout.write(
+                self.style.WARNING(f"\n⚠ {len(report.failed)} conexiuni au eșuat")
+            )
 
         self.stdout.write(
-            self.style.SUCCESS(f"\n✓ Sincronizate total {total_synced} tranzacții!")
+            self.style.SUCCESS(
+                f"\n✓ Sincronizate total {report.total_synced} tranzacții "
+                f"din {len(report.results)} conexiuni în {report.duration:.1f}s!"
+            )
         )
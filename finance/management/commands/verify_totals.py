@@ -0,0 +1,54 @@
+"""
+Management command pentru verificarea totalurilor all-time ale utilizatorilor
+Folosire: python manage.py verify_totals [--user ID] [--dry-run]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from finance.totals import verify_totals
+
+
+class Command(BaseCommand):
+    help = 'Compară totalurile stocate (UserTotals) cu tranzacțiile și repară abaterile'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID-ul utilizatorului (dacă omis, verifică toți utilizatorii)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Doar raportează abaterile, fără să le repare',
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user')
+        user = None
+
+        if user_id:
+            try:
+                user = User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilizatorul cu ID {user_id} nu există")
+
+        dry_run = options.get('dry_run')
+        drifts = verify_totals(user, repair=not dry_run)
+
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS("✓ Totalurile sunt consistente!"))
+            return
+
+        for drift_user_id, currency, stored, expected in drifts:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Utilizator {drift_user_id} ({currency}): "
+                    f"stocat venituri={stored[0]} cheltuieli={stored[1]} nr={stored[2]}, "
+                    f"calculat venituri={expected[0]} cheltuieli={expected[1]} nr={expected[2]}"
+                )
+            )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"⚠ {len(drifts)} abateri găsite (nereparate, --dry-run)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Reparate {len(drifts)} abateri!"))
@@ -0,0 +1,150 @@
+"""
+Top comercianți BT Pay pe tot istoricul, cu memorie proporțională cu K
+Space-Saving ponderat (Metwally et al.): capacity contoare per utilizator,
+actualizate la ingestie; fiecare contor are o limită superioară a sumei și
+eroarea maximă, deci clasamentul vine cu garanții. Ștergerile nu se scad
+(structura nu le suportă): după ștergeri masive, rebuild_merchant_sketches
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Abs
+
+from .models import BankTransaction, MerchantSketch
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = 'Unknown'
+
+
+def to_cents(amount):
+    return int(round(abs(amount) * 100))
+
+
+class SpaceSaving:
+    """
+    Space-Saving ponderat cu cel mult capacity contoare
+
+    Pentru fiecare comerciant urmărit: suma reală e între weight - error și weight,
+    iar count numără doar tranzacțiile de la intrarea lui în schiță.
+    Orice comerciant neurmărit are suma reală cel mult floor.
+    """
+
+    def __init__(self, capacity, counters=()):
+        self.capacity = capacity
+        self.counters = {name: [weight, count, error] for name, weight, count, error in counters}
+
+    @property
+    def floor(self):
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def add(self, name, weight, count=1):
+        counter = self.counters.get(name)
+        if counter is not None:
+            counter[0] += weight
+            counter[1] += count
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[name] = [weight, count, 0]
+            return
+        # Înlocuim contorul minim; noul comerciant moștenește suma lui ca eroare
+        victim = min(self.counters, key=lambda key: self.counters[key][0])
+        floor = self.counters.pop(victim)[0]
+        self.counters[name] = [floor + weight, count, floor]
+
+    def top(self, k):
+        """
+        Primii k comercianți după suma estimată
+
+        Returns:
+            list: (nume, sumă, număr, eroare, garantat); garantat = sigur în top k real
+        """
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        threshold = ranked[k][1][0] if len(ranked) > k else self.floor
+        return [
+            (name, weight, count, error, weight - error >= threshold)
+            for name, (weight, count, error) in ranked[:k]
+        ]
+
+    def to_list(self):
+        return [[name, weight, count, error] for name, (weight, count, error) in self.counters.items()]
+
+
+def add_transactions(bank_transactions):
+    """Adaugă tranzacțiile BT Pay noi în schițele proprietarilor (grupate per comerciant)"""
+    by_user = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for bank_transaction in bank_transactions:
+        if not bank_transaction.is_bt_pay:
+            continue
+        merchant = by_user[bank_transaction.user_id][bank_transaction.merchant_normalized or UNKNOWN]
+        merchant[0] += to_cents(bank_transaction.amount)
+        merchant[1] += 1
+
+    for user_id, merchants in by_user.items():
+        with db_transaction.atomic():
+            sketch, _ = MerchantSketch.objects.select_for_update().get_or_create(user_id=user_id)
+            space_saving = SpaceSaving(sketch.capacity, sketch.counters)
+            # Cele mai mari primele: intră în schiță înaintea celor mici
+            for name, (weight, count) in sorted(merchants.items(), key=lambda item: item[1][0], reverse=True):
+                space_saving.add(name, weight, count)
+                sketch.total_cents += weight
+            sketch.counters = space_saving.to_list()
+            sketch.save(update_fields=['counters', 'total_cents', 'updated_at'])
+    return len(by_user)
+
+
+def rebuild_sketch(user, capacity=None):
+    """
+    Reconstruiește schița unui utilizator, exact, din tranzacțiile bancare
+
+    Se păstrează primii capacity comercianți cu sumele exacte (eroare 0); cei
+    rămași au sume cel mult egale cu minimul păstrat, deci garanțiile rămân valabile.
+    """
+    grouped = BankTransaction.objects.filter(user=user, is_bt_pay=True).values(
+        'merchant_normalized',
+    ).annotate(total=Sum(Abs('amount')), count=Count('id')).order_by('-total')
+
+    sketch, _ = MerchantSketch.objects.get_or_create(user=user)
+    if capacity:
+        sketch.capacity = capacity
+    counters = {}
+    total = 0
+    for row in grouped.iterator():
+        cents = to_cents(row['total'])
+        total += cents
+        name = row['merchant_normalized'] or UNKNOWN
+        if name in counters or len(counters) < sketch.capacity:
+            weight, count, _ = counters.get(name, (0, 0, 0))
+            counters[name] = (weight + cents, count + row['count'], 0)
+    sketch.counters = [[name, weight, count, error] for name, (weight, count, error) in counters.items()]
+    sketch.total_cents = total
+    sketch.save()
+    logger.info(f"Rebuilt merchant sketch for user {user.pk}: {len(counters)} merchants")
+    return sketch
+
+
+def top_merchants(user, k=10):
+    """
+    Top k comercianți pe tot istoricul, din schiță (aproximativ)
+
+    Returns:
+        dict: {comerciant: {'count', 'total', 'error', 'guaranteed'}}; suma reală e
+        între total - error și total
+    """
+    sketch = MerchantSketch.objects.filter(user=user).first()
+    if sketch is None:
+        return {}
+    return {
+        name: {
+            'count': count,
+            'total': Decimal(weight) / 100,
+            'error': Decimal(error) / 100,
+            'guaranteed': guaranteed,
+        }
+        for name, weight, count, error, guaranteed in SpaceSaving(sketch.capacity, sketch.counters).top(k)
+    }
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_monthly_totals(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('finance', 'MonthlyCategoryTotal')
+
+    grouped = Transaction.objects.annotate(
+        month=TruncMonth('date')
+    ).values(
+        'user_id', 'category_id', 'type', 'month'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    ).order_by()
+
+    MonthlyCategoryTotal.objects.bulk_create(
+        (MonthlyCategoryTotal(**row) for row in grouped.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_bank_integration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('expense', 'Cheltuială'), ('income', 'Venit')], default='expense', max_length=10)),
+                ('month', models.DateField(help_text='Prima zi a lunii')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Monthly Category Totals',
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['user', 'month'], name='finance_mct_user_month_idx')],
+                'unique_together': {('user', 'category', 'type', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_monthly_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, Sum, When
+
+
+def populate_daily_flows(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    AccountDailyFlow = apps.get_model('finance', 'AccountDailyFlow')
+
+    grouped = Transaction.objects.values('account_id', 'date').annotate(
+        net=Sum(Case(
+            When(type='income', then=F('amount')),
+            default=-F('amount'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )),
+        count=Count('id'),
+    ).order_by()
+
+    AccountDailyFlow.objects.bulk_create(
+        (AccountDailyFlow(**row) for row in grouped.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_account_balance_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDailyFlow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_flows', to='finance.account')),
+            ],
+            options={
+                'verbose_name_plural': 'Account Daily Flows',
+                'ordering': ['-date'],
+                'unique_together': {('account', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_daily_flows, migrations.RunPython.noop),
+    ]
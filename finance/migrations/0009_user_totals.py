@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_user_totals(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    UserTotals = apps.get_model('finance', 'UserTotals')
+
+    zero = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+    grouped = Transaction.objects.values('user_id', currency=models.F('account__currency')).annotate(
+        income=Coalesce(Sum('amount', filter=Q(type='income')), zero),
+        expense=Coalesce(Sum('amount', filter=Q(type='expense')), zero),
+        count=Count('id'),
+    ).order_by()
+
+    UserTotals.objects.bulk_create(
+        (UserTotals(**row) for row in grouped.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_account_daily_flow'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User Totals',
+                'unique_together': {('user', 'currency')},
+            },
+        ),
+        migrations.RunPython(populate_user_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_data_versions(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserDataVersion = apps.get_model('finance', 'UserDataVersion')
+
+    UserDataVersion.objects.bulk_create(
+        (UserDataVersion(user_id=user_id, version=1) for user_id in User.objects.values_list('id', flat=True).iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('finance', '0009_user_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'User Data Versions',
+            },
+        ),
+        migrations.RunPython(populate_data_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_user_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('remote_account_id', models.CharField(max_length=255)),
+                ('last_booking_date', models.DateTimeField(blank=True, null=True)),
+                ('last_external_id', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bank_connection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_cursors', to='finance.bankconnection')),
+            ],
+            options={
+                'verbose_name_plural': 'Bank Sync Cursors',
+                'unique_together': {('bank_connection', 'remote_account_id')},
+            },
+        ),
+    ]
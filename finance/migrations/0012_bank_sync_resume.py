@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_bank_sync_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banksynccursor',
+            name='resume_from',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='banksynccursor',
+            name='resume_token',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0012_bank_sync_resume'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankconnection',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bankconnection',
+            name='sync_interval',
+            field=models.PositiveIntegerField(default=3600),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0013_bank_connection_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'În curs'), ('succeeded', 'Reușită'), ('failed', 'Eșuată'), ('interrupted', 'Întreruptă')], default='running', max_length=20)),
+                ('full', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('pages_fetched', models.PositiveIntegerField(default=0)),
+                ('rows_inserted', models.PositiveIntegerField(default=0)),
+                ('rows_skipped', models.PositiveIntegerField(default=0)),
+                ('http_seconds', models.FloatField(default=0)),
+                ('db_seconds', models.FloatField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('bank_connection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_runs', to='finance.bankconnection')),
+                ('resumed_from', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumed_by', to='finance.syncrun')),
+            ],
+            options={
+                'verbose_name_plural': 'Sync Runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['bank_connection', '-started_at'], name='finance_syncrun_conn_idx'), models.Index(fields=['status', 'started_at'], name='finance_syncrun_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0015_sync_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banktransaction',
+            name='category_guess',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='classification_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='is_bt_pay',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='merchant_normalized',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='banktransaction',
+            index=models.Index(fields=['user', 'is_bt_pay', 'sync_status', 'date'], name='finance_btx_btpay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='banktransaction',
+            index=models.Index(fields=['classification_version'], name='finance_btx_classify_idx'),
+        ),
+    ]
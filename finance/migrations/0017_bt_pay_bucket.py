@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Abs, TruncDay, TruncHour
+
+
+def populate_bt_pay_buckets(apps, schema_editor):
+    BankTransaction = apps.get_model('finance', 'BankTransaction')
+    BTPayBucket = apps.get_model('finance', 'BTPayBucket')
+
+    for granularity, trunc in (('hour', TruncHour), ('day', TruncDay)):
+        grouped = BankTransaction.objects.filter(is_bt_pay=True).annotate(
+            bucket_start=trunc('date'),
+        ).values(
+            'user_id', 'bucket_start', 'sync_status', category=F('category_guess'),
+        ).annotate(
+            total=Sum(Abs('amount')),
+            count=Count('id'),
+        ).order_by()
+
+        BTPayBucket.objects.bulk_create(
+            (BTPayBucket(granularity=granularity, **row) for row in grouped.iterator()),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0016_bank_transaction_bt_pay'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BTPayBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Oră'), ('day', 'Zi')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('category', models.CharField(blank=True, max_length=50)),
+                ('sync_status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bt_pay_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'BT Pay Buckets',
+                'ordering': ['-bucket_start'],
+                'unique_together': {('user', 'granularity', 'bucket_start', 'category', 'sync_status')},
+            },
+        ),
+        migrations.RunPython(populate_bt_pay_buckets, migrations.RunPython.noop),
+    ]
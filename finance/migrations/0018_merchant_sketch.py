@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Abs
+
+
+def populate_merchant_sketches(apps, schema_editor):
+    BankTransaction = apps.get_model('finance', 'BankTransaction')
+    MerchantSketch = apps.get_model('finance', 'MerchantSketch')
+    capacity = MerchantSketch._meta.get_field('capacity').default
+
+    totals = {}
+    merchants = {}
+    grouped = BankTransaction.objects.filter(is_bt_pay=True).values(
+        'user_id', 'merchant_normalized',
+    ).annotate(total=Sum(Abs('amount')), count=Count('id')).order_by('user_id', '-total')
+    for row in grouped.iterator():
+        cents = int(round(row['total'] * 100))
+        totals[row['user_id']] = totals.get(row['user_id'], 0) + cents
+        counters = merchants.setdefault(row['user_id'], {})
+        name = row['merchant_normalized'] or 'Unknown'
+        if name in counters or len(counters) < capacity:
+            weight, count = counters.get(name, (0, 0))
+            counters[name] = (weight + cents, count + row['count'])
+
+    MerchantSketch.objects.bulk_create(
+        (
+            MerchantSketch(
+                user_id=user_id,
+                total_cents=totals[user_id],
+                counters=[[name, weight, count, 0] for name, (weight, count) in counters.items()],
+            )
+            for user_id, counters in merchants.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0017_bt_pay_bucket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerchantSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('capacity', models.PositiveIntegerField(default=100)),
+                ('total_cents', models.BigIntegerField(default=0)),
+                ('counters', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='merchant_sketch', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Merchant Sketches',
+            },
+        ),
+        migrations.RunPython(populate_merchant_sketches, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
@@ -85,8 +85,24 @@ class Transaction(models.Model):
     def __str__(self):
         return f"{self.get_type_display()} - {self.amount} {self.account.currency}"
     
+    def save(self, *args, **kwargs):
+        # Semnalele (rollup, totaluri, istoric sold) rulează în aceeași tranzacție DB
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            return super().delete(*args, **kwargs)
+    
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            # Paginare keyset pe (date, time, id) și filtrele din FilterTransactionForm
+            models.Index(fields=['user', 'date', 'time', 'id'], name='finance_tx_user_date_idx'),
+            models.Index(fields=['account', 'date', 'time', 'id'], name='finance_tx_account_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='finance_tx_user_cat_date_idx'),
+            models.Index(fields=['user', 'type', 'date'], name='finance_tx_user_type_date_idx'),
+        ]
 
 
 class Budget(models.Model):
@@ -104,6 +120,9 @@ class Budget(models.Model):
     class Meta:
         ordering = ['-month']
         unique_together = ['user', 'category', 'month']
+        indexes = [
+            models.Index(fields=['user', 'month'], name='finance_budget_user_month_idx'),
+        ]
 
 
 class Savings(models.Model):
@@ -151,6 +170,10 @@ class BankConnection(models.Model):
     api_user_id = models.CharField(max_length=255, blank=True)
     api_last_sync = models.DateTimeField(null=True, blank=True)
     
+    # Planificare (run_sync_scheduler): intervalul adaptiv, în secunde, și următoarea rulare
+    sync_interval = models.PositiveIntegerField(default=3600)
+    next_sync_at = models.DateTimeField(null=True, blank=True)
+    
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -197,6 +220,14 @@ class BankTransaction(models.Model):
         related_name='bank_source'
     )
     
+    # Clasificare BT Pay, calculată la salvare (BTPay.classify); rândurile cu
+    # classification_version mai mic decât BTPay.CLASSIFICATION_VERSION se
+    # reclasifică cu classify_bt_pay
+    is_bt_pay = models.BooleanField(default=False)
+    merchant_normalized = models.CharField(max_length=255, blank=True)
+    category_guess = models.CharField(max_length=50, blank=True)
+    classification_version = models.PositiveSmallIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -206,3 +237,262 @@ class BankTransaction(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = "Bank Transactions"
+        indexes = [
+            models.Index(fields=['user', 'sync_status', 'date'], name='finance_btx_user_status_idx'),
+            models.Index(fields=['user', 'date'], name='finance_btx_user_date_idx'),
+            # Tranzacțiile în așteptare sunt citite la fiecare tick de polling/WebSocket
+            models.Index(
+                fields=['user', 'date'],
+                condition=models.Q(sync_status='pending'),
+                name='finance_btx_pending_idx',
+            ),
+            models.Index(fields=['user', 'is_bt_pay', 'sync_status', 'date'], name='finance_btx_btpay_idx'),
+            models.Index(fields=['classification_version'], name='finance_btx_classify_idx'),
+        ]
+
+
+class BTPayBucket(models.Model):
+    """
+    Rollup BT Pay pe oră și pe zi (utilizator, interval, categorie, status)
+    
+    Menținut incremental la ingestie și din semnalele BankTransaction;
+    reconstruibil cu rebuild_bt_pay_buckets.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Oră'),
+        ('day', 'Zi'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bt_pay_buckets')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    category = models.CharField(max_length=50, blank=True)
+    sync_status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.bucket_start:%d.%m.%Y %H:%M} ({self.category or 'other'}): {self.total}"
+    
+    class Meta:
+        ordering = ['-bucket_start']
+        unique_together = ['user', 'granularity', 'bucket_start', 'category', 'sync_status']
+        verbose_name_plural = "BT Pay Buckets"
+
+
+class MerchantSketch(models.Model):
+    """
+    Top comercianți BT Pay pe tot istoricul, aproximat cu Space-Saving ponderat
+    
+    Memoria e fixă per utilizator (capacity contoare), indiferent de istoric;
+    sumele sunt în bani (cenți) ca întregi.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='merchant_sketch')
+    capacity = models.PositiveIntegerField(default=100)
+    total_cents = models.BigIntegerField(default=0)
+    # [[comerciant, cenți, număr, eroare în cenți], ...]
+    counters = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {len(self.counters)}/{self.capacity} comercianți"
+    
+    class Meta:
+        verbose_name_plural = "Merchant Sketches"
+
+
+class BankSyncCursor(models.Model):
+    """
+    Punctul până la care a fost sincronizat un cont din API-ul băncii
+
+    Sincronizarea următoare cere doar tranzacțiile de după last_booking_date
+    (cu o suprapunere pentru tranzacțiile înregistrate cu întârziere).
+    """
+    bank_connection = models.ForeignKey(BankConnection, on_delete=models.CASCADE, related_name='sync_cursors')
+    remote_account_id = models.CharField(max_length=255)
+    last_booking_date = models.DateTimeField(null=True, blank=True)
+    last_external_id = models.CharField(max_length=255, blank=True)
+    # Parcurgerea paginată în curs: fereastra ei și token-ul paginii următoare
+    resume_from = models.DateTimeField(null=True, blank=True)
+    resume_token = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.bank_connection} - {self.remote_account_id} ({self.last_booking_date})"
+
+    class Meta:
+        unique_together = ['bank_connection', 'remote_account_id']
+        verbose_name_plural = "Bank Sync Cursors"
+
+
+class SyncRun(models.Model):
+    """Evidența unei sincronizări a unei conexiuni bancare: volum, timpi și eroare"""
+    STATUS_CHOICES = [
+        ('running', 'În curs'),
+        ('succeeded', 'Reușită'),
+        ('failed', 'Eșuată'),
+        ('interrupted', 'Întreruptă'),
+    ]
+
+    bank_connection = models.ForeignKey(BankConnection, on_delete=models.CASCADE, related_name='sync_runs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    full = models.BooleanField(default=False)
+    # Rularea eșuată/întreruptă pe care aceasta o continuă (de la cursoarele salvate)
+    resumed_from = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='resumed_by'
+    )
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    pages_fetched = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    http_seconds = models.FloatField(default=0)
+    db_seconds = models.FloatField(default=0)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.bank_connection} - {self.get_status_display()} ({self.started_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def duration(self):
+        """Durata în secunde (None cât timp rulează)"""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name_plural = "Sync Runs"
+        indexes = [
+            models.Index(fields=['bank_connection', '-started_at'], name='finance_syncrun_conn_idx'),
+            models.Index(fields=['status', 'started_at'], name='finance_syncrun_status_idx'),
+        ]
+
+
+class SyncJob(models.Model):
+    """Cerere de sincronizare pusă în coadă, executată de run_sync_worker în afara cererii web"""
+    KIND_CHOICES = [
+        ('sync', 'Sincronizare tranzacții'),
+        ('connect', 'Verificare conexiune nouă'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'În coadă'),
+        ('running', 'În curs'),
+        ('succeeded', 'Reușită'),
+        ('failed', 'Eșuată'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_jobs')
+    # Fără conexiune: toate conexiunile active ale utilizatorului
+    bank_connection = models.ForeignKey(
+        BankConnection, on_delete=models.CASCADE, null=True, blank=True, related_name='sync_jobs'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='sync')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    days_back = models.PositiveIntegerField(default=30)
+    full = models.BooleanField(default=False)
+    auto_create = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_kind_display()} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "Sync Jobs"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='finance_syncjob_status_idx'),
+        ]
+
+
+class MonthlyCategoryTotal(models.Model):
+    """Rollup lunar al tranzacțiilor pe utilizator, categorie și tip"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_totals')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    type = models.CharField(
+        max_length=10,
+        choices=[('expense', 'Cheltuială'), ('income', 'Venit')],
+        default='expense'
+    )
+    month = models.DateField(help_text="Prima zi a lunii")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.category} ({self.month.strftime('%m.%Y')}): {self.total}"
+    
+    class Meta:
+        ordering = ['-month']
+        unique_together = ['user', 'category', 'type', 'month']
+        indexes = [
+            models.Index(fields=['user', 'month'], name='finance_mct_user_month_idx'),
+        ]
+        verbose_name_plural = "Monthly Category Totals"
+
+
+class AccountBalanceSnapshot(models.Model):
+    """Soldul unui cont la sfârșitul unei zile, scris periodic"""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.account.name} - {self.balance} ({self.date.strftime('%d.%m.%Y')})"
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['account', 'date']
+        verbose_name_plural = "Account Balance Snapshots"
+
+
+class AccountDailyFlow(models.Model):
+    """Variația netă a soldului unui cont într-o zi (doar zilele cu tranzacții)"""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_flows')
+    date = models.DateField()
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.account.name} - {self.net} ({self.date.strftime('%d.%m.%Y')})"
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['account', 'date']
+        verbose_name_plural = "Account Daily Flows"
+
+
+class UserTotals(models.Model):
+    """Totaluri all-time de venituri și cheltuieli per utilizator și monedă"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='totals')
+    currency = models.CharField(max_length=3)
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.currency}: +{self.income} / -{self.expense}"
+    
+    class Meta:
+        unique_together = ['user', 'currency']
+        verbose_name_plural = "User Totals"
+
+
+class UserDataVersion(models.Model):
+    """Versiunea datelor unui utilizator, incrementată la scrierea tranzacțiilor (pentru ETag)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.user.username} v{self.version}"
+    
+    class Meta:
+        verbose_name_plural = "User Data Versions"
@@ -0,0 +1,91 @@
+"""
+Paginare keyset (cursor) pentru liste de tranzacții
+Ordonare descendentă pe (date, time, id), cost constant indiferent de adâncimea paginii
+"""
+import base64
+import binascii
+from datetime import date, time
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ORDERING = ('-date', '-time', '-id')
+
+
+def encode_cursor(transaction):
+    """Codifică poziția unei tranzacții într-un cursor opac"""
+    raw = f"{transaction.date.isoformat()}|{transaction.time.isoformat()}|{transaction.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodifică un cursor în (date, time, id); None dacă e invalid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_date, raw_time, raw_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return date.fromisoformat(raw_date), time.fromisoformat(raw_time), int(raw_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Mărimea paginii din query string, limitată la MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    """O pagină de rezultate și cursorul pentru pagina următoare"""
+
+    def __init__(self, items, next_cursor, cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class KeysetPaginator:
+    """Paginator keyset pentru querysets de tranzacții"""
+
+    def __init__(self, queryset, per_page=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset.order_by(*ORDERING)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """Returnează pagina care începe imediat după cursor"""
+        queryset = self.queryset
+        position = decode_cursor(cursor)
+
+        if position:
+            after_date, after_time, after_id = position
+            # date__lte e redundant logic, dar mărginește căutarea în indexul (user, date)
+            queryset = queryset.filter(date__lte=after_date).filter(
+                Q(date__lt=after_date)
+                | Q(date=after_date, time__lt=after_time)
+                | Q(date=after_date, time=after_time, id__lt=after_id)
+            )
+
+        # Citim un rând în plus ca să știm dacă există pagina următoare
+        items = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            next_cursor = encode_cursor(items[-1])
+
+        return KeysetPage(items, next_cursor, cursor=cursor if position else None)
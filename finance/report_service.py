@@ -0,0 +1,159 @@
+"""
+Serviciu pentru rapoarte pe perioade arbitrare
+Toate seriile unui raport vin dintr-o singură interogare grupată pe
+(categorie, tip, interval), returnate ca JSON gata de grafic
+"""
+import calendar
+import logging
+from datetime import date, timedelta
+
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc
+
+from .models import MonthlyCategoryTotal
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('month', 'quarter', 'year', 'custom')
+GRANULARITIES = ('day', 'week', 'month')
+
+# Numărul maxim de puncte pe serie; peste el granularitatea crește automat
+MAX_BUCKETS = 400
+
+
+def period_range(period, anchor, start=None, end=None):
+    """Intervalul [start, end] pentru o perioadă care conține data anchor"""
+    if period == 'custom' and start and end:
+        return start, end
+    if period == 'year':
+        return date(anchor.year, 1, 1), date(anchor.year, 12, 31)
+    if period == 'quarter':
+        first_month = (anchor.month - 1) // 3 * 3 + 1
+        last_month = first_month + 2
+        return (
+            date(anchor.year, first_month, 1),
+            date(anchor.year, last_month, calendar.monthrange(anchor.year, last_month)[1]),
+        )
+    return (
+        anchor.replace(day=1),
+        anchor.replace(day=calendar.monthrange(anchor.year, anchor.month)[1]),
+    )
+
+
+def bucket_start(day, granularity):
+    """Începutul intervalului (zi, săptămână, lună) care conține ziua"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def buckets(start, end, granularity):
+    """Toate intervalele dintre start și end, în ordine"""
+    result = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        result.append(current)
+        if granularity == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=7 if granularity == 'week' else 1)
+    return result
+
+
+def pick_granularity(start, end, granularity=None):
+    """Granularitatea cerută, mărită dacă ar produce prea multe puncte"""
+    days = (end - start).days + 1
+    if granularity is None:
+        granularity = 'day' if days <= 31 else 'week' if days <= 92 else 'month'
+    if granularity == 'day' and days > MAX_BUCKETS:
+        granularity = 'week'
+    if granularity == 'week' and days > MAX_BUCKETS * 7:
+        granularity = 'month'
+    return granularity
+
+
+def _grouped_rows(user, start, end, granularity):
+    """Rândurile (categorie, tip, interval, total, număr) - o singură interogare"""
+    whole_months = start.day == 1 and (end + timedelta(days=1)).day == 1
+    if granularity == 'month' and whole_months:
+        # Luni întregi: citim rollup-ul lunar în loc de tranzacții
+        return MonthlyCategoryTotal.objects.filter(
+            user=user, month__range=(start, end),
+        ).values(
+            'category_id', 'category__name', 'type', bucket=F('month'),
+        ).annotate(
+            total=Sum('total'),
+            count=Sum('count'),
+        ).order_by()
+
+    return user.transactions.filter(
+        date__range=(start, end),
+    ).values(
+        'category_id', 'category__name', 'type', bucket=Trunc('date', granularity, output_field=DateField()),
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    ).order_by()
+
+
+def build_report(user, start, end, granularity=None):
+    """
+    Raportul unui utilizator pentru intervalul [start, end]
+
+    Returns:
+        dict: labels (începutul fiecărui interval), series per tip și categorie,
+        totaluri per tip și totaluri per categorie
+    """
+    granularity = pick_granularity(start, end, granularity)
+    labels = buckets(start, end, granularity)
+    position = {bucket: i for i, bucket in enumerate(labels)}
+
+    series = {'expense': {}, 'income': {}}
+    totals = {t: {'total': 0.0, 'count': 0, 'data': [0.0] * len(labels)} for t in series}
+
+    for row in _grouped_rows(user, start, end, granularity):
+        index = position.get(bucket_start(row['bucket'], granularity))
+        if index is None:
+            continue
+        amount = float(row['total'] or 0)
+        category = series[row['type']].setdefault(row['category_id'], {
+            'category_id': row['category_id'],
+            'category': row['category__name'] or 'Fără categorie',
+            'data': [0.0] * len(labels),
+            'total': 0.0,
+            'count': 0,
+        })
+        category['data'][index] += amount
+        category['total'] += amount
+        category['count'] += row['count']
+
+        type_totals = totals[row['type']]
+        type_totals['data'][index] += amount
+        type_totals['total'] += amount
+        type_totals['count'] += row['count']
+
+    for type_series in series.values():
+        for category in type_series.values():
+            category['data'] = [round(value, 2) for value in category['data']]
+            category['total'] = round(category['total'], 2)
+    for type_totals in totals.values():
+        type_totals['data'] = [round(value, 2) for value in type_totals['data']]
+        type_totals['total'] = round(type_totals['total'], 2)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'labels': [bucket.isoformat() for bucket in labels],
+        'series': {
+            type: sorted(type_series.values(), key=lambda c: -c['total'])
+            for type, type_series in series.items()
+        },
+        'totals': totals,
+        'by_category': {
+            type: {c['category']: c['total'] for c in type_series.values() if c['total'] > 0}
+            for type, type_series in series.items()
+        },
+    }
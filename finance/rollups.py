@@ -0,0 +1,118 @@
+"""
+Rollup lunar pentru tranzacții (utilizator, categorie, tip, lună)
+Menținut incremental din semnalele Transaction și reconstruibil complet
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Sum, Count, F
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyCategoryTotal, Transaction
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value):
+    """Prima zi a lunii pentru o dată (acceptă și datetime sau string)"""
+    value = Transaction._meta.get_field('date').to_python(value)
+    return date(value.year, value.month, 1)
+
+
+def transaction_snapshot(transaction):
+    """Valorile unei tranzacții relevante pentru rollup, normalizate"""
+    return {
+        'user_id': transaction.user_id,
+        'category_id': transaction.category_id,
+        'type': transaction.type,
+        'month': month_start(transaction.date),
+        'amount': Decimal(str(transaction.amount or 0)),
+    }
+
+
+def apply_delta(user_id, category_id, type, month, amount, count):
+    """Adaugă (sau scade) o sumă în rândul de rollup corespunzător, atomic"""
+    rows = MonthlyCategoryTotal.objects.filter(
+        user_id=user_id,
+        category_id=category_id,
+        type=type,
+        month=month,
+    )
+    updated = rows.update(total=F('total') + amount, count=F('count') + count)
+
+    if not updated:
+        # Nu creăm rânduri pentru ștergeri (ex: utilizatorul e șters în cascadă)
+        if count <= 0:
+            return
+        try:
+            with db_transaction.atomic():
+                MonthlyCategoryTotal.objects.create(
+                    user_id=user_id,
+                    category_id=category_id,
+                    type=type,
+                    month=month,
+                    total=amount,
+                    count=count,
+                )
+        except IntegrityError:
+            # Creat concurent de altă cerere - aplicăm peste rândul existent
+            rows.update(total=F('total') + amount, count=F('count') + count)
+    elif count < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def _apply_snapshot(snapshot, sign):
+    apply_delta(
+        snapshot['user_id'],
+        snapshot['category_id'],
+        snapshot['type'],
+        snapshot['month'],
+        snapshot['amount'] * sign,
+        sign,
+    )
+
+
+def apply_transaction_change(previous, current):
+    """
+    Actualizează rollup-ul pentru o tranzacție creată, editată sau ștearsă
+
+    Args:
+        previous: snapshot-ul dinainte de salvare (None la creare)
+        current: snapshot-ul curent (None la ștergere)
+    """
+    if previous == current:
+        return
+    if previous:
+        _apply_snapshot(previous, -1)
+    if current:
+        _apply_snapshot(current, 1)
+
+
+def rebuild_monthly_totals(user=None):
+    """Reconstruiește rollup-ul de la zero din tabela de tranzacții"""
+    transactions = Transaction.objects.all()
+    rollups = MonthlyCategoryTotal.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    grouped = transactions.annotate(
+        month=TruncMonth('date')
+    ).values(
+        'user_id', 'category_id', 'type', 'month'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    ).order_by()
+
+    with db_transaction.atomic():
+        rollups.delete()
+        created = MonthlyCategoryTotal.objects.bulk_create(
+            (MonthlyCategoryTotal(**row) for row in grouped.iterator()),
+            batch_size=1000,
+        )
+
+    logger.info(f"Rebuilt {len(created)} monthly category totals")
+    return len(created)
@@ -1,13 +1,24 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from allauth.socialaccount.models import SocialAccount
-from .models import UserProfile, Transaction, Account, Budget
+from .models import UserProfile, Transaction, Account, Budget, Category, MonthlyCategoryTotal, BankTransaction
+from .rollups import apply_transaction_change, transaction_snapshot, rebuild_monthly_totals
+from .ledger import ledger_entry
+from .balance_history import apply_flow_change
+from .dashboard_cache import invalidate_dashboard
+from .http_cache import bump_data_version
+from .totals import apply_totals_change, totals_snapshot, verify_totals
+from .budget_service import BudgetEvaluator
+from .bt_pay_service import BTPay
+from .bt_pay_buckets import apply_bucket_change, bucket_snapshot
+from . import merchant_sketch
 from .supabase_sync import sync_user_to_supabase, sync_profile_to_supabase, log_user_activity, log_transaction_activity
 from .discord_notifications import (
     notify_transaction_created,
     notify_account_created,
     notify_budget_created,
+    notify_budget_exceeded,
     notify_user_joined,
     notify_discord_connected,
 )
@@ -75,6 +86,179 @@ def update_user_profile_from_discord(sender, instance, created, update_fields, *
             print(f"Eroare actualizare profil Discord: {e}")
 
 
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Reține starea dinainte de editare pentru rollup, totaluri și istoricul soldului"""
+    instance._previous_snapshot = None
+    instance._previous_entry = None
+    instance._previous_totals = None
+    if instance.pk and not raw:
+        previous = sender.objects.filter(pk=instance.pk).select_related('account').only(
+            'user_id', 'account_id', 'category_id', 'type', 'date', 'amount', 'account__currency'
+        ).first()
+        if previous:
+            instance._previous_snapshot = transaction_snapshot(previous)
+            instance._previous_entry = ledger_entry(previous)
+            instance._previous_totals = totals_snapshot(previous)
+
+
+@receiver(post_save, sender=Transaction)
+def update_monthly_totals_on_save(sender, instance, raw=False, **kwargs):
+    """Aplică diferența tranzacției în rollup-ul lunar"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_snapshot', None)
+    current = transaction_snapshot(instance)
+    apply_transaction_change(previous, current)
+    instance._previous_snapshot = None
+    
+    try:
+        # Notifică doar bugetele depășite chiar de această tranzacție
+        for budget in BudgetEvaluator.crossed_by(previous, current):
+            notify_budget_exceeded(budget)
+    except Exception as e:
+        print(f"Eroare verificare buget: {e}")
+
+
+@receiver(post_delete, sender=Transaction)
+def update_monthly_totals_on_delete(sender, instance, **kwargs):
+    """Scade tranzacția ștearsă din rollup-ul lunar"""
+    apply_transaction_change(transaction_snapshot(instance), None)
+
+
+@receiver(post_save, sender=Transaction)
+def update_daily_flows_on_save(sender, instance, raw=False, **kwargs):
+    """Aplică diferența tranzacției în variația zilnică a contului"""
+    if raw:
+        return
+    apply_flow_change(getattr(instance, '_previous_entry', None), ledger_entry(instance))
+    instance._previous_entry = None
+
+
+@receiver(post_delete, sender=Transaction)
+def update_daily_flows_on_delete(sender, instance, **kwargs):
+    """Scade tranzacția ștearsă din variația zilnică a contului"""
+    apply_flow_change(ledger_entry(instance), None)
+
+
+@receiver(post_save, sender=Transaction)
+def update_user_totals_on_save(sender, instance, raw=False, **kwargs):
+    """Aplică diferența tranzacției în totalurile all-time ale utilizatorului"""
+    if raw:
+        return
+    apply_totals_change(getattr(instance, '_previous_totals', None), totals_snapshot(instance))
+    instance._previous_totals = None
+
+
+@receiver(post_delete, sender=Transaction)
+def update_user_totals_on_delete(sender, instance, **kwargs):
+    """Scade tranzacția ștearsă din totalurile utilizatorului"""
+    currency = Account.objects.filter(pk=instance.account_id).values_list('currency', flat=True).first()
+    if currency:
+        apply_totals_change(totals_snapshot(instance, currency), None)
+
+
+@receiver(pre_save, sender=Account)
+def remember_account_currency(sender, instance, raw=False, **kwargs):
+    """Reține moneda dinainte de editare"""
+    instance._previous_currency = None
+    if instance.pk and not raw:
+        instance._previous_currency = sender.objects.filter(pk=instance.pk).values_list(
+            'currency', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Account)
+def move_totals_on_currency_change(sender, instance, raw=False, **kwargs):
+    """Recalculează totalurile utilizatorului când un cont își schimbă moneda"""
+    previous = getattr(instance, '_previous_currency', None)
+    if raw or not previous or previous == instance.currency:
+        return
+    verify_totals(instance.user, repair=True)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def invalidate_dashboard_cache(sender, instance, raw=False, **kwargs):
+    """Invalidează dashboard-ul din cache al proprietarului"""
+    if raw:
+        return
+    invalidate_dashboard(instance.user_id)
+
+
+@receiver(pre_save, sender=BankTransaction)
+def classify_bank_transaction(sender, instance, raw=False, **kwargs):
+    """Recalculează clasificarea BT Pay și reține starea dinainte pentru rollup"""
+    if raw:
+        return
+    BTPay.classify(instance)
+    instance._previous_bucket = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).only(
+            'user_id', 'date', 'amount', 'sync_status', 'is_bt_pay', 'category_guess'
+        ).first()
+        if previous:
+            instance._previous_bucket = bucket_snapshot(previous)
+
+
+@receiver(post_save, sender=BankTransaction)
+def update_bt_pay_buckets_on_save(sender, instance, raw=False, **kwargs):
+    """Aplică diferența tranzacției în rollup-ul BT Pay pe ore și zile"""
+    if raw:
+        return
+    apply_bucket_change(getattr(instance, '_previous_bucket', None), bucket_snapshot(instance))
+    instance._previous_bucket = None
+
+
+@receiver(post_save, sender=BankTransaction)
+def update_merchant_sketch_on_create(sender, instance, created, raw=False, **kwargs):
+    """Adaugă tranzacția BT Pay nouă în schița top comercianților"""
+    if created and not raw:
+        merchant_sketch.add_transactions([instance])
+
+
+@receiver(post_delete, sender=BankTransaction)
+def update_bt_pay_buckets_on_delete(sender, instance, **kwargs):
+    """Scade tranzacția ștearsă din rollup-ul BT Pay"""
+    apply_bucket_change(bucket_snapshot(instance), None)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=BankTransaction)
+def bump_user_data_version_on_save(sender, instance, raw=False, **kwargs):
+    """Schimbă versiunea datelor (ETag) pentru proprietar"""
+    if raw:
+        return
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=BankTransaction)
+def bump_user_data_version_on_delete(sender, instance, **kwargs):
+    """Schimbă versiunea datelor (ETag) după ștergere"""
+    bump_data_version(instance.user_id, create=False)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_rollup_users(sender, instance, **kwargs):
+    """Reține utilizatorii afectați de ștergerea unei categorii"""
+    instance._rollup_user_ids = list(
+        MonthlyCategoryTotal.objects.filter(category=instance)
+        .values_list('user_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Category)
+def merge_rollups_after_category_delete(sender, instance, **kwargs):
+    """Reconstruiește rollup-ul pentru utilizatorii ale căror tranzacții au rămas fără categorie"""
+    for user in User.objects.filter(id__in=getattr(instance, '_rollup_user_ids', [])):
+        rebuild_monthly_totals(user)
+
+
 @receiver(post_save, sender=Transaction)
 def log_transaction_to_supabase(sender, instance, created, **kwargs):
     """Log transaction creation to Supabase"""
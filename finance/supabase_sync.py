@@ -4,11 +4,12 @@ This bypasses direct database connection and uses HTTP/REST API instead
 """
 
 import os
-import requests
 import json
 import logging
 from datetime import datetime
 
+from . import http_client
+
 logger = logging.getLogger(__name__)
 
 SUPABASE_URL = os.environ.get('SUPABASE_API_URL', 'https://shwbounuzknxjvvebyym.supabase.co')
@@ -67,11 +68,11 @@ def sync_user_to_supabase(user):
         endpoint = f"{SUPABASE_URL}/rest/v1/{USERS_TABLE}"
         
         # Try to update if exists, else insert
-        response = requests.post(
+        response = http_client.post(
+            'supabase',
             endpoint,
             headers=HEADERS,
-            json=user_data,
-            timeout=10
+            json=user_data
         )
         
         if response.status_code in [200, 201]:
@@ -105,11 +106,11 @@ def sync_profile_to_supabase(profile):
         }
         
         endpoint = f"{SUPABASE_URL}/rest/v1/{PROFILES_TABLE}"
-        response = requests.post(
+        response = http_client.post(
+            'supabase',
             endpoint,
             headers=HEADERS,
-            json=profile_data,
-            timeout=10
+            json=profile_data
         )
         
         if response.status_code in [200, 201]:
@@ -150,11 +151,11 @@ def log_user_activity(user, action, details=None):
             activity_data['details'] = json.dumps(details)
         
         endpoint = f"{SUPABASE_URL}/rest/v1/{ACTIVITY_TABLE}"
-        response = requests.post(
+        response = http_client.post(
+            'supabase',
             endpoint,
             headers=HEADERS,
-            json=activity_data,
-            timeout=10
+            json=activity_data
         )
         
         if response.status_code in [200, 201]:
@@ -197,7 +198,7 @@ def get_users_from_supabase():
     
     try:
         endpoint = f"{SUPABASE_URL}/rest/v1/{USERS_TABLE}"
-        response = requests.get(endpoint, headers=HEADERS, timeout=10)
+        response = http_client.get('supabase', endpoint, headers=HEADERS)
         
         if response.status_code == 200:
             return response.json()
@@ -221,7 +222,7 @@ def get_user_activity_from_supabase(user_id=None):
         if user_id:
             endpoint += f"?user_id=eq.{user_id}"
         
-        response = requests.get(endpoint, headers=HEADERS, timeout=10)
+        response = http_client.get('supabase', endpoint, headers=HEADERS)
         
         if response.status_code == 200:
             return response.json()
@@ -0,0 +1,202 @@
+"""
+Motor de sincronizare bancară concurentă
+Distribuie conexiunile pe un pool limitat de thread-uri, cu limite de concurență
+per bancă, și adună rezultatele și erorile într-un raport structurat
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+
+from django.conf import settings
+from django.db import close_old_connections, connection as db_connection
+
+from .bank_services import BankServiceFactory, update_account_balance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_BANK_CONCURRENCY = 4
+
+
+def sync_settings():
+    """Setările BANK_SYNC cu valorile implicite completate"""
+    configured = getattr(settings, 'BANK_SYNC', {})
+    return {
+        'MAX_WORKERS': configured.get('MAX_WORKERS', DEFAULT_MAX_WORKERS),
+        'PER_BANK_CONCURRENCY': configured.get('PER_BANK_CONCURRENCY', {}),
+        'DEFAULT_BANK_CONCURRENCY': configured.get('DEFAULT_BANK_CONCURRENCY', DEFAULT_PER_BANK_CONCURRENCY),
+    }
+
+
+class ConnectionResult:
+    """Rezultatul sincronizării unei conexiuni bancare"""
+
+    def __init__(self, connection, synced=0, balance_updated=False, error=None, duration=0.0):
+        self.connection_id = connection.pk
+        self.user_id = connection.user_id
+        self.bank = connection.bank
+        self.bank_display = connection.get_bank_display()
+        self.synced = synced
+        self.balance_updated = balance_updated
+        self.error = error
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return {
+            'connection_id': self.connection_id,
+            'user_id': self.user_id,
+            'bank': self.bank,
+            'synced': self.synced,
+            'balance_updated': self.balance_updated,
+            'error': self.error,
+            'duration': round(self.duration, 3),
+        }
+
+
+class SyncReport:
+    """Raportul unei rulări: rezultatele per conexiune și totaluri"""
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def total_synced(self):
+        return sum(result.synced for result in self.results)
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.ok]
+
+    def as_dict(self):
+        return {
+            'connections': len(self.results),
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'total_synced': self.total_synced,
+            'duration': round(self.duration, 3),
+            'results': [result.as_dict() for result in self.results],
+        }
+
+
+class SyncEngine:
+    """
+    Sincronizează mai multe conexiuni bancare în paralel
+
+    Timpul total devine aproximativ latența celei mai lente bănci înmulțită cu
+    numărul de runde, nu suma latențelor tuturor conexiunilor.
+    """
+
+    def __init__(self, max_workers=None, per_bank_concurrency=None, days_back=30, update_balances=True, full=False,
+                 on_result=None):
+        config = sync_settings()
+        self.max_workers = max(1, max_workers or config['MAX_WORKERS'])
+        self.per_bank_concurrency = {**config['PER_BANK_CONCURRENCY'], **(per_bank_concurrency or {})}
+        self.default_bank_concurrency = config['DEFAULT_BANK_CONCURRENCY']
+        self.days_back = days_back
+        # full=True ignoră cursoarele și re-descarcă ultimele days_back zile
+        self.full = full
+        # Apelat cu fiecare ConnectionResult, din thread-ul care a sincronizat conexiunea
+        self.on_result = on_result
+        self.update_balances = update_balances
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, bank):
+        with self._lock:
+            if bank not in self._semaphores:
+                limit = self.per_bank_concurrency.get(bank, self.default_bank_concurrency)
+                self._semaphores[bank] = threading.BoundedSemaphore(max(1, limit))
+            return self._semaphores[bank]
+
+    def sync_connection(self, connection):
+        """Sincronizează o conexiune; erorile sunt capturate în rezultat"""
+        started = time.monotonic()
+        synced = 0
+        balance_updated = False
+        error = None
+
+        with self._semaphore(connection.bank):
+            try:
+                service = BankServiceFactory.get_service(connection)
+                synced = service.sync_transactions(days_back=self.days_back, full=self.full)
+                run = getattr(service, 'sync_run', None)
+                if run is not None and run.status == 'failed':
+                    # Erorile HTTP nu sunt ridicate de serviciu, doar salvate în SyncRun
+                    error = run.error or 'Sincronizare eșuată'
+                elif self.update_balances:
+                    # Același service: soldul vine din lista de conturi deja citită
+                    balance_updated = update_account_balance(connection, service=service)
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Sync error for connection {connection.pk} ({connection.get_bank_display()}): {error}")
+
+        result = ConnectionResult(
+            connection,
+            synced=synced,
+            balance_updated=balance_updated,
+            error=error,
+            duration=time.monotonic() - started,
+        )
+        if self.on_result is not None:
+            try:
+                self.on_result(result)
+            except Exception as e:
+                logger.error(f"Sync progress callback failed for connection {connection.pk}: {str(e)}")
+        return result
+
+    def sync_in_thread(self, connection):
+        """sync_connection dintr-un thread de lucru, cu propria conexiune DB închisă la final"""
+        close_old_connections()
+        try:
+            return self.sync_connection(connection)
+        finally:
+            db_connection.close()
+
+    @staticmethod
+    def _interleave(connections):
+        """Alternează băncile ca thread-urile să nu aștepte toate aceeași bancă"""
+        by_bank = defaultdict(list)
+        for connection in connections:
+            by_bank[connection.bank].append(connection)
+        return [c for c in chain.from_iterable(zip_longest(*by_bank.values())) if c is not None]
+
+    def run(self, connections):
+        """
+        Sincronizează conexiunile date
+
+        Args:
+            connections: queryset sau listă de BankConnection
+
+        Returns:
+            SyncReport
+        """
+        if hasattr(connections, 'select_related'):
+            connections = connections.select_related('user')
+        connections = self._interleave(list(connections))
+        started = time.monotonic()
+
+        if self.max_workers == 1 or len(connections) <= 1:
+            results = [self.sync_connection(connection) for connection in connections]
+        else:
+            workers = min(self.max_workers, len(connections))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bank-sync') as executor:
+                results = list(executor.map(self.sync_in_thread, connections))
+
+        report = SyncReport(results, time.monotonic() - started)
+        logger.info(
+            f"Bank sync finished: {len(report.succeeded)} ok, {len(report.failed)} failed, "
+            f"{report.total_synced} transactions in {report.duration:.2f}s"
+        )
+        return report
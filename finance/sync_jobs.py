@@ -0,0 +1,199 @@
+"""
+Coadă de sincronizare bancară în baza de date
+View-urile doar pun cereri în coadă (SyncJob); run_sync_worker le execută și
+trimite progresul în browser prin grupul Channels btpay_notify_<user>. Worker-ul e
+alt proces decât daphne, deci notificările ajung doar cu un channel layer comun
+(Redis); cu InMemoryChannelLayer starea se citește din endpoint-ul jobului.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .bank_services import BankServiceFactory, auto_sync_pending_transactions
+from .models import Account, BankConnection, SyncJob
+from .sync_engine import SyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Un job "running" mai vechi de atât aparține unui worker oprit
+STALE_JOB_AFTER = timedelta(minutes=30)
+MAX_ATTEMPTS = 3
+
+
+def notify(user_id, message, level='info', **data):
+    """Trimite o notificare către WebSocket-ul utilizatorului (fără efect dacă Channels lipsește)"""
+    if not getattr(settings, 'CHANNEL_LAYERS', None):
+        return
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+    except ImportError:
+        return
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(f'btpay_notify_{user_id}', {
+            'type': 'notification.message',
+            'data': {'type': 'notification', 'event': 'bank_sync', 'message': message, 'level': level, **data},
+        })
+    except Exception as e:
+        logger.error(f"Could not notify user {user_id}: {str(e)}")
+
+
+def enqueue_sync(user, connection=None, days_back=30, full=False, auto_create=False):
+    """
+    Pune în coadă sincronizarea unei conexiuni (sau a tuturor conexiunilor active)
+
+    O cerere identică aflată deja în coadă e refolosită, ca dublu-click-urile să nu
+    dubleze munca.
+    """
+    job = SyncJob.objects.filter(
+        user=user, bank_connection=connection, kind='sync', status='queued',
+        days_back=days_back, full=full,
+    ).first()
+    if job is not None:
+        if auto_create and not job.auto_create:
+            SyncJob.objects.filter(pk=job.pk).update(auto_create=True)
+        return job
+    return SyncJob.objects.create(
+        user=user, bank_connection=connection, kind='sync',
+        days_back=days_back, full=full, auto_create=auto_create,
+    )
+
+
+def enqueue_connect(connection):
+    """Pune în coadă verificarea unei conexiuni noi (sold + cont asociat)"""
+    return SyncJob.objects.create(user=connection.user, bank_connection=connection, kind='connect')
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def recover_stale_jobs(now=None):
+    """Repune în coadă joburile rămase 'running' de la un worker oprit (sau le marchează eșuate)"""
+    now = now or timezone.now()
+    stale = SyncJob.objects.filter(status='running', started_at__lt=now - STALE_JOB_AFTER)
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed', finished_at=now, error='Worker oprit în timpul execuției',
+    )
+    requeued = stale.update(status='queued', worker='')
+    return requeued, failed
+
+
+def claim_next_job(worker=None):
+    """
+    Preia cel mai vechi job din coadă
+
+    Preluarea e un UPDATE condiționat pe status, deci doi workeri nu pot lua același
+    job, indiferent dacă baza de date suportă SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    worker = worker or worker_name()
+    for job_id in SyncJob.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True)[:10]:
+        claimed = SyncJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return SyncJob.objects.select_related('user', 'bank_connection').get(pk=job_id)
+    return None
+
+
+def _run_sync(job):
+    if job.bank_connection_id:
+        connections = BankConnection.objects.filter(pk=job.bank_connection_id, is_active=True)
+    else:
+        connections = BankConnection.objects.filter(user=job.user, is_active=True)
+
+    def on_result(result):
+        if result.ok:
+            notify(job.user_id, f"{result.bank_display}: {result.synced} tranzacții noi",
+                   'success', job_id=job.pk, connection_id=result.connection_id, synced=result.synced)
+        else:
+            notify(job.user_id, f"Eroare sincronizare {result.bank_display}: {result.error}",
+                   'error', job_id=job.pk, connection_id=result.connection_id)
+
+    report = SyncEngine(days_back=job.days_back, full=job.full, on_result=on_result).run(connections)
+    result = report.as_dict()
+    if job.auto_create:
+        result['auto_created'] = auto_sync_pending_transactions(job.user)
+    message = f"Sincronizate {report.total_synced} tranzacții"
+    if report.failed:
+        message += f", {len(report.failed)} conexiuni eșuate"
+    return result, message
+
+
+def _run_connect(job):
+    connection = job.bank_connection
+    balance_data = BankServiceFactory.get_service(connection).get_balance()
+    if not balance_data:
+        raise ValueError("Nu s-a putut conecta la bancă. Verifică token-ul.")
+
+    BankConnection.objects.filter(pk=connection.pk).update(is_active=True)
+    account, created = Account.objects.get_or_create(
+        user=job.user,
+        name=connection.account_name,
+        defaults={
+            'type': 'checking',
+            'currency': balance_data.get('currency', 'RON'),
+            'balance': balance_data.get('balance', 0),
+        }
+    )
+    if not created:
+        account.balance = balance_data.get('balance', 0)
+        account.currency = balance_data.get('currency', 'RON')
+        account.save()
+
+    return (
+        {'balance': str(balance_data.get('balance')), 'currency': balance_data.get('currency')},
+        f"Conectare la {connection.get_bank_display()} reușită! "
+        f"Sold: {balance_data.get('balance')} {balance_data.get('currency')}",
+    )
+
+
+RUNNERS = {
+    'sync': _run_sync,
+    'connect': _run_connect,
+}
+
+
+def run_job(job):
+    """Execută un job preluat și salvează rezultatul; erorile sunt salvate pe job"""
+    notify(job.user_id, f"{job.get_kind_display()} pornită", job_id=job.pk, status='running')
+    try:
+        result, message = RUNNERS[job.kind](job)
+    except Exception as e:
+        logger.error(f"Sync job {job.pk} failed: {str(e)}")
+        job.status = 'failed'
+        job.error = str(e)
+        notify(job.user_id, f"✗ {str(e)}", 'error', job_id=job.pk, status='failed')
+    else:
+        job.status = 'succeeded'
+        job.result = result
+        # Jobul s-a terminat, dar o conexiune eșuată (bancă inaccesibilă) e semnalată ca eroare
+        if result.get('failed'):
+            notify(job.user_id, f"✗ {message}", 'error', job_id=job.pk, status='succeeded', result=result)
+        else:
+            notify(job.user_id, f"✓ {message}", 'success', job_id=job.pk, status='succeeded', result=result)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def job_as_dict(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'connection_id': job.bank_connection_id,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'result': job.result,
+        'error': job.error,
+    }
@@ -0,0 +1,137 @@
+"""
+Evidența rulărilor de sincronizare bancară (SyncRun)
+Pornirea și închiderea rulărilor, rulările blocate, conexiunile de reluat și
+statistici de latență (percentile) per bancă
+"""
+import logging
+import math
+from datetime import timedelta
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import BankConnection, SyncRun
+
+logger = logging.getLogger(__name__)
+
+# O rulare "în curs" mai veche de atât a fost întreruptă (proces oprit, crash)
+STALE_RUN_AFTER = timedelta(hours=1)
+
+PERCENTILES = (50, 90, 99)
+
+
+def mark_stale_runs(connection=None, now=None, user=None):
+    """Marchează ca întrerupte rulările rămase 'running' de prea mult timp"""
+    now = now or timezone.now()
+    runs = SyncRun.objects.filter(status='running', started_at__lt=now - STALE_RUN_AFTER)
+    if connection is not None:
+        runs = runs.filter(bank_connection=connection)
+    if user is not None:
+        runs = runs.filter(bank_connection__user=user)
+    return runs.update(status='interrupted', finished_at=now, error='Rulare întreruptă (fără final înregistrat)')
+
+
+def start_run(connection, full=False):
+    """Creează rularea unei sincronizări, legată de rularea eșuată pe care o continuă"""
+    mark_stale_runs(connection)
+    previous = connection.sync_runs.exclude(status='running').order_by('-started_at').first()
+    resumed_from = previous if previous and previous.status in ('failed', 'interrupted') else None
+    return SyncRun.objects.create(bank_connection=connection, full=full, resumed_from=resumed_from)
+
+
+def finish_run(run, service, error=None):
+    """Salvează rezultatul rulării din contoarele serviciului"""
+    run.finished_at = timezone.now()
+    run.status = 'failed' if error else 'succeeded'
+    run.error = error or ''
+    run.pages_fetched = service.pages_fetched
+    run.rows_inserted = service.ingest_result.inserted
+    run.rows_skipped = service.ingest_result.skipped
+    run.http_seconds = round(service.http_seconds, 3)
+    run.db_seconds = round(service.db_seconds, 3)
+    run.save()
+    return run
+
+
+def connections_to_resume(connections=None):
+    """Conexiunile active a căror ultimă rulare a eșuat sau a fost întreruptă"""
+    mark_stale_runs()
+    if connections is None:
+        connections = BankConnection.objects.filter(is_active=True)
+    last_status = SyncRun.objects.filter(
+        bank_connection=OuterRef('pk'),
+    ).order_by('-started_at').values('status')[:1]
+    return connections.annotate(
+        last_run_status=Subquery(last_status),
+    ).filter(last_run_status__in=('failed', 'interrupted'))
+
+
+def percentile(values, p):
+    """Percentila p (metoda nearest-rank) dintr-o listă sortată"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return round(values[rank - 1], 3)
+
+
+def _summary(rows):
+    finished = [row for row in rows if row['duration'] is not None]
+    durations = sorted(row['duration'] for row in finished)
+    http = sorted(row['http_seconds'] for row in finished)
+    db = sorted(row['db_seconds'] for row in finished)
+    return {
+        'runs': len(rows),
+        'failed': sum(1 for row in rows if row['status'] in ('failed', 'interrupted')),
+        'running': sum(1 for row in rows if row['status'] == 'running'),
+        'rows_inserted': sum(row['rows_inserted'] for row in rows),
+        'pages_fetched': sum(row['pages_fetched'] for row in rows),
+        'duration': {f'p{p}': percentile(durations, p) for p in PERCENTILES},
+        'http_seconds': {f'p{p}': percentile(http, p) for p in PERCENTILES},
+        'db_seconds': {f'p{p}': percentile(db, p) for p in PERCENTILES},
+    }
+
+
+def run_stats(runs):
+    """
+    Statistici pentru un queryset de SyncRun: totaluri și percentile de latență
+
+    Returns:
+        dict: 'overall' și 'by_bank' (cheia e codul băncii)
+    """
+    rows = []
+    for row in runs.order_by().values(
+        'bank_connection__bank', 'status', 'started_at', 'finished_at',
+        'pages_fetched', 'rows_inserted', 'http_seconds', 'db_seconds',
+    ):
+        row['duration'] = (
+            (row['finished_at'] - row['started_at']).total_seconds() if row['finished_at'] else None
+        )
+        rows.append(row)
+
+    by_bank = {}
+    for row in rows:
+        by_bank.setdefault(row['bank_connection__bank'], []).append(row)
+    return {
+        'overall': _summary(rows),
+        'by_bank': {bank: _summary(bank_rows) for bank, bank_rows in sorted(by_bank.items())},
+    }
+
+
+def run_as_dict(run):
+    return {
+        'id': run.pk,
+        'connection_id': run.bank_connection_id,
+        'bank': run.bank_connection.bank,
+        'status': run.status,
+        'full': run.full,
+        'resumed_from': run.resumed_from_id,
+        'started_at': run.started_at.isoformat(),
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+        'duration': run.duration,
+        'pages_fetched': run.pages_fetched,
+        'rows_inserted': run.rows_inserted,
+        'rows_skipped': run.rows_skipped,
+        'http_seconds': run.http_seconds,
+        'db_seconds': run.db_seconds,
+        'error': run.error,
+    }
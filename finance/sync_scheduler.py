@@ -0,0 +1,195 @@
+"""
+Planificator pentru sincronizarea bancară în fundal
+Coadă cu priorități după momentul următoarei sincronizări a fiecărei conexiuni,
+cu jitter, cadență adaptată la cât de des apar tranzacții noi și o limită globală
+de sincronizări simultane
+"""
+import heapq
+import logging
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import BankConnection
+from .sync_engine import SyncEngine
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_DEFAULTS = {
+    'MAX_CONCURRENT': 4,
+    'MIN_INTERVAL': 15 * 60,
+    'MAX_INTERVAL': 24 * 3600,
+    'JITTER': 0.1,
+    # Conexiunile fără programare sunt împrăștiate pe această fereastră la pornire
+    'INITIAL_SPREAD': 10 * 60,
+    # Cât de des se recitesc conexiunile (noi, dezactivate) din baza de date
+    'REFRESH_SECONDS': 5 * 60,
+}
+
+
+def scheduler_settings():
+    """Setările BANK_SYNC['SCHEDULER'] cu valorile implicite completate"""
+    return {**SCHEDULER_DEFAULTS, **getattr(settings, 'BANK_SYNC', {}).get('SCHEDULER', {})}
+
+
+def next_interval(interval, synced, ok=True, min_interval=None, max_interval=None):
+    """
+    Noul interval (secunde) după o sincronizare
+
+    Tranzacții noi: intervalul se înjumătățește; nimic nou: crește cu 50%;
+    eroare: se dublează. Rezultatul rămâne în [min_interval, max_interval].
+    """
+    config = scheduler_settings()
+    min_interval = min_interval or config['MIN_INTERVAL']
+    max_interval = max_interval or config['MAX_INTERVAL']
+    if not ok:
+        interval *= 2
+    elif synced:
+        interval //= 2
+    else:
+        interval = interval * 3 // 2
+    return int(min(max(interval, min_interval), max_interval))
+
+
+def jittered(seconds, jitter):
+    """seconds ± jitter (fracție), ca rulările să nu se sincronizeze între ele"""
+    return seconds * random.uniform(1 - jitter, 1 + jitter)
+
+
+class SyncScheduler:
+    """
+    Rulează sincronizările conexiunilor active pe măsură ce devin scadente
+
+    Coada ține (scadență, id conexiune); o intrare e validă doar dacă scadența ei
+    coincide cu cea din self._due, deci reprogramările nu cer ștergeri din heap.
+    """
+
+    def __init__(self, max_concurrent=None, engine=None):
+        self.config = scheduler_settings()
+        self.max_concurrent = max(1, max_concurrent or self.config['MAX_CONCURRENT'])
+        self.engine = engine or SyncEngine(max_workers=self.max_concurrent)
+        self._heap = []
+        self._due = {}
+        self._running = set()
+        self._next_refresh = None
+        self._stop = threading.Event()
+
+    def schedule(self, connection_id, due):
+        self._due[connection_id] = due
+        heapq.heappush(self._heap, (due, connection_id))
+
+    def load(self, now=None):
+        """Adaugă în coadă conexiunile active noi și scoate din evidență pe cele inactive"""
+        now = now or timezone.now()
+        spread = self.config['INITIAL_SPREAD']
+        active = set()
+        for connection_id, next_sync_at in BankConnection.objects.filter(
+            is_active=True
+        ).values_list('pk', 'next_sync_at'):
+            active.add(connection_id)
+            if connection_id in self._due or connection_id in self._running:
+                continue
+            due = next_sync_at or now + timedelta(seconds=random.uniform(0, spread))
+            self.schedule(connection_id, due)
+
+        for connection_id in set(self._due) - active:
+            del self._due[connection_id]
+        self._next_refresh = now + timedelta(seconds=self.config['REFRESH_SECONDS'])
+
+    def pop_due(self, now, limit):
+        """Scoate din coadă cel mult limit conexiuni scadente"""
+        ids = []
+        while self._heap and self._heap[0][0] <= now and len(ids) < limit:
+            due, connection_id = heapq.heappop(self._heap)
+            if self._due.get(connection_id) != due:
+                continue
+            del self._due[connection_id]
+            ids.append(connection_id)
+        if not ids:
+            return []
+        connections = list(
+            BankConnection.objects.filter(pk__in=ids, is_active=True).select_related('user')
+        )
+        self._running.update(connection.pk for connection in connections)
+        return connections
+
+    def complete(self, connection, result, now=None):
+        """
+        Reprogramează conexiunea după rezultatul sincronizării
+
+        result.ok e fals și când serviciul doar a salvat eroarea HTTP în SyncRun
+        (vezi SyncEngine.sync_connection), deci băncile inaccesibile primesc backoff.
+        """
+        now = now or timezone.now()
+        self._running.discard(connection.pk)
+        interval = next_interval(
+            connection.sync_interval, result.synced, result.ok,
+            self.config['MIN_INTERVAL'], self.config['MAX_INTERVAL'],
+        )
+        due = now + timedelta(seconds=jittered(interval, self.config['JITTER']))
+        BankConnection.objects.filter(pk=connection.pk).update(sync_interval=interval, next_sync_at=due)
+        if not self._stop.is_set():
+            self.schedule(connection.pk, due)
+        if result.ok:
+            logger.info(
+                f"Scheduled sync finished for connection {connection.pk}: {result.synced} new, "
+                f"next in {interval}s"
+            )
+        else:
+            logger.warning(
+                f"Scheduled sync failed for connection {connection.pk}: {result.error}, "
+                f"retry in {interval}s"
+            )
+        return due
+
+    def seconds_until_next(self, now, slots_free=True):
+        """Cât poate dormi bucla: până la următoarea scadență (dacă are loc) sau reîncărcare"""
+        wake = self._next_refresh
+        if self._heap and slots_free:
+            wake = min(wake, self._heap[0][0])
+        return max(0.0, (wake - now).total_seconds())
+
+    def run_once(self, now=None):
+        """Sincronizează o dată toate conexiunile scadente (cu limita de concurență) și revine"""
+        now = now or timezone.now()
+        self.load(now)
+        connections = self.pop_due(now, len(self._heap))
+        results = self.engine.run(connections).results if connections else []
+        by_id = {connection.pk: connection for connection in connections}
+        for result in results:
+            self.complete(by_id[result.connection_id], result)
+        return results
+
+    def run(self):
+        """Bucla principală; se oprește la stop()"""
+        self.load()
+        with ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='sync-scheduler') as executor:
+            futures = {}
+            while not self._stop.is_set():
+                close_old_connections()
+                now = timezone.now()
+                if now >= self._next_refresh:
+                    self.load(now)
+
+                for connection in self.pop_due(now, self.max_concurrent - len(futures)):
+                    futures[executor.submit(self.engine.sync_in_thread, connection)] = connection
+
+                timeout = self.seconds_until_next(timezone.now(), len(futures) < self.max_concurrent)
+                if not futures:
+                    self._stop.wait(timeout)
+                    continue
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.complete(futures.pop(future), future.result())
+
+            # Oprire: așteptăm sincronizările în curs și le salvăm programarea
+            for future, connection in futures.items():
+                self.complete(connection, future.result())
+
+    def stop(self):
+        self._stop.set()
@@ -1,3 +1,892 @@
+"""
+Teste pentru modulele de bază finance (rollup-uri, bugete, tranzacții)
+Rulează: python manage.py test finance.tests
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from finance.models import (
+    Account, AccountBalanceSnapshot, AccountDailyFlow, BankConnection, BankTransaction, BTPayBucket, Budget,
+    Category, MerchantSketch, MonthlyCategoryTotal, Transaction, UserTotals,
+)
+from finance.balance_history import balance_history, rebuild_daily_flows
+from finance import bt_pay_buckets, merchant_sketch
+from finance.bt_pay_service import BTPay
+from finance.budget_service import BudgetEvaluator
+from finance.ledger import balance_at, record_transaction, snapshot_balances
+from finance.pagination import KeysetPaginator
+from finance.report_service import build_report, period_range
+from finance.rollups import rebuild_monthly_totals, transaction_snapshot
+from finance.totals import user_totals, verify_totals
+
+
+class MonthlyCategoryTotalTests(TestCase):
+    """Testează menținerea incrementală a rollup-ului lunar"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON')
+        self.food = Category.objects.create(name='Mâncare', type='expense')
+        self.rent = Category.objects.create(name='Chirie', type='expense')
+
+    def _create(self, amount, category=None, day=date(2026, 3, 15), type='expense'):
+        return Transaction.objects.create(
+            user=self.user,
+            account=self.account,
+            category=category or self.food,
+            type=type,
+            amount=Decimal(amount),
+            date=day,
+        )
+
+    def _rollup(self, category, month=date(2026, 3, 1), type='expense'):
+        return MonthlyCategoryTotal.objects.filter(
+            user=self.user, category=category, month=month, type=type
+        ).first()
+
+    def _snapshot(self):
+        return sorted(
+            MonthlyCategoryTotal.objects.values_list('category_id', 'type', 'month', 'total', 'count')
+        )
+
+    def test_create_updates_rollup(self):
+        """Testează agregarea la creare"""
+        self._create('10.50')
+        self._create('4.50')
+
+        rollup = self._rollup(self.food)
+        self.assertEqual(rollup.total, Decimal('15.00'))
+        self.assertEqual(rollup.count, 2)
+
+    def test_edit_moves_amount_between_rows(self):
+        """Testează mutarea sumei la schimbarea categoriei și lunii"""
+        transaction = self._create('20.00')
+
+        transaction.category = self.rent
+        transaction.date = date(2026, 4, 2)
+        transaction.amount = Decimal('25.00')
+        transaction.save()
+
+        self.assertIsNone(self._rollup(self.food))
+        self.assertEqual(self._rollup(self.rent, month=date(2026, 4, 1)).total, Decimal('25.00'))
+
+    def test_delete_removes_amount(self):
+        """Testează scăderea la ștergere"""
+        keep = self._create('7.00')
+        self._create('3.00').delete()
+
+        rollup = self._rollup(self.food)
+        self.assertEqual(rollup.total, keep.amount)
+        self.assertEqual(rollup.count, 1)
+
+    def test_rebuild_matches_incremental(self):
+        """Testează că reconstruirea dă același rezultat ca actualizările incrementale"""
+        self._create('10.00')
+        self._create('5.00', category=self.rent, day=date(2026, 2, 1))
+        self._create('100.00', type='income', day=date(2026, 2, 28))
+        moved = self._create('1.00')
+        moved.date = date(2025, 12, 31)
+        moved.save()
+
+        incremental = self._snapshot()
+        rebuild_monthly_totals(self.user)
+
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_budget_list_reads_rollup(self):
+        """Testează calculul cheltuielilor pe buget"""
+        self._create('30.00')
+        Budget.objects.create(user=self.user, category=self.food, amount=Decimal('60.00'), month=date(2026, 3, 1))
+        self.client.force_login(self.user)
+
+        response = self.client.get('/finance/budgets/')
+
+        budget = response.context['budgets'][0]
+        self.assertEqual(budget.spent, Decimal('30.00'))
+        self.assertEqual(budget.remaining, Decimal('30.00'))
+        self.assertEqual(budget.percentage, Decimal('50'))
+
+
+class BudgetEvaluatorTests(TestCase):
+    """Testează evaluarea bugetelor dintr-o singură interogare"""
+
+    def setUp(self):
+        self.food = Category.objects.create(name='Mâncare', type='expense')
+        self.fun = Category.objects.create(name='Distracție', type='expense')
+        self.users = []
+        for name in ('ana', 'dan'):
+            user = User.objects.create_user(name, f'{name}@example.com', 'password')
+            account = Account.objects.create(user=user, name='Cont', currency='RON')
+            Transaction.objects.create(
+                user=user, account=account, category=self.food, type='expense',
+                amount=Decimal('80.00'), date=date(2026, 3, 10),
+            )
+            self.users.append(user)
+
+    def test_evaluate_is_single_query(self):
+        """Testează că evaluarea nu depinde de numărul de bugete"""
+        for user in self.users:
+            Budget.objects.create(user=user, category=self.food, amount=Decimal('100.00'), month=date(2026, 3, 1))
+            Budget.objects.create(user=user, category=self.fun, amount=Decimal('50.00'), month=date(2026, 3, 1))
+
+        with self.assertNumQueries(1):
+            budgets = BudgetEvaluator.evaluate(Budget.objects.all())
+
+        spent = sorted((b.category.name, b.spent) for b in budgets)
+        self.assertEqual(spent, [
+            ('Distracție', Decimal('0')), ('Distracție', Decimal('0')),
+            ('Mâncare', Decimal('80.00')), ('Mâncare', Decimal('80.00')),
+        ])
+
+    def test_overruns_across_users(self):
+        """Testează detectarea depășirilor pentru toți utilizatorii"""
+        over = Budget.objects.create(user=self.users[0], category=self.food, amount=Decimal('50.00'), month=date(2026, 3, 1))
+        Budget.objects.create(user=self.users[1], category=self.food, amount=Decimal('500.00'), month=date(2026, 3, 1))
+
+        with self.assertNumQueries(1):
+            overruns = BudgetEvaluator.overruns()
+
+        self.assertEqual([b.pk for b in overruns], [over.pk])
+        self.assertEqual(overruns[0].remaining, Decimal('-30.00'))
+
+    def test_crossed_by_only_on_crossing(self):
+        """Testează că doar tranzacția care trece pragul e raportată"""
+        budget = Budget.objects.create(user=self.users[0], category=self.food, amount=Decimal('100.00'), month=date(2026, 3, 1))
+        account = self.users[0].accounts.first()
+
+        crossing = Transaction(
+            user=self.users[0], account=account, category=self.food, type='expense',
+            amount=Decimal('30.00'), date=date(2026, 3, 11),
+        )
+        crossing.save()
+        self.assertEqual([b.pk for b in BudgetEvaluator.crossed_by(None, transaction_snapshot(crossing))], [budget.pk])
+
+        after = Transaction.objects.create(
+            user=self.users[0], account=account, category=self.food, type='expense',
+            amount=Decimal('5.00'), date=date(2026, 3, 12),
+        )
+        self.assertEqual(BudgetEvaluator.crossed_by(None, transaction_snapshot(after)), [])
+
+
+class KeysetPaginationTests(TestCase):
+    """Testează paginarea keyset a tranzacțiilor"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON')
+        self.other = Account.objects.create(user=self.user, name='Portofel', currency='RON')
+        for i in range(7):
+            Transaction.objects.create(
+                user=self.user, account=self.account if i % 2 else self.other,
+                type='expense', amount=Decimal(i + 1), date=date(2026, 3, 1 + i // 3),
+            )
+        self.client.force_login(self.user)
+
+    def test_pages_cover_all_rows_in_order(self):
+        """Testează că parcurgerea paginilor întoarce fiecare rând o singură dată"""
+        paginator = KeysetPaginator(self.user.transactions.all(), per_page=3)
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen.extend(page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        expected = list(self.user.transactions.order_by('-date', '-time', '-id'))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Testează că un cursor invalid e ignorat"""
+        page = KeysetPaginator(self.user.transactions.all(), per_page=3).page('not-a-cursor')
+        self.assertIsNone(page.cursor)
+        self.assertEqual(len(page), 3)
+
+    def test_feed_keeps_filters(self):
+        """Testează varianta JSON cu filtru de cont"""
+        response = self.client.get('/finance/api/transactions/', {'account': self.account.pk, 'per_page': 2})
+        data = response.json()
+
+        self.assertEqual(data['count'], 2)
+        self.assertTrue(data['has_next'])
+        self.assertTrue(all(t['account_id'] == self.account.pk for t in data['transactions']))
+
+        response = self.client.get('/finance/api/transactions/', {
+            'account': self.account.pk, 'per_page': 2, 'cursor': data['next_cursor'],
+        })
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertFalse(data['has_next'])
+
+
+class BalanceLedgerTests(TestCase):
+    """Testează registrul atomic al soldurilor și snapshot-urile"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON', balance=Decimal('100.00'))
+        self.wallet = Account.objects.create(user=self.user, name='Portofel', currency='RON')
+        self.category = Category.objects.create(name='Mâncare', type='expense')
+        self.client.force_login(self.user)
+
+    def _post(self, url, account, amount, type='expense', day='2026-03-10'):
+        return self.client.post(url, {
+            'account': account.pk, 'category': self.category.pk, 'type': type,
+            'amount': amount, 'description': '', 'date': day,
+        })
+
+    def _balances(self):
+        return [Account.objects.get(pk=a.pk).balance for a in (self.account, self.wallet)]
+
+    def test_create_edit_delete_keep_balance(self):
+        """Testează soldul la creare, mutare pe alt cont și ștergere"""
+        self._post('/finance/transactions/create/', self.account, '30.00')
+        self.assertEqual(self._balances(), [Decimal('70.00'), Decimal('0.00')])
+
+        transaction = Transaction.objects.get()
+        self._post(f'/finance/transactions/{transaction.pk}/edit/', self.wallet, '50.00', type='income')
+        self.assertEqual(self._balances(), [Decimal('100.00'), Decimal('50.00')])
+
+        self.client.post(f'/finance/transactions/{transaction.pk}/delete/')
+        self.client.post(f'/finance/transactions/{transaction.pk}/delete/')
+        self.assertEqual(self._balances(), [Decimal('100.00'), Decimal('0.00')])
+
+    def test_stale_instance_does_not_overwrite_balance(self):
+        """Testează că o instanță veche a contului nu suprascrie soldul"""
+        stale = Account.objects.get(pk=self.account.pk)
+        record_transaction(Transaction(
+            user=self.user, account=self.account, category=self.category,
+            type='expense', amount=Decimal('10.00'), date=date(2026, 3, 1),
+        ))
+        record_transaction(Transaction(
+            user=self.user, account=stale, category=self.category,
+            type='expense', amount=Decimal('15.00'), date=date(2026, 3, 2),
+        ))
+        self.assertEqual(self._balances()[0], Decimal('75.00'))
+
+    def test_balance_at_uses_snapshots(self):
+        """Testează soldul istoric înainte, între și după snapshot-uri"""
+        for day, amount in ((1, '10.00'), (5, '20.00'), (9, '30.00')):
+            record_transaction(Transaction(
+                user=self.user, account=self.account, category=self.category,
+                type='expense', amount=Decimal(amount), date=date(2026, 3, day),
+            ))
+        self.assertEqual(balance_at(self.account, date(2026, 3, 6)), Decimal('70.00'))
+
+        snapshot_balances(date(2026, 3, 5))
+        self.assertEqual(
+            AccountBalanceSnapshot.objects.get(account=self.account).balance, Decimal('70.00')
+        )
+        self.assertEqual(balance_at(self.account, date(2026, 3, 2)), Decimal('90.00'))
+        self.assertEqual(balance_at(self.account, date(2026, 3, 9)), Decimal('40.00'))
+
+        # O tranzacție retroactivă corectează și snapshot-ul
+        record_transaction(Transaction(
+            user=self.user, account=self.account, category=self.category,
+            type='income', amount=Decimal('5.00'), date=date(2026, 3, 3),
+        ))
+        self.assertEqual(balance_at(self.account, date(2026, 3, 5)), Decimal('75.00'))
+        self.assertEqual(balance_at(self.account, date(2026, 2, 28)), Decimal('100.00'))
+
+
+class BalanceHistoryTests(TestCase):
+    """Testează istoricul soldurilor construit din variațiile zilnice"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON', balance=Decimal('100.00'))
+        self.category = Category.objects.create(name='Mâncare', type='expense')
+        for day, amount, type in ((2, '10.00', 'expense'), (4, '50.00', 'income'), (4, '5.00', 'expense')):
+            record_transaction(Transaction(
+                user=self.user, account=self.account, category=self.category,
+                type=type, amount=Decimal(amount), date=date(2026, 3, day),
+            ))
+        self.client.force_login(self.user)
+
+    def test_flows_follow_edits(self):
+        """Testează menținerea incrementală și reconstruirea variațiilor"""
+        moved = Transaction.objects.get(amount=Decimal('10.00'))
+        moved.date = date(2026, 3, 4)
+        moved.save()
+
+        incremental = sorted(AccountDailyFlow.objects.values_list('date', 'net', 'count'))
+        self.assertEqual(incremental, [(date(2026, 3, 4), Decimal('35.00'), 3)])
+
+        rebuild_daily_flows(self.user)
+        self.assertEqual(sorted(AccountDailyFlow.objects.values_list('date', 'net', 'count')), incremental)
+
+    def test_daily_series(self):
+        """Testează seria zilnică reconstruită înapoi de la soldul curent"""
+        response = self.client.get(
+            f'/finance/api/accounts/{self.account.pk}/balance-history/',
+            {'start_date': '2026-03-01', 'end_date': '2026-03-05'},
+        )
+        data = response.json()
+
+        self.assertEqual(data['interval'], 'day')
+        self.assertEqual([p['balance'] for p in data['points']], [100.0, 90.0, 90.0, 135.0, 135.0])
+
+    def test_long_range_is_downsampled(self):
+        """Testează eșantionarea lunară pentru perioade lungi"""
+        with self.assertNumQueries(2):
+            interval, points = balance_history(self.account, date(2021, 3, 1), date(2026, 3, 31))
+
+        self.assertEqual(interval, 'month')
+        self.assertEqual(len(points), 61)
+        self.assertEqual(points[-2], (date(2026, 2, 28), Decimal('100.00')))
+
+    def test_net_worth_by_currency(self):
+        """Testează patrimoniul net separat pe monedă"""
+        Account.objects.create(user=self.user, name='Euro', currency='EUR', balance=Decimal('20.00'))
+        response = self.client.get('/finance/api/net-worth/', {'start_date': '2026-03-03', 'end_date': '2026-03-04'})
+        series = response.json()['series']
+
+        self.assertEqual([p['balance'] for p in series['RON']], [90.0, 135.0])
+        self.assertEqual([p['balance'] for p in series['EUR']], [20.0, 20.0])
+
+    def test_invalid_range(self):
+        """Testează validarea perioadei"""
+        response = self.client.get('/finance/api/net-worth/', {'start_date': '2026-03-05', 'end_date': '2026-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DashboardCacheTests(TestCase):
+    """Testează cache-ul dashboard-ului și invalidarea din semnale"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON', balance=Decimal('100.00'))
+        self.category = Category.objects.create(name='Mâncare', type='expense')
+        self.client.force_login(self.user)
+
+    def _dashboard(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/finance/')
+        touched = any(Transaction._meta.db_table in q['sql'] for q in captured.captured_queries)
+        return response.context, touched
+
+    def test_repeat_load_skips_transactions(self):
+        """Testează că a doua încărcare nu citește tranzacțiile"""
+        _, touched = self._dashboard()
+        self.assertTrue(touched)
+
+        context, touched = self._dashboard()
+        self.assertFalse(touched)
+        self.assertEqual(context['total_balance'], Decimal('100.00'))
+
+    def test_signals_invalidate(self):
+        """Testează invalidarea la tranzacții, conturi și bugete"""
+        self._dashboard()
+
+        record_transaction(Transaction(
+            user=self.user, account=self.account, category=self.category,
+            type='expense', amount=Decimal('30.00'), date=timezone.localdate(),
+        ))
+        context, touched = self._dashboard()
+        self.assertTrue(touched)
+        self.assertEqual(context['total_expenses'], Decimal('30.00'))
+        self.assertEqual(context['recent_transactions'][0]['category_name'], 'Mâncare')
+
+        Budget.objects.create(
+            user=self.user, category=self.category, amount=Decimal('60.00'),
+            month=timezone.localdate().replace(day=1),
+        )
+        context, _ = self._dashboard()
+        self.assertEqual(context['budgets'][0]['spent'], Decimal('30.00'))
+
+        self.account.delete()
+        context, _ = self._dashboard()
+        self.assertEqual(context['accounts'], [])
+        self.assertEqual(context['total_expenses'], Decimal('0'))
+
+    def test_other_users_cache_untouched(self):
+        """Testează că invalidarea e limitată la proprietar"""
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        self._dashboard()
+        Account.objects.create(user=other, name='Alt cont', currency='RON')
+
+        _, touched = self._dashboard()
+        self.assertFalse(touched)
+
+
+class UserTotalsTests(TestCase):
+    """Testează totalurile all-time menținute la fiecare scriere"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.ron = Account.objects.create(user=self.user, name='Cont', currency='RON')
+        self.eur = Account.objects.create(user=self.user, name='Euro', currency='EUR')
+
+    def _create(self, account, amount, type='expense'):
+        return Transaction.objects.create(
+            user=self.user, account=account, type=type, amount=Decimal(amount), date=date(2026, 3, 1),
+        )
+
+    def _stored(self):
+        return sorted(UserTotals.objects.values_list('currency', 'income', 'expense', 'count'))
+
+    def test_totals_follow_writes(self):
+        """Testează creare, mutare între monede și ștergere"""
+        self._create(self.ron, '100.00', type='income')
+        moved = self._create(self.ron, '40.00')
+        self._create(self.eur, '5.00').delete()
+
+        moved.account = self.eur
+        moved.save()
+
+        self.assertEqual(self._stored(), [
+            ('EUR', Decimal('0.00'), Decimal('40.00'), 1),
+            ('RON', Decimal('100.00'), Decimal('0.00'), 1),
+        ])
+        with self.assertNumQueries(1):
+            totals = user_totals(self.user)
+        self.assertEqual(totals['income'] - totals['expense'], Decimal('60.00'))
+
+    def test_verify_repairs_drift(self):
+        """Testează detectarea și repararea abaterilor"""
+        self._create(self.ron, '25.00')
+        UserTotals.objects.update(expense=Decimal('999.00'))
+        UserTotals.objects.create(user=self.user, currency='USD', income=Decimal('1.00'), count=1)
+
+        out = StringIO()
+        call_command('verify_totals', '--dry-run', stdout=out)
+        self.assertIn('2 abateri', out.getvalue())
+        self.assertEqual(len(self._stored()), 2)
+
+        call_command('verify_totals', stdout=StringIO())
+        self.assertEqual(self._stored(), [('RON', Decimal('0.00'), Decimal('25.00'), 1)])
+        self.assertEqual(verify_totals(), [])
+
+    def test_currency_change_moves_totals(self):
+        """Testează recalcularea la schimbarea monedei contului"""
+        self._create(self.ron, '10.00')
+        self.ron.currency = 'USD'
+        self.ron.save()
+
+        self.assertEqual(self._stored(), [('USD', Decimal('0.00'), Decimal('10.00'), 1)])
+
+
+class ReportTests(TestCase):
+    """Testează rapoartele pe perioade arbitrare"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON')
+        self.food = Category.objects.create(name='Mâncare', type='expense')
+        self.salary = Category.objects.create(name='Salariu', type='income')
+        for day, amount, category, type in (
+            (date(2026, 1, 5), '10.00', self.food, 'expense'),
+            (date(2026, 1, 6), '15.00', self.food, 'expense'),
+            (date(2026, 2, 1), '1000.00', self.salary, 'income'),
+            (date(2026, 3, 31), '20.00', self.food, 'expense'),
+            (date(2025, 12, 31), '99.00', self.food, 'expense'),
+        ):
+            Transaction.objects.create(
+                user=self.user, account=self.account, category=category,
+                type=type, amount=Decimal(amount), date=day,
+            )
+        self.client.force_login(self.user)
+
+    def test_quarter_by_month_is_single_query(self):
+        """Testează un trimestru pe luni dintr-o singură interogare"""
+        with self.assertNumQueries(1):
+            report = build_report(self.user, *period_range('quarter', date(2026, 2, 10)), 'month')
+
+        self.assertEqual(report['labels'], ['2026-01-01', '2026-02-01', '2026-03-01'])
+        self.assertEqual(report['totals']['expense']['data'], [25.0, 0.0, 20.0])
+        self.assertEqual(report['series']['income'][0]['category'], 'Salariu')
+        self.assertEqual(report['by_category']['expense'], {'Mâncare': 45.0})
+
+    def test_custom_range_by_week(self):
+        """Testează o perioadă personalizată pe săptămâni"""
+        response = self.client.get('/finance/api/reports/', {
+            'period': 'custom', 'start_date': '2025-12-29', 'end_date': '2026-01-11', 'granularity': 'week',
+        })
+        data = response.json()
+
+        self.assertEqual(data['labels'], ['2025-12-29', '2026-01-05'])
+        self.assertEqual(data['totals']['expense']['data'], [99.0, 25.0])
+
+    def test_long_daily_range_is_coarsened(self):
+        """Testează creșterea granularității pentru perioade lungi"""
+        with self.assertNumQueries(1):
+            report = build_report(self.user, date(2023, 1, 1), date(2026, 12, 31), 'day')
+
+        self.assertEqual(report['granularity'], 'week')
+        self.assertLessEqual(len(report['labels']), 400)
+        self.assertEqual(report['totals']['expense']['total'], 144.0)
+
+    def test_invalid_custom_range(self):
+        """Testează validarea perioadei personalizate"""
+        response = self.client.get('/finance/api/reports/', {'period': 'custom', 'start_date': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/finance/reports/', {'period': 'custom', 'start_date': '2026-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+
+class HttpCacheTests(TestCase):
+    """Testează ETag/Last-Modified și formatul compact al endpoint-urilor interogate periodic"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.account = Account.objects.create(user=self.user, name='Cont', currency='RON')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='testuser',
+        )
+        self._bank_transaction('BT Pay - Lidl, Cluj')
+        self.client.force_login(self.user)
+
+    def _bank_transaction(self, description):
+        return BankTransaction.objects.create(
+            user=self.user, bank_connection=self.connection, external_id=description,
+            amount=Decimal('-12.50'), currency='RON', description=description,
+            date=timezone.now(), sync_status='pending',
+        )
+
+    def test_unchanged_poll_returns_304(self):
+        """Testează 304 până la următoarea scriere a utilizatorului"""
+        url = '/finance/api/bt-pay/pending/'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        self._bank_transaction('BT Pay - Mega Image, Cluj')
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['pending_count'], 2)
+
+        Transaction.objects.create(
+            user=self.user, account=self.account, type='expense', amount=Decimal('1.00'), date=date(2026, 3, 1),
+        )
+        report = self.client.get('/finance/api/reports/', HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(report.status_code, 200)
+        self.assertEqual(
+            self.client.get('/finance/api/reports/', HTTP_IF_NONE_MATCH=report['ETag']).status_code, 304
+        )
+
+    def test_html_pages_are_not_cached(self):
+        """Testează că paginile HTML nu primesc ETag (token CSRF și mesaje proaspete)"""
+        response = self.client.get('/finance/reports/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.client.get('/finance/reports/', HTTP_IF_NONE_MATCH='*').status_code, 200)
+
+    def test_other_user_writes_keep_etag(self):
+        """Testează că scrierile altui utilizator nu invalidează"""
+        first = self.client.get('/finance/api/bt-pay/transactions/')
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        Transaction.objects.create(
+            user=other, account=Account.objects.create(user=other, name='Cont', currency='RON'),
+            type='expense', amount=Decimal('1.00'), date=date(2026, 3, 1),
+        )
+        again = self.client.get('/finance/api/bt-pay/transactions/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_columns_layout(self):
+        """Testează formatul pe coloane"""
+        rows = self.client.get('/finance/api/bt-pay/transactions/').json()['transactions']
+        data = self.client.get('/finance/api/bt-pay/transactions/', {'layout': 'columns'}).json()['transactions']
+
+        self.assertEqual(data['fields'], list(rows[0].keys()))
+        self.assertEqual(data['values'][data['fields'].index('amount')], [-12.5])
+
+    def test_gzip_for_capable_clients(self):
+        """Testează compresia răspunsurilor"""
+        for i in range(40):
+            self._bank_transaction(f'BT Pay - Merchant {i}, Cluj')
+        response = self.client.get('/finance/api/bt-pay/transactions/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class BTPayClassificationTests(TestCase):
+    """Testează clasificarea BT Pay salvată pe tranzacțiile bancare"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='testuser',
+        )
+        self.client.force_login(self.user)
+
+    def _bank_transaction(self, description, amount='-10.00', sync_status='synced'):
+        return BankTransaction.objects.create(
+            user=self.user, bank_connection=self.connection, external_id=f'{description}-{amount}',
+            amount=Decimal(amount), currency='RON', description=description,
+            date=timezone.now(), sync_status=sync_status,
+        )
+
+    def test_save_classifies(self):
+        """Testează clasificarea la salvare"""
+        bank_transaction = self._bank_transaction('BT Pay - Lidl, Cluj')
+        self.assertTrue(bank_transaction.is_bt_pay)
+        self.assertEqual(bank_transaction.merchant_normalized, 'Lidl')
+        self.assertEqual(bank_transaction.category_guess, 'shopping')
+        self.assertFalse(self._bank_transaction('Transfer chirie').is_bt_pay)
+
+    def test_stats_grouped_in_database(self):
+        """Testează statisticile calculate din coloanele salvate"""
+        self._bank_transaction('BT Pay - Lidl, Cluj', '-20.00')
+        self._bank_transaction('BT Pay - Lidl, Cluj', '-5.00')
+        self._bank_transaction('BT Pay - Uber, Cluj', '-15.00')
+        self._bank_transaction('BT Pay - Necunoscut SRL', '-1.00')
+        self._bank_transaction('Transfer chirie', '-900.00')
+        self._bank_transaction('BT Pay - Bolt', '-7.00', sync_status='pending')
+
+        with self.assertNumQueries(2):
+            stats = BTPay.get_bt_pay_stats(self.user, days=30)
+
+        self.assertEqual(stats['total_transactions'], 4)
+        self.assertEqual(stats['total_amount'], Decimal('41.00'))
+        self.assertEqual(stats['transactions_by_category'], {
+            'shopping': {'count': 2, 'total': Decimal('25.00')},
+            'transport': {'count': 1, 'total': Decimal('15.00')},
+            'other': {'count': 1, 'total': Decimal('1.00')},
+        })
+        self.assertEqual(list(stats['top_merchants']), ['Lidl', 'Uber', 'Necunoscut SRL'])
+
+        pending = self.client.get('/finance/api/bt-pay/pending/').json()
+        self.assertEqual(pending['pending_count'], 1)
+        self.assertEqual(pending['pending_transactions'][0]['category_guess'], 'transport')
+
+    def test_stats_windows_in_one_scan(self):
+        """Testează mai multe ferestre de timp calculate din aceleași interogări"""
+        self._bank_transaction('BT Pay - Lidl, Cluj', '-20.00')
+        old = self._bank_transaction('BT Pay - Uber, Cluj', '-17.00')
+        BankTransaction.objects.filter(pk=old.pk).update(date=timezone.now() - timedelta(days=10))
+        self._bank_transaction('BT Pay - Uber, Cluj', '-4.00')
+
+        with self.assertNumQueries(2):
+            windows = BTPay.get_bt_pay_stats_windows(self.user, {'1d': 1, '7d': 7, '30d': 30}, top=1)
+
+        self.assertEqual(windows['1d'], windows['7d'])
+        self.assertEqual(windows['1d']['total_transactions'], 2)
+        self.assertEqual(windows['1d']['top_merchants'], {'Lidl': {'count': 1, 'total': Decimal('20.00')}})
+        self.assertEqual(windows['30d']['total_amount'], Decimal('41.00'))
+        self.assertEqual(windows['30d']['transactions_by_category']['transport'], {'count': 2, 'total': Decimal('21.00')})
+        self.assertEqual(windows['30d']['top_merchants'], {'Uber': {'count': 2, 'total': Decimal('21.00')}})
+        self.assertEqual(
+            BTPay.get_bt_pay_stats(self.user, days=30)['transactions_by_category'],
+            windows['30d']['transactions_by_category'],
+        )
+
+    def test_keywords_match_whole_words_by_priority(self):
+        """Testează limitele de cuvânt și prioritatea categoriilor"""
+        self.assertEqual(BTPay.guess_category('BT Pay - Booking.com'), 'travel')
+        self.assertEqual(BTPay.guess_category('BT Pay - Barber Shop'), 'shopping')
+        self.assertEqual(BTPay.guess_category('BT Pay - Gas Station Petrom'), 'transport')
+        self.assertEqual(BTPay.guess_category('BT Pay - Pizza Hut Mall'), 'food')
+        self.assertIsNone(BTPay.guess_category('BT Pay - Necunoscut SRL'))
+        self.assertIsNone(BTPay.guess_category(None))
+
+    def test_batch_matches_single(self):
+        """Testează că API-ul în lot dă aceleași categorii ca apelurile individuale"""
+        descriptions = [
+            'BT Pay - Starbucks', None, '', 'BT Pay - Uber trip', 'BT Pay - Vodafone bar',
+            'Plata carte librarie', 'BT Pay - Steam', 'BT Pay - Dentist',
+        ] * 50
+        self.assertEqual(
+            BTPay.guess_categories(descriptions),
+            [BTPay.guess_category(description) for description in descriptions],
+        )
+
+    def test_command_reclassifies_stale_rows(self):
+        """Testează backfill-ul rândurilor clasificate cu reguli vechi"""
+        bank_transaction = self._bank_transaction('BT Pay - Netflix')
+        BankTransaction.objects.update(is_bt_pay=False, category_guess='', classification_version=0)
+        self._bank_transaction('BT Pay - Spotify')
+
+        out = StringIO()
+        call_command('classify_bt_pay', stdout=out)
+
+        bank_transaction.refresh_from_db()
+        self.assertTrue(bank_transaction.is_bt_pay)
+        self.assertEqual(bank_transaction.category_guess, 'entertainment')
+        self.assertIn('Clasificate 1 tranzacții', out.getvalue())
+
+
+class BTPayBucketTests(TestCase):
+    """Testează rollup-ul BT Pay pe ore și zile"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='testuser',
+        )
+        self.client.force_login(self.user)
+
+    def _bank_transaction(self, description, amount='-10.00', hours_ago=0, sync_status='synced', when=None):
+        return BankTransaction.objects.create(
+            user=self.user, bank_connection=self.connection, external_id=f'{description}-{amount}-{hours_ago}',
+            amount=Decimal(amount), currency='RON', description=description,
+            date=when or timezone.now() - timedelta(hours=hours_ago), sync_status=sync_status,
+        )
+
+    def _buckets(self):
+        return sorted(BTPayBucket.objects.values_list(
+            'granularity', 'bucket_start', 'category', 'sync_status', 'count', 'total',
+        ))
+
+    def test_incremental_matches_rebuild(self):
+        """Testează că actualizările incrementale dau același rezultat ca reconstruirea"""
+        lidl = self._bank_transaction('BT Pay - Lidl', '-20.00', sync_status='pending')
+        self._bank_transaction('BT Pay - Uber', '-15.00', hours_ago=30)
+        removed = self._bank_transaction('BT Pay - Bolt', '-5.00', hours_ago=3)
+        self._bank_transaction('Transfer chirie', '-900.00')
+
+        lidl.sync_status = 'synced'
+        lidl.save()
+        removed.delete()
+        incremental = self._buckets()
+
+        self.assertEqual(bt_pay_buckets.rebuild_buckets(self.user), len(incremental))
+        self.assertEqual(self._buckets(), incremental)
+        self.assertFalse(BTPayBucket.objects.filter(sync_status='pending').exists())
+
+    def test_admin_bulk_status_change_keeps_buckets(self):
+        """Testează că acțiunile în masă din admin refac rollup-ul"""
+        self._bank_transaction('BT Pay - Lidl', '-20.00', sync_status='pending')
+        self._bank_transaction('BT Pay - Uber', '-15.00', hours_ago=30, sync_status='pending')
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        response = self.client.post('/admin/finance/banktransaction/', {
+            'action': 'mark_as_synced',
+            '_selected_action': list(BankTransaction.objects.values_list('pk', flat=True)),
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(BTPayBucket.objects.filter(sync_status='pending').exists())
+        self.assertEqual(sum(BTPayBucket.objects.filter(
+            granularity='day', sync_status='synced',
+        ).values_list('count', flat=True)), 2)
+
+    def test_windows_across_dst_changes(self):
+        """Testează fereastra de 24h în zilele cu schimbarea orei"""
+        bucharest = ZoneInfo('Europe/Bucharest')
+        utc = dt_timezone.utc
+        # 25.10.2026: ora 04:00 devine 03:00, deci 03:30 local apare de două ori
+        self._bank_transaction('BT Pay - Lidl', '-20.00', when=datetime(2026, 10, 25, 0, 30, tzinfo=utc))
+        self._bank_transaction('BT Pay - Uber', '-15.00', when=datetime(2026, 10, 25, 1, 30, tzinfo=utc))
+        # Cu 24h și jumătate înainte de 25.10 12:00 EET, în afara ferestrei
+        self._bank_transaction('BT Pay - Bolt', '-5.00', when=datetime(2026, 10, 24, 9, 30, tzinfo=utc))
+
+        autumn = datetime(2026, 10, 25, 12, tzinfo=bucharest)
+        spring = datetime(2026, 3, 29, 12, tzinfo=bucharest)
+        for now in (autumn, spring):
+            starts = [row['start'].astimezone(utc) for row in bt_pay_buckets.series(self.user, 24, now=now)]
+            self.assertEqual([b - a for a, b in zip(starts, starts[1:])], [timedelta(hours=1)] * 23)
+            self.assertEqual(starts[-1], now)
+
+        self.assertEqual(sum(row['count'] for row in bt_pay_buckets.series(self.user, 24, now=autumn)), 2)
+        totals = bt_pay_buckets.category_totals(self.user, hours=24, now=autumn)
+        self.assertEqual(sum(row['count'] for row in totals.values()), 2)
+
+    def test_hourly_summary_reads_buckets(self):
+        """Testează rezumatul pe ore și categoriile din rollup"""
+        self._bank_transaction('BT Pay - Lidl', '-20.00')
+        self._bank_transaction('BT Pay - Uber', '-15.00', hours_ago=2)
+        self._bank_transaction('BT Pay - Uber', '-7.00', hours_ago=50)
+
+        with CaptureQueriesContext(connection) as queries:
+            hours = self.client.get('/finance/api/bt-pay/hourly/').json()
+        self.assertEqual(
+            sum(BankTransaction._meta.db_table in query['sql'] for query in queries.captured_queries), 0
+        )
+
+        self.assertEqual(len(hours['hours']), 24)
+        self.assertEqual(hours['hours'][-1]['count'], 1)
+        self.assertEqual(hours['hours'][-3]['amount'], 15.0)
+        self.assertEqual(hours['total_transactions'], 2)
+
+        categories = self.client.get('/finance/api/bt-pay/categories/').json()['categories']
+        self.assertEqual(categories['transport'], {
+            'today': {'count': 1, 'amount': 15.0},
+            'week': {'count': 2, 'amount': 22.0},
+        })
+
+
+class MerchantSketchTests(TestCase):
+    """Testează schița Space-Saving a top comercianților"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='testuser',
+        )
+
+    def _bank_transaction(self, merchant, amount, days_ago=0):
+        return BankTransaction.objects.create(
+            user=self.user, bank_connection=self.connection,
+            external_id=f'{merchant}-{amount}-{days_ago}-{BankTransaction.objects.count()}',
+            amount=Decimal(amount), currency='RON', description=f'BT Pay - {merchant}',
+            date=timezone.now() - timedelta(days=days_ago), sync_status='synced',
+        )
+
+    def test_space_saving_bounds(self):
+        """Testează limitele de eroare și garanțiile pe un flux cu mult zgomot"""
+        sketch = merchant_sketch.SpaceSaving(capacity=5)
+        truth = {}
+        stream = [('Lidl', 50), ('Emag', 30)] * 20 + [(f'Mic {i}', 3) for i in range(200)]
+        random.Random(7).shuffle(stream)
+        for name, weight in stream:
+            sketch.add(name, weight)
+            truth[name] = truth.get(name, 0) + weight
+
+        self.assertEqual(len(sketch.counters), 5)
+        top = sketch.top(2)
+        self.assertEqual([entry[0] for entry in top], ['Lidl', 'Emag'])
+        self.assertTrue(all(entry[4] for entry in top))
+        for name, weight, count, error, guaranteed in sketch.top(5):
+            self.assertLessEqual(weight - error, truth[name])
+            self.assertGreaterEqual(weight, truth[name])
+        self.assertTrue(all(truth[name] <= sketch.floor for name in truth if name not in sketch.counters))
+
+    def test_sketch_updated_on_create_and_matches_exact(self):
+        """Testează actualizarea la creare și modul exact pentru ferestre"""
+        self._bank_transaction('Lidl', '-20.00')
+        self._bank_transaction('Lidl', '-5.50', days_ago=40)
+        self._bank_transaction('Uber', '-22.00')
+        BankTransaction.objects.create(
+            user=self.user, bank_connection=self.connection, external_id='chirie', amount=Decimal('-900.00'),
+            description='Transfer chirie', date=timezone.now(), sync_status='synced',
+        )
+
+        approximate = BTPay.top_merchants(self.user, k=2)
+        self.assertEqual(approximate, BTPay.top_merchants(self.user, k=2, exact=True))
+        self.assertEqual(approximate['Lidl']['total'], Decimal('25.50'))
+        self.assertEqual(approximate['Lidl']['error'], 0)
+        self.assertEqual(list(BTPay.top_merchants(self.user, k=2, days=30)), ['Uber', 'Lidl'])
+        self.assertEqual(MerchantSketch.objects.get(user=self.user).total_cents, 4750)
+
+    def test_rebuild_command_keeps_capacity_counters(self):
+        """Testează reconstruirea exactă cu capacitate redusă"""
+        for i, amount in enumerate(['-40.00', '-30.00', '-20.00', '-10.00']):
+            self._bank_transaction(f'Magazin {i}', amount)
+
+        call_command('rebuild_merchant_sketches', user=self.user.pk, capacity=2, stdout=StringIO())
 
-# Create your tests here.
+        sketch = MerchantSketch.objects.get(user=self.user)
+        self.assertEqual(len(sketch.counters), 2)
+        self.assertEqual(sketch.total_cents, 10000)
+        top = BTPay.top_merchants(self.user, k=1)
+        self.assertEqual(top['Magazin 0'], {
+            'count': 1, 'total': Decimal('40'), 'error': Decimal('0'), 'guaranteed': True,
+        })
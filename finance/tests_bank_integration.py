@@ -3,11 +3,27 @@ Test Suite pentru Bank Integration
 Rulează: python manage.py test finance.tests_bank_integration
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.core.cache import cache
 from django.contrib.auth.models import User
-from finance.models import BankConnection, BankTransaction, Account, Transaction, Category
+from finance.models import (
+    BankConnection, BankSyncCursor, BankTransaction, BTPayBucket, Account, Transaction, Category, SyncJob, SyncRun,
+)
 from finance.bank_services import BankServiceFactory, RevolutBankService, BTBankService
+from finance.bt_pay_service import BTPay
+from finance.sync_engine import SyncEngine
+from finance.sync_scheduler import SyncScheduler, next_interval
+from finance.sync_runs import connections_to_resume, mark_stale_runs, percentile
+from finance.sync_jobs import claim_next_job, enqueue_sync, notify, recover_stale_jobs, run_job
+from finance import circuit_breaker, http_client
+from finance.http_cache import bump_data_version
 from unittest.mock import patch, MagicMock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from urllib3 import HTTPResponse
+from django.core.cache.backends.locmem import LocMemCache
+import threading
+import time
 from decimal import Decimal
 from datetime import datetime, timedelta
 from django.utils import timezone
@@ -215,7 +231,7 @@ class BankSyncTests(TestCase):
             currency='RON'
         )
     
-    @patch('finance.bank_services.requests.get')
+    @patch('finance.bank_services.http_client.get')
     def test_revolut_api_call(self, mock_get):
         """Testează apel API Revolut (mock)"""
         mock_response = MagicMock()
@@ -263,6 +279,889 @@ class ManagementCommandTests(TestCase):
         self.assertIn('Sincronizate', output)
 
 
+class SyncEngineTests(TestCase):
+    """Testează motorul de sincronizare concurentă"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connections = [
+            BankConnection.objects.create(
+                user=self.user, bank=('bt', 'revolut')[i % 2], account_name=f'Cont {i}',
+                access_token='test_token_123', api_user_id=f'account-{i}',
+            )
+            for i in range(6)
+        ]
+    
+    def _service(self, delay=0.0, fail_on=None, tracker=None):
+        def get_service(connection):
+            service = MagicMock()
+            
+            def sync_transactions(days_back=30, full=False):
+                if tracker is not None:
+                    tracker.enter(connection.bank)
+                try:
+                    time.sleep(delay)
+                    if connection.pk == fail_on:
+                        raise ValueError('Token expirat')
+                    return 2
+                finally:
+                    if tracker is not None:
+                        tracker.leave(connection.bank)
+            
+            service.sync_transactions.side_effect = sync_transactions
+            return service
+        return get_service
+    
+    def test_report_collects_results_and_errors(self):
+        """Testează raportul structurat cu erori"""
+        failing = self.connections[1].pk
+        with patch('finance.sync_engine.BankServiceFactory.get_service', side_effect=self._service(fail_on=failing)):
+            report = SyncEngine(max_workers=1, update_balances=False).run(BankConnection.objects.all())
+        
+        self.assertEqual(report.total_synced, 10)
+        self.assertEqual([r.connection_id for r in report.failed], [failing])
+        self.assertEqual(report.as_dict()['failed'], 1)
+        self.assertIn('Token expirat', report.failed[0].error)
+    
+    def test_http_failure_reported_as_error(self):
+        """Testează că o bancă inaccesibilă apare ca eșec, nu ca sincronizare fără rânduri"""
+        circuit_breaker._cache().clear()
+        connection = self.connections[0]
+        with patch('finance.http_client.get', side_effect=requests.ConnectionError('boom')):
+            result = SyncEngine(max_workers=1).sync_connection(connection)
+        
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, 'boom')
+        self.assertFalse(result.balance_updated)
+        self.assertEqual(connection.sync_runs.get().status, 'failed')
+    
+    def test_parallel_with_per_bank_limit(self):
+        """Testează paralelismul limitat per bancă"""
+        class Tracker:
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.active = {'bt': 0, 'revolut': 0}
+                self.peak = {'bt': 0, 'revolut': 0}
+            
+            def enter(self, bank):
+                with self.lock:
+                    self.active[bank] += 1
+                    self.peak[bank] = max(self.peak[bank], self.active[bank])
+            
+            def leave(self, bank):
+                with self.lock:
+                    self.active[bank] -= 1
+        
+        tracker = Tracker()
+        engine = SyncEngine(
+            max_workers=6, per_bank_concurrency={'bt': 1, 'revolut': 3}, update_balances=False,
+        )
+        with patch('finance.sync_engine.BankServiceFactory.get_service', side_effect=self._service(0.1, tracker=tracker)):
+            report = engine.run(self.connections)
+        
+        self.assertEqual(report.total_synced, 12)
+        self.assertEqual(tracker.peak['bt'], 1)
+        self.assertGreater(tracker.peak['revolut'], 1)
+        self.assertLess(report.duration, 0.55)
+
+
+class BulkIngestTests(TestCase):
+    """Testează inserarea în bloc a tranzacțiilor bancare"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='bt-1',
+        )
+        self.service = BTBankService(self.connection)
+    
+    def _page(self, *ids):
+        return [
+            {
+                'TransactionId': external_id,
+                'Amount': {'Amount': '-12.50', 'Currency': 'RON'},
+                'BookingDate': '2024-03-01T10:00:00+00:00',
+                'SupplementaryData': {'description': f'Plata {external_id}'},
+            }
+            for external_id in ids
+        ]
+    
+    def test_page_inserted_with_accurate_counts(self):
+        """Testează numărul de tranzacții inserate, duplicate și invalide"""
+        BankTransaction.objects.create(
+            user=self.user, bank_connection=self.connection, external_id='t1',
+            amount=Decimal('-12.50'), description='Plata t1', date=timezone.now(),
+        )
+        page = self._page('t1', 't2', 't3', 't3') + [{'Amount': {'Amount': '1'}}]
+        
+        result = self.service.ingest_transactions(page)
+        
+        self.assertEqual(result.as_dict(), {'inserted': 2, 'skipped': 2, 'invalid': 1})
+        self.assertEqual(BankTransaction.objects.filter(external_id__in=['t2', 't3']).count(), 2)
+        self.assertEqual(self.service.ingest_transactions(page).as_dict(), {'inserted': 0, 'skipped': 4, 'invalid': 1})
+        self.assertEqual(self.service.ingest_result.inserted, 2)
+    
+    def test_page_uses_constant_queries(self):
+        """Testează că o pagină mare nu face interogări per tranzacție"""
+        bump_data_version(self.user.pk)
+        page = self._page(*[f'tx-{i}' for i in range(50)])
+        
+        # existente, INSERT, numărare, versiunea datelor
+        with self.assertNumQueries(4):
+            result = self.service.ingest_transactions(page)
+        
+        self.assertEqual(result.inserted, 50)
+    
+    def test_page_classified_for_bt_pay(self):
+        """Testează clasificarea BT Pay la ingestie"""
+        page = self._page('t1', 't2')
+        page[0]['SupplementaryData']['description'] = 'BT Pay - Starbucks Iulius, Cluj'
+        
+        self.service.ingest_transactions(page)
+        
+        bt_pay = BankTransaction.objects.get(external_id='t1')
+        self.assertTrue(bt_pay.is_bt_pay)
+        self.assertEqual(bt_pay.merchant_normalized, 'Starbucks Iulius')
+        self.assertEqual(bt_pay.category_guess, 'food')
+        self.assertFalse(BankTransaction.objects.get(external_id='t2').is_bt_pay)
+        self.assertEqual(
+            set(BTPayBucket.objects.values_list('granularity', 'category', 'sync_status', 'count', 'total')),
+            {('hour', 'food', 'pending', 1, Decimal('12.50')), ('day', 'food', 'pending', 1, Decimal('12.50'))},
+        )
+        self.assertEqual(
+            set(BankTransaction.objects.values_list('classification_version', flat=True)),
+            {BTPay.CLASSIFICATION_VERSION},
+        )
+    
+    def test_sync_returns_inserted_count(self):
+        """Testează că sincronizarea BT raportează doar tranzacțiile noi"""
+        accounts = MagicMock()
+        accounts.json.return_value = {'Data': {'Account': [{'AccountId': 'acc-1'}]}}
+        transactions = MagicMock()
+        transactions.json.return_value = {'Data': {'Transaction': self._page('a', 'b', 'a')}}
+        
+        with patch('finance.bank_services.http_client.get', side_effect=[accounts, transactions]):
+            self.assertEqual(self.service.sync_transactions(), 2)
+
+
+class IncrementalSyncTests(TestCase):
+    """Testează sincronizarea incrementală cu cursoare per cont"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='bt-1',
+        )
+    
+    def _sync(self, booking_dates, full=False):
+        accounts = MagicMock()
+        accounts.json.return_value = {'Data': {'Account': [{'AccountId': 'acc-1'}]}}
+        transactions = MagicMock()
+        transactions.json.return_value = {'Data': {'Transaction': [
+            {'TransactionId': f'tx-{day}', 'Amount': {'Amount': '5'}, 'BookingDate': day}
+            for day in booking_dates
+        ]}}
+        with patch('finance.bank_services.http_client.get', side_effect=[accounts, transactions]) as mock_get:
+            BTBankService(self.connection).sync_transactions(days_back=30, full=full)
+        return mock_get.call_args_list[1].kwargs['params']['bookingDateFrom']
+    
+    def test_first_sync_uses_window_and_sets_cursor(self):
+        """Testează prima sincronizare și cursorul salvat"""
+        today = timezone.localdate()
+        booked = (today - timedelta(days=2)).isoformat()
+        
+        from_date = self._sync([(today - timedelta(days=10)).isoformat(), booked])
+        
+        self.assertEqual(from_date, (today - timedelta(days=30)).isoformat())
+        cursor = BankSyncCursor.objects.get(bank_connection=self.connection, remote_account_id='acc-1')
+        self.assertEqual(timezone.localdate(cursor.last_booking_date).isoformat(), booked)
+        self.assertEqual(cursor.last_external_id, f'tx-{booked}')
+    
+    @override_settings(BANK_SYNC={'OVERLAP_DAYS': 3})
+    def test_next_sync_starts_at_cursor_with_overlap(self):
+        """Testează fereastra incrementală și resincronizarea completă"""
+        today = timezone.localdate()
+        booked = today - timedelta(days=2)
+        self._sync([booked.isoformat()])
+        
+        self.assertEqual(self._sync([]), (booked - timedelta(days=3)).isoformat())
+        self.assertEqual(self._sync([], full=True), (today - timedelta(days=30)).isoformat())
+        # Resincronizarea fără tranzacții noi nu mută cursorul înapoi
+        cursor = BankSyncCursor.objects.get(bank_connection=self.connection)
+        self.assertEqual(timezone.localdate(cursor.last_booking_date), booked)
+
+
+class PaginatedSyncTests(TestCase):
+    """Testează parcurgerea paginată și reluarea după întrerupere"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+    
+    def _response(self, payload):
+        response = MagicMock()
+        response.json.return_value = payload
+        return response
+    
+    def _bt_page(self, ids, next_url=None):
+        payload = {'Data': {'Transaction': [
+            {'TransactionId': external_id, 'Amount': {'Amount': '5'}, 'BookingDate': '2024-03-01'}
+            for external_id in ids
+        ]}}
+        if next_url:
+            payload['Links'] = {'Next': next_url}
+        return self._response(payload)
+    
+    def test_bt_follows_next_links_and_resumes(self):
+        """Testează Links.Next și reluarea de la ultima pagină salvată"""
+        connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='bt-1',
+        )
+        accounts = self._response({'Data': {'Account': [{'AccountId': 'acc-1'}]}})
+        failing = MagicMock()
+        failing.raise_for_status.side_effect = requests.HTTPError('502')
+        
+        with patch('finance.bank_services.http_client.get', side_effect=[
+            accounts, self._bt_page(['a', 'b'], 'https://bt/page2'), failing,
+        ]):
+            self.assertEqual(BTBankService(connection).sync_transactions(), 0)
+        
+        cursor = BankSyncCursor.objects.get(bank_connection=connection)
+        self.assertEqual(cursor.resume_token, 'https://bt/page2')
+        self.assertEqual(BankTransaction.objects.count(), 2)
+        
+        with patch('finance.bank_services.http_client.get', side_effect=[
+            accounts, self._bt_page(['c'], 'https://bt/page3'), self._bt_page(['d']),
+        ]) as mock_get:
+            self.assertEqual(BTBankService(connection).sync_transactions(), 2)
+        
+        self.assertEqual([c.args[1] for c in mock_get.call_args_list[1:]], ['https://bt/page2', 'https://bt/page3'])
+        cursor.refresh_from_db()
+        self.assertEqual(cursor.resume_token, '')
+        self.assertIsNone(cursor.resume_from)
+        self.assertEqual(BankTransaction.objects.count(), 4)
+    
+    @override_settings(BANK_SYNC={'PAGE_SIZE': 2})
+    def test_revolut_pages_backwards_with_count_and_to(self):
+        """Testează paginarea Revolut cu count/to"""
+        connection = BankConnection.objects.create(
+            user=self.user, bank='revolut', account_name='Revolut', access_token='token', api_user_id='rev-1',
+        )
+        accounts = self._response({'accounts': [{'id': 'acc-1', 'type': 'CURRENT'}]})
+        
+        def page(*days):
+            return self._response({'transactions': [
+                {'id': f'r-{day}', 'amount': -3, 'created_at': f'2024-03-{day}T10:00:00+00:00',
+                 'completed_at': f'2024-03-{day}T10:00:00+00:00'}
+                for day in days
+            ]})
+        
+        with patch('finance.bank_services.http_client.get', side_effect=[
+            accounts, page('05', '04'), page('04', '03'), page('02'),
+        ]) as mock_get:
+            self.assertEqual(RevolutBankService(connection).sync_transactions(), 4)
+        
+        params = [c.kwargs['params'] for c in mock_get.call_args_list[1:]]
+        self.assertEqual([p['count'] for p in params], [2, 2, 2])
+        self.assertEqual([p.get('to') for p in params], [None, '2024-03-04T10:00:00+00:00', '2024-03-03T10:00:00+00:00'])
+        self.assertEqual(len({p['from'] for p in params}), 1)
+        cursor = BankSyncCursor.objects.get(bank_connection=connection)
+        self.assertEqual(cursor.last_external_id, 'r-05')
+
+
+class CombinedBalanceSyncTests(TestCase):
+    """Testează citirea soldului din aceeași trecere cu sincronizarea"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='acc-2',
+        )
+        self.account = Account.objects.create(
+            user=self.user, name='BT', type='checking', currency='RON', balance=Decimal('10.00'),
+        )
+        cache.clear()
+    
+    def _response(self, payload):
+        response = MagicMock()
+        response.json.return_value = payload
+        return response
+    
+    def _responses(self, amount):
+        return [
+            self._response({'Data': {'Account': [{'AccountId': 'acc-1'}, {'AccountId': 'acc-2'}]}}),
+            self._response({'Data': {'Transaction': [
+                {'TransactionId': 't1', 'Amount': {'Amount': '5'}, 'BookingDate': '2024-03-01'},
+            ]}}),
+            self._response({'Data': {'Transaction': []}}),
+            self._response({'Data': {'Balance': [
+                {'AccountId': 'acc-1', 'Type': 'Closing.Booked', 'Amount': {'Amount': '1', 'Currency': 'RON'}},
+                {'AccountId': 'acc-2', 'Type': 'Closing.Booked', 'Amount': {'Amount': amount, 'Currency': 'RON'}},
+            ]}}),
+        ]
+    
+    def test_engine_reuses_account_listing_for_balance(self):
+        """Testează că /accounts e cerut o dată, iar soldurile vin dintr-o singură cerere"""
+        with patch('finance.bank_services.http_client.get', side_effect=self._responses('42.50')) as mock_get:
+            result = SyncEngine(days_back=30).sync_connection(self.connection)
+        
+        self.assertTrue(result.ok)
+        self.assertTrue(result.balance_updated)
+        urls = [c.args[1] for c in mock_get.call_args_list]
+        self.assertEqual(len(urls), 4)
+        self.assertEqual(sum(url.endswith('/accounts') for url in urls), 1)
+        self.assertTrue(urls[-1].endswith('/balances'))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('42.50'))
+    
+    def test_unchanged_balance_not_written(self):
+        """Testează că soldul neschimbat nu produce scrieri"""
+        with patch('finance.bank_services.http_client.get', side_effect=self._responses('10.00')):
+            with patch.object(Account, 'save') as mock_save, \
+                    patch.object(BankConnection, 'save', wraps=self.connection.save) as mock_connection_save:
+                SyncEngine(days_back=30).sync_connection(self.connection)
+        
+        mock_save.assert_not_called()
+        # Doar marcajul api_last_sync; api_user_id e deja cel corect
+        self.assertEqual(mock_connection_save.call_count, 1)
+    
+    def test_missing_bulk_balances_remembered(self):
+        """Testează că după un 404 pe /balances sincronizările următoare cer direct per cont"""
+        def respond(service, url, **kwargs):
+            if url.endswith('/accounts'):
+                return self._response({'Data': {'Account': [{'AccountId': 'acc-1'}, {'AccountId': 'acc-2'}]}})
+            if url.endswith('/transactions-booked'):
+                return self._response({'Data': {'Transaction': []}})
+            if url.endswith('/accounts/acc-2/balances'):
+                return self._response({'Data': {'Balance': [
+                    {'Type': 'Closing.Booked', 'Amount': {'Amount': '42.50', 'Currency': 'RON'}},
+                ]}})
+            if url.endswith('/accounts/acc-1/balances'):
+                return self._response({'Data': {'Balance': []}})
+            return MagicMock(status_code=404)
+        
+        for _ in range(2):
+            with patch('finance.bank_services.http_client.get', side_effect=respond) as mock_get:
+                SyncEngine(days_back=30).sync_connection(self.connection)
+            urls = [c.args[1] for c in mock_get.call_args_list]
+            self.assertEqual(sum(url.endswith('/accounts/acc-2/balances') for url in urls), 1)
+        
+        self.assertFalse(any(url.endswith('/v3/balances') for url in urls))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('42.50'))
+
+
+@override_settings(BANK_SYNC={'SCHEDULER': {'MIN_INTERVAL': 600, 'MAX_INTERVAL': 7200, 'JITTER': 0}})
+class SyncSchedulerTests(TestCase):
+    """Testează planificatorul de sincronizare"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        now = timezone.now()
+        self.due = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='Scadent', access_token='t', api_user_id='a-1',
+            sync_interval=3600, next_sync_at=now - timedelta(minutes=1),
+        )
+        self.quiet = BankConnection.objects.create(
+            user=self.user, bank='revolut', account_name='Fără noutăți', access_token='t', api_user_id='a-2',
+            sync_interval=3600, next_sync_at=now - timedelta(minutes=2),
+        )
+        self.later = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='Mai târziu', access_token='t', api_user_id='a-3',
+            next_sync_at=now + timedelta(hours=1),
+        )
+    
+    def test_next_interval_adapts_within_bounds(self):
+        """Testează cadența adaptivă"""
+        self.assertEqual(next_interval(3600, synced=5), 1800)
+        self.assertEqual(next_interval(3600, synced=0), 5400)
+        self.assertEqual(next_interval(3600, synced=0, ok=False), 7200)
+        self.assertEqual(next_interval(700, synced=3), 600)
+    
+    def test_run_once_syncs_due_connections_and_reschedules(self):
+        """Testează că doar conexiunile scadente rulează și sunt reprogramate"""
+        def get_service(connection):
+            service = MagicMock()
+            service.sync_transactions.return_value = 4 if connection.pk == self.due.pk else 0
+            return service
+        
+        engine = SyncEngine(max_workers=1, update_balances=False)
+        with patch('finance.sync_engine.BankServiceFactory.get_service', side_effect=get_service):
+            results = SyncScheduler(engine=engine).run_once()
+        
+        self.assertEqual({r.connection_id for r in results}, {self.due.pk, self.quiet.pk})
+        self.due.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.due.sync_interval, 1800)
+        self.assertEqual(self.quiet.sync_interval, 5400)
+        self.assertAlmostEqual(
+            (self.quiet.next_sync_at - self.due.next_sync_at).total_seconds(), 3600, delta=5,
+        )
+    
+    def test_unreachable_bank_backs_off(self):
+        """Testează că o eroare HTTP dublează intervalul, nu îl crește cu 50%"""
+        circuit_breaker._cache().clear()
+        engine = SyncEngine(max_workers=1)
+        with patch('finance.http_client.get', side_effect=requests.ConnectionError('boom')):
+            results = SyncScheduler(engine=engine).run_once()
+        
+        self.assertTrue(all(not result.ok for result in results))
+        self.due.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual((self.due.sync_interval, self.quiet.sync_interval), (7200, 7200))
+    
+    def test_pop_due_respects_limit_and_skips_stale_entries(self):
+        """Testează limita de concurență și reprogramările din coadă"""
+        scheduler = SyncScheduler(max_concurrent=1)
+        now = timezone.now()
+        scheduler.load(now)
+        # Reprogramarea lasă în heap o intrare veche, ignorată la extragere
+        scheduler.schedule(self.quiet.pk, now + timedelta(hours=2))
+        
+        self.assertEqual([c.pk for c in scheduler.pop_due(now, 1)], [self.due.pk])
+        self.assertEqual(scheduler.pop_due(now, 1), [])
+        self.assertEqual(scheduler.seconds_until_next(now, slots_free=False), 300)
+
+
+class SyncRunTests(TestCase):
+    """Testează evidența rulărilor de sincronizare"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='bt-1',
+        )
+    
+    def _response(self, payload):
+        response = MagicMock()
+        response.json.return_value = payload
+        return response
+    
+    def _sync(self, *pages):
+        accounts = self._response({'Data': {'Account': [{'AccountId': 'acc-1'}]}})
+        with patch('finance.bank_services.http_client.get', side_effect=[accounts, *pages]):
+            return BTBankService(self.connection).sync_transactions()
+    
+    def _page(self, ids, next_url=None):
+        payload = {'Data': {'Transaction': [
+            {'TransactionId': external_id, 'Amount': {'Amount': '5'}, 'BookingDate': '2024-03-01'}
+            for external_id in ids
+        ]}}
+        if next_url:
+            payload['Links'] = {'Next': next_url}
+        return self._response(payload)
+    
+    def test_failed_run_recorded_and_resumed(self):
+        """Testează rularea eșuată și reluarea ei"""
+        failing = MagicMock()
+        failing.raise_for_status.side_effect = requests.HTTPError('503 Service Unavailable')
+        self._sync(self._page(['a', 'b'], 'https://bt/page2'), failing)
+        
+        failed = SyncRun.objects.get()
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('503', failed.error)
+        self.assertEqual((failed.pages_fetched, failed.rows_inserted), (1, 2))
+        self.assertIsNotNone(failed.finished_at)
+        self.assertEqual(list(connections_to_resume()), [self.connection])
+        
+        self.assertEqual(self._sync(self._page(['c'])), 1)
+        
+        resumed = SyncRun.objects.first()
+        self.assertEqual(resumed.status, 'succeeded')
+        self.assertEqual(resumed.resumed_from, failed)
+        self.assertEqual(list(connections_to_resume()), [])
+    
+    def test_stale_running_runs_are_interrupted(self):
+        """Testează marcarea rulărilor rămase blocate"""
+        SyncRun.objects.create(bank_connection=self.connection, started_at=timezone.now() - timedelta(hours=2))
+        SyncRun.objects.create(bank_connection=self.connection)
+        
+        self.assertEqual(mark_stale_runs(), 1)
+        self.assertEqual(
+            sorted(SyncRun.objects.values_list('status', flat=True)), ['interrupted', 'running'],
+        )
+    
+    def test_runs_endpoint_reports_percentiles(self):
+        """Testează endpoint-ul JSON cu percentile"""
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        other_connection = BankConnection.objects.create(
+            user=other, bank='bt', account_name='Alt BT', access_token='token', api_user_id='bt-2',
+        )
+        now = timezone.now()
+        for seconds in (1, 2, 3, 4):
+            SyncRun.objects.create(
+                bank_connection=self.connection, status='succeeded', rows_inserted=seconds,
+                started_at=now - timedelta(seconds=10), finished_at=now - timedelta(seconds=10 - seconds),
+            )
+        SyncRun.objects.create(bank_connection=other_connection, status='failed', finished_at=now)
+        
+        self.client.login(username='testuser', password='password')
+        data = self.client.get('/finance/api/bank-sync/runs/', {'limit': 2}).json()
+        
+        self.assertEqual(len(data['runs']), 2)
+        self.assertEqual(data['stats']['overall']['runs'], 4)
+        self.assertEqual(data['stats']['overall']['failed'], 0)
+        self.assertEqual(data['stats']['by_bank']['bt']['duration'], {'p50': 2.0, 'p90': 4.0, 'p99': 4.0})
+        self.assertEqual(self.client.get('/finance/api/bank-sync/runs/', {'days': 0}).status_code, 400)
+    
+    def test_runs_endpoint_interrupts_only_own_runs(self):
+        """Testează că endpoint-ul marchează doar rulările blocate ale utilizatorului"""
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        other_connection = BankConnection.objects.create(
+            user=other, bank='bt', account_name='Alt BT', access_token='token', api_user_id='bt-2',
+        )
+        stale = timezone.now() - timedelta(hours=2)
+        own = SyncRun.objects.create(bank_connection=self.connection, started_at=stale)
+        foreign = SyncRun.objects.create(bank_connection=other_connection, started_at=stale)
+        
+        self.client.login(username='testuser', password='password')
+        self.client.get('/finance/api/bank-sync/runs/')
+        
+        own.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual((own.status, foreign.status), ('interrupted', 'running'))
+    
+    def test_admin_changelist_shows_latency(self):
+        """Testează tabelul de latență din admin"""
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        SyncRun.objects.create(bank_connection=self.connection, status='succeeded', finished_at=timezone.now())
+        self.client.login(username='admin', password='password')
+        
+        response = self.client.get('/admin/finance/syncrun/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Latență')
+    
+    def test_percentile_nearest_rank(self):
+        """Testează percentila nearest-rank"""
+        self.assertEqual(percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 90), 9)
+        self.assertIsNone(percentile([], 50))
+
+
+@override_settings(BANK_API_LIMITS={'default': {
+    'FAILURE_THRESHOLD': 2, 'RECOVERY_TIMEOUT': 30, 'RATE': 2, 'BURST': 2, 'MAX_WAIT': 0.5,
+}})
+class CircuitBreakerTests(TestCase):
+    """Testează circuit breaker-ul și limitatorul de rată per bancă"""
+    
+    def setUp(self):
+        circuit_breaker._cache().clear()
+        self.now = [1000.0]
+        self.slept = []
+        
+        def sleep(seconds):
+            self.slept.append(seconds)
+            self.now[0] += seconds
+        
+        clock = MagicMock()
+        clock.time.side_effect = lambda: self.now[0]
+        patchers = [
+            patch('finance.circuit_breaker.time', clock),
+            patch('finance.circuit_breaker._sleep', sleep),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        circuit_breaker._cache().clear()
+    
+    def _status(self, code):
+        return lambda: MagicMock(status_code=code)
+    
+    def test_opens_fails_fast_and_recovers_through_probe(self):
+        """Testează closed -> open -> half_open -> closed"""
+        breaker = circuit_breaker.CircuitBreaker('bt')
+        for _ in range(2):
+            circuit_breaker.call('bt', self._status(503))
+        self.assertEqual(breaker.state, circuit_breaker.OPEN)
+        
+        request = MagicMock()
+        with self.assertRaises(circuit_breaker.BankUnavailable):
+            circuit_breaker.call('bt', request)
+        request.assert_not_called()
+        
+        self.now[0] += 31
+        self.assertEqual(breaker.state, circuit_breaker.HALF_OPEN)
+        breaker.before_call()
+        # Doar o probă trece în half_open
+        with self.assertRaises(circuit_breaker.BankUnavailable):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, circuit_breaker.CLOSED)
+    
+    def test_failed_probe_reopens(self):
+        """Testează redeschiderea după o probă eșuată"""
+        for _ in range(2):
+            circuit_breaker.call('revolut', self._status(502))
+        self.now[0] += 31
+        
+        def timeout():
+            raise requests.ConnectTimeout('timeout')
+        
+        with self.assertRaises(requests.ConnectTimeout):
+            circuit_breaker.call('revolut', timeout)
+        self.assertEqual(circuit_breaker.CircuitBreaker('revolut').state, circuit_breaker.OPEN)
+        # Cealaltă bancă nu e afectată
+        self.assertEqual(circuit_breaker.CircuitBreaker('bt').state, circuit_breaker.CLOSED)
+    
+    def test_token_bucket_waits_then_rejects_and_adapts(self):
+        """Testează rafala, așteptarea, respingerea și reducerea ratei la 429"""
+        bucket = circuit_breaker.TokenBucket('bt')
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.slept, [])
+        bucket.acquire()
+        self.assertAlmostEqual(self.slept[0], 0.5)
+        
+        circuit_breaker.call('bt', self._status(429))
+        self.assertEqual(bucket.rate, 1)
+        with self.assertRaises(circuit_breaker.BankUnavailable):
+            bucket.acquire()
+    
+    def test_open_circuit_fails_sync_without_requests(self):
+        """Testează că sincronizarea eșuează imediat când banca e indisponibilă"""
+        user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        connection = BankConnection.objects.create(
+            user=user, bank='bt', account_name='BT', access_token='token', api_user_id='bt-1',
+        )
+        for _ in range(2):
+            circuit_breaker.call('bt', self._status(504))
+        
+        with patch('finance.bank_services.http_client.get') as mock_get:
+            self.assertEqual(BTBankService(connection).sync_transactions(), 0)
+        
+        mock_get.assert_not_called()
+        self.assertIn('unavailable', SyncRun.objects.get().error)
+        
+        # Raportul motorului arată banca sărită ca eșec, nu ca „0 tranzacții”
+        result = SyncEngine(max_workers=1).sync_connection(connection)
+        self.assertFalse(result.ok)
+        self.assertIn('unavailable', result.error)
+    
+    def test_state_shared_between_processes(self):
+        """Testează că starea nu stă în cache-ul local al procesului"""
+        self.assertNotIsInstance(circuit_breaker._cache(), LocMemCache)
+
+
+class SyncJobTests(TestCase):
+    """Testează coada de sincronizare și worker-ul"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.connection = BankConnection.objects.create(
+            user=self.user, bank='bt', account_name='BT', access_token='token', api_user_id='bt-1',
+        )
+        self.client.login(username='testuser', password='password')
+    
+    def test_sync_view_enqueues_without_calling_bank(self):
+        """Testează că view-ul doar pune jobul în coadă"""
+        data = {'days_back': 30, 'auto_create_transactions': 'on'}
+        with patch('finance.sync_engine.BankServiceFactory.get_service') as get_service:
+            response = self.client.post(f'/finance/banks/{self.connection.pk}/sync/', data)
+            self.client.post(f'/finance/banks/{self.connection.pk}/sync/', data)
+        
+        self.assertEqual(response.status_code, 302)
+        get_service.assert_not_called()
+        job = SyncJob.objects.get()
+        self.assertEqual((job.status, job.bank_connection, job.auto_create), ('queued', self.connection, True))
+        
+        status = self.client.get(f'/finance/api/bank-sync/jobs/{job.pk}/').json()
+        self.assertEqual(status['job']['status'], 'queued')
+    
+    def test_worker_claims_once_and_reports_progress(self):
+        """Testează preluarea exclusivă, execuția și notificările"""
+        job = enqueue_sync(self.user, days_back=7)
+        service = MagicMock()
+        service.sync_transactions.return_value = 3
+        
+        claimed = claim_next_job('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(claim_next_job('worker-2'))
+        
+        with patch('finance.sync_engine.BankServiceFactory.get_service', return_value=service), \
+                patch('finance.sync_engine.update_account_balance', return_value=True), \
+                patch('finance.sync_jobs.notify') as mock_notify:
+            run_job(claimed)
+        
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.worker), ('succeeded', 1, 'worker-1'))
+        self.assertEqual(job.result['total_synced'], 3)
+        service.sync_transactions.assert_called_once_with(days_back=7, full=False)
+        levels = [c.args[2] if len(c.args) > 2 else 'info' for c in mock_notify.call_args_list]
+        self.assertEqual(levels, ['info', 'success', 'success'])
+    
+    def test_failed_connection_notified_as_error(self):
+        """Testează notificarea de eroare când banca nu răspunde"""
+        enqueue_sync(self.user, connection=self.connection)
+        
+        with patch('finance.http_client.get', side_effect=requests.ConnectionError('boom')), \
+                patch('finance.sync_jobs.notify') as mock_notify:
+            job = run_job(claim_next_job())
+        
+        self.assertEqual(job.result['failed'], 1)
+        levels = [c.args[2] if len(c.args) > 2 else 'info' for c in mock_notify.call_args_list]
+        self.assertEqual(levels, ['info', 'error', 'error'])
+        self.assertIn('boom', mock_notify.call_args_list[1].args[1])
+    
+    def test_connect_job_activates_connection(self):
+        """Testează verificarea în fundal a unei conexiuni noi"""
+        self.client.post('/finance/banks/create/', {
+            'bank': 'revolut', 'account_name': 'Revolut', 'access_token': 'token',
+        })
+        connection = BankConnection.objects.get(bank='revolut')
+        self.assertFalse(connection.is_active)
+        
+        with patch('finance.sync_jobs.BankServiceFactory.get_service') as get_service, \
+                patch('finance.sync_jobs.notify'):
+            get_service.return_value.get_balance.return_value = {'balance': Decimal('12.30'), 'currency': 'EUR'}
+            job = run_job(claim_next_job())
+        
+        connection.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertTrue(connection.is_active)
+        self.assertEqual(Account.objects.get(user=self.user, name='Revolut').balance, Decimal('12.30'))
+    
+    def test_failed_connect_can_be_retried(self):
+        """Testează o nouă încercare după o verificare eșuată"""
+        data = {'bank': 'revolut', 'account_name': 'Revolut', 'access_token': 'greșit'}
+        self.client.post('/finance/banks/create/', data)
+        
+        with patch('finance.sync_jobs.BankServiceFactory.get_service') as get_service, \
+                patch('finance.sync_jobs.notify'):
+            get_service.return_value.get_balance.return_value = None
+            failed = run_job(claim_next_job())
+        self.assertEqual(failed.status, 'failed')
+        
+        response = self.client.post('/finance/banks/create/', {**data, 'access_token': 'corect'})
+        self.assertEqual(response.status_code, 302)
+        connection = BankConnection.objects.get(user=self.user, bank='revolut')
+        self.assertEqual(connection.access_token, 'corect')
+        
+        with patch('finance.sync_jobs.BankServiceFactory.get_service') as get_service, \
+                patch('finance.sync_jobs.notify'):
+            get_service.return_value.get_balance.return_value = {'balance': Decimal('5.00'), 'currency': 'EUR'}
+            job = run_job(claim_next_job())
+        
+        connection.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.bank_connection_id, connection.pk)
+        self.assertTrue(connection.is_active)
+        self.assertEqual(SyncJob.objects.get(pk=failed.pk).status, 'failed')
+    
+    def test_stale_jobs_requeued_then_failed(self):
+        """Testează recuperarea joburilor unui worker oprit"""
+        old = timezone.now() - timedelta(hours=1)
+        retry = SyncJob.objects.create(user=self.user, status='running', started_at=old, attempts=1)
+        exhausted = SyncJob.objects.create(user=self.user, status='running', started_at=old, attempts=3)
+        
+        self.assertEqual(recover_stale_jobs(), (1, 1))
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retry.status, exhausted.status), ('queued', 'failed'))
+    
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_notify_sends_to_user_group(self):
+        """Testează mesajul trimis în grupul btpay_notify_<user>"""
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f'btpay_notify_{self.user.pk}', channel)
+        
+        notify(self.user.pk, 'Gata', 'success', job_id=5)
+        
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message['type'], 'notification.message')
+        self.assertEqual(message['data']['message'], 'Gata')
+        self.assertEqual(message['data']['job_id'], 5)
+
+
+class HttpClientTests(TestCase):
+    """Testează stratul HTTP comun (pool, reîncercări, Retry-After)"""
+    
+    def setUp(self):
+        self.responses = []
+        self.seen = []
+        test = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def _reply(self):
+                test.seen.append((self.command, self.client_address[1]))
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                status, headers = test.responses.pop(0) if test.responses else (200, {})
+                body = b'{"ok": true}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            do_GET = do_POST = _reply
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        http_client.reset_sessions()
+    
+    def tearDown(self):
+        http_client.reset_sessions()
+        self.server.shutdown()
+        self.server.server_close()
+    
+    @override_settings(HTTP_CLIENT={'default': {'BACKOFF_FACTOR': 0, 'RETRIES': 3}})
+    def test_retries_transient_errors_on_one_connection(self):
+        """Testează reîncercarea la 5xx și refolosirea conexiunii"""
+        self.responses = [(502, {}), (503, {'Retry-After': '0'})]
+        
+        response = http_client.get('test', self.url)
+        http_client.get('test', self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.seen), 4)
+        self.assertEqual(len({port for _, port in self.seen}), 1)
+    
+    @override_settings(HTTP_CLIENT={'default': {'BACKOFF_FACTOR': 0, 'RETRIES': 3}})
+    def test_post_retried_only_when_not_processed(self):
+        """Testează că POST se repetă la 429, dar nu la 500"""
+        self.responses = [(429, {'Retry-After': '0'})]
+        self.assertEqual(http_client.post('test', self.url, json={}).status_code, 200)
+        
+        self.responses = [(500, {})]
+        self.assertEqual(http_client.post('test', self.url, json={}).status_code, 500)
+        self.assertEqual([method for method, _ in self.seen], ['POST'] * 3)
+    
+    def test_backoff_has_bounded_jitter(self):
+        """Testează backoff-ul exponențial cu jitter și plafon"""
+        retry = http_client.BackoffRetry(total=10, backoff_factor=1, jitter=0.5, cap=5)
+        for _ in range(3):
+            retry = retry.increment(method='GET', url='/')
+        
+        delays = {retry.get_backoff_time() for _ in range(20)}
+        self.assertTrue(all(4 <= delay <= 5 for delay in delays))
+        self.assertGreater(len(delays), 1)
+    
+    def test_retry_after_is_capped(self):
+        """Testează că Retry-After nu depășește plafonul de backoff"""
+        retry = http_client.BackoffRetry(total=3, cap=5)
+        
+        self.assertEqual(retry.get_retry_after(HTTPResponse(headers={'Retry-After': '3600'})), 5)
+        self.assertEqual(retry.get_retry_after(HTTPResponse(headers={'Retry-After': '2'})), 2)
+        self.assertIsNone(retry.get_retry_after(HTTPResponse()))
+        
+        with patch('urllib3.util.retry.time.sleep') as sleep:
+            retry.sleep(HTTPResponse(headers={'Retry-After': '3600'}))
+        sleep.assert_called_once_with(5)
+
+
 # Test utilities
 def create_test_bank_connection(user, bank='revolut'):
     """Helper function pentru crearea conexiune test"""
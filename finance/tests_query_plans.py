@@ -0,0 +1,232 @@
+"""
+Teste de regresie pentru planurile de interogare
+Rulează EXPLAIN pe interogările principale din views.py, bank_views.py și
+bt_pay_realtime.py și eșuează dacă vreuna face full table scan pe tabelele mari.
+Rulează: python manage.py test finance.tests_query_plans
+"""
+
+import re
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from finance.models import (
+    Account, AccountDailyFlow, BankConnection, BankTransaction, Budget, Category, MonthlyCategoryTotal,
+    Transaction,
+)
+from finance.pagination import KeysetPaginator
+
+# Tabelele care cresc cu istoricul utilizatorilor
+HOT_TABLES = {
+    Transaction._meta.db_table,
+    BankTransaction._meta.db_table,
+    Budget._meta.db_table,
+    MonthlyCategoryTotal._meta.db_table,
+    AccountDailyFlow._meta.db_table,
+}
+
+
+def evaluate_context(request, template_name, context=None, *args, **kwargs):
+    """Înlocuiește render: evaluează querysets din context fără a randa template-ul"""
+    for value in (context or {}).values():
+        if hasattr(value, 'query'):
+            list(value)
+    return HttpResponse(template_name)
+
+
+def explain(sql):
+    """Planul de execuție al interogării, ca text"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute('SET enable_seqscan = on')
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+    return plan
+
+
+def full_scans(sql):
+    """Tabelele mari citite fără căutare în index
+
+    Doar o căutare cu condiție pe index contează: pe SQLite liniile SEARCH, pe
+    Postgres nodurile Index Scan / Index Only Scan / Bitmap cu Index Cond.
+    SCAN ... USING INDEX (parcurgerea întregului index) e tot un full scan.
+    """
+    plan = explain(sql)
+    if connection.vendor == 'postgresql':
+        scanned = []
+        nodes = re.split(r'\n(?=\s*->)', plan)
+        for node in nodes:
+            header = node.splitlines()[0]
+            seq = re.search(r'Seq Scan on (\w+)', header)
+            index = re.search(r'Index (?:Only )?Scan(?: Backward)? using \w+ on (\w+)', header)
+            if seq:
+                scanned.append(seq.group(1))
+            elif index and 'Index Cond:' not in node:
+                scanned.append(index.group(1))
+    else:
+        scanned = re.findall(r'SCAN (\w+)', plan)
+    return sorted(set(scanned) & HOT_TABLES), plan
+
+class QueryPlanTests(TestCase):
+    """Verifică folosirea indexurilor pentru interogările fierbinți"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', 'planner@example.com', 'password')
+        other = User.objects.create_user('noise', 'noise@example.com', 'password')
+
+        categories = [
+            Category.objects.create(name=name, type='expense')
+            for name in ('Mâncare', 'Transport', 'Utilități', 'Distracție')
+        ]
+        today = timezone.now().date()
+        now = timezone.now()
+
+        for owner in (cls.user, other):
+            accounts = [
+                Account.objects.create(user=owner, name=f'Cont {i}', currency='RON')
+                for i in range(3)
+            ]
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=owner,
+                    account=accounts[i % 3],
+                    category=categories[i % 4],
+                    type='income' if i % 7 == 0 else 'expense',
+                    amount=Decimal(i % 50 + 1),
+                    date=today - timedelta(days=i % 400),
+                    time=timezone.now().time(),
+                )
+                for i in range(600)
+            ])
+            connection_ = BankConnection.objects.create(
+                user=owner, bank='bt', account_name='BT', access_token='token', api_user_id=owner.username,
+            )
+            BankTransaction.objects.bulk_create([
+                BankTransaction(
+                    user=owner,
+                    bank_connection=connection_,
+                    external_id=f'{owner.username}-{i}',
+                    amount=Decimal(-(i % 40 + 1)),
+                    currency='RON',
+                    description=f'BT Pay - Merchant {i % 12}, coffee',
+                    date=now - timedelta(hours=i * 3),
+                    sync_status=('pending', 'synced', 'synced', 'ignored')[i % 4],
+                )
+                for i in range(600)
+            ])
+            for category in categories:
+                Budget.objects.create(
+                    user=owner, category=category, amount=Decimal('100'), month=today.replace(day=1),
+                )
+
+        from finance.balance_history import rebuild_daily_flows
+        from finance.rollups import rebuild_monthly_totals
+        from finance.totals import verify_totals
+        rebuild_monthly_totals()
+        rebuild_daily_flows()
+        verify_totals(repair=True)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertIndexedQueries(self, url, params=None, patch_render=None):
+        """Apelează view-ul și verifică planul fiecărei interogări executate"""
+        with CaptureQueriesContext(connection) as captured:
+            if patch_render:
+                with patch(patch_render, side_effect=evaluate_context):
+                    response = self.client.get(url, params or {})
+            else:
+                response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, url)
+
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            scanned, plan = full_scans(sql)
+            self.assertFalse(scanned, f"Full scan pe {scanned} pentru {url}:\n{sql}\n{plan}")
+
+    def test_finance_views(self):
+        """Testează view-urile din views.py"""
+        account = self.user.accounts.first()
+        category = Category.objects.first()
+        today = timezone.now().date()
+
+        self.assertIndexedQueries('/finance/', patch_render='finance.views.render')
+        self.assertIndexedQueries('/finance/budgets/', patch_render='finance.views.render')
+        self.assertIndexedQueries('/finance/reports/', patch_render='finance.views.render')
+        self.assertIndexedQueries('/finance/api/reports/', {'period': 'year', 'granularity': 'week'})
+        self.assertIndexedQueries('/finance/api/reports/', {
+            'period': 'custom', 'start_date': today - timedelta(days=1000), 'end_date': today,
+        })
+        self.assertIndexedQueries(f'/finance/accounts/{account.pk}/', patch_render='finance.views.render')
+        self.assertIndexedQueries(f'/finance/accounts/{account.pk}/transactions/', patch_render='finance.views.render')
+        self.assertIndexedQueries('/finance/transactions/', patch_render='finance.views.render')
+        self.assertIndexedQueries(f'/finance/api/accounts/{account.pk}/balance-history/')
+        self.assertIndexedQueries('/finance/api/net-worth/', {'start_date': today - timedelta(days=1500), 'end_date': today})
+        for params in (
+            {'account': account.pk},
+            {'category': category.pk},
+            {'type': 'income'},
+            {'start_date': today - timedelta(days=30), 'end_date': today},
+        ):
+            self.assertIndexedQueries('/finance/api/transactions/', params)
+
+    def test_deep_cursor_page_seeks_on_date(self):
+        """Pagina de la un cursor adânc caută în index și după dată, nu doar după user"""
+        paginator = KeysetPaginator(Transaction.objects.filter(user=self.user), per_page=50)
+        page = paginator.page()
+        for _ in range(8):
+            page = paginator.page(page.next_cursor)
+        self.assertTrue(page.has_next)
+
+        self.assertIndexedQueries('/finance/transactions/', {'cursor': page.next_cursor},
+                                  patch_render='finance.views.render')
+        self.assertIndexedQueries('/finance/api/transactions/', {'cursor': page.next_cursor})
+
+        with CaptureQueriesContext(connection) as captured:
+            paginator.page(page.next_cursor)
+        plan = explain(captured.captured_queries[-1]['sql'])
+        if connection.vendor == 'postgresql':
+            self.assertRegex(plan, r'Index Cond: .*date <=')
+        else:
+            self.assertRegex(plan, r'SEARCH \w+ USING (?:COVERING )?INDEX \w+ \(user_id=\? AND date<\?\)')
+
+    def test_bank_views(self):
+        """Testează view-urile din bank_views.py"""
+        for url in (
+            '/finance/banks/',
+            '/finance/banks/dashboard/',
+            '/finance/banks/transactions/pending/',
+            '/finance/banks/transactions/synced/',
+        ):
+            self.assertIndexedQueries(url, patch_render='finance.bank_views.render')
+
+    def test_bt_pay_realtime_endpoints(self):
+        """Testează endpoint-urile din bt_pay_realtime.py"""
+        for url in (
+            '/finance/api/bt-pay/transactions/',
+            '/finance/api/bt-pay/stats/',
+            '/finance/api/bt-pay/pending/',
+            '/finance/api/bt-pay/dashboard/',
+            '/finance/api/bt-pay/hourly/',
+            '/finance/api/bt-pay/categories/',
+        ):
+            self.assertIndexedQueries(url)
@@ -0,0 +1,157 @@
+"""
+Totaluri all-time de venituri și cheltuieli per utilizator și monedă (UserTotals)
+Menținute în aceeași tranzacție DB cu fiecare scriere de Transaction; verify_totals
+detectează și repară abaterile
+"""
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Transaction, UserTotals
+
+logger = logging.getLogger(__name__)
+
+
+def totals_snapshot(transaction, currency=None):
+    """Valorile unei tranzacții relevante pentru totaluri, normalizate"""
+    return {
+        'user_id': transaction.user_id,
+        'currency': currency or transaction.account.currency,
+        'type': transaction.type,
+        'amount': Decimal(str(transaction.amount or 0)),
+    }
+
+
+def apply_totals_delta(user_id, currency, income, expense, count):
+    """Adaugă (sau scade) sume în rândul de totaluri al utilizatorului, atomic"""
+    rows = UserTotals.objects.filter(user_id=user_id, currency=currency)
+    changes = {
+        'income': F('income') + income,
+        'expense': F('expense') + expense,
+        'count': F('count') + count,
+        'updated_at': timezone.now(),
+    }
+    updated = rows.update(**changes)
+
+    if not updated:
+        # Nu creăm rânduri pentru ștergeri (ex: utilizatorul e șters în cascadă)
+        if count <= 0:
+            return
+        try:
+            with db_transaction.atomic():
+                UserTotals.objects.create(
+                    user_id=user_id, currency=currency, income=income, expense=expense, count=count,
+                )
+        except IntegrityError:
+            # Creat concurent de altă cerere - aplicăm peste rândul existent
+            rows.update(**changes)
+    elif count < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def _apply_snapshot(snapshot, sign):
+    amount = snapshot['amount'] * sign
+    apply_totals_delta(
+        snapshot['user_id'],
+        snapshot['currency'],
+        amount if snapshot['type'] == 'income' else 0,
+        amount if snapshot['type'] == 'expense' else 0,
+        sign,
+    )
+
+
+def apply_totals_change(previous, current):
+    """
+    Actualizează totalurile pentru o tranzacție creată, editată sau ștearsă
+
+    Args:
+        previous: snapshot-ul dinainte de salvare (None la creare)
+        current: snapshot-ul curent (None la ștergere)
+    """
+    if previous == current:
+        return
+    if previous:
+        _apply_snapshot(previous, -1)
+    if current:
+        _apply_snapshot(current, 1)
+
+
+def computed_totals(user=None):
+    """Totalurile calculate direct din tranzacții: {(user_id, currency): (income, expense, count)}"""
+    transactions = Transaction.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    grouped = transactions.values('user_id', currency=F('account__currency')).annotate(
+        income=Coalesce(Sum('amount', filter=Q(type='income')), zero),
+        expense=Coalesce(Sum('amount', filter=Q(type='expense')), zero),
+        count=Count('id'),
+    ).order_by()
+
+    return {
+        (row['user_id'], row['currency']): (row['income'], row['expense'], row['count'])
+        for row in grouped.iterator()
+    }
+
+
+def verify_totals(user=None, repair=True):
+    """
+    Compară totalurile stocate cu cele calculate și, opțional, le repară
+
+    Returns:
+        list: abaterile găsite ca (user_id, currency, stocat, calculat)
+    """
+    stored_rows = UserTotals.objects.all()
+    if user is not None:
+        stored_rows = stored_rows.filter(user=user)
+
+    expected = computed_totals(user)
+    stored = {
+        (row.user_id, row.currency): row
+        for row in stored_rows
+    }
+
+    empty = (Decimal('0'), Decimal('0'), 0)
+    drifts = []
+    for key in sorted(set(expected) | set(stored)):
+        row = stored.get(key)
+        actual = (row.income, row.expense, row.count) if row else empty
+        wanted = expected.get(key, empty)
+        if actual != wanted:
+            drifts.append((key[0], key[1], actual, wanted))
+
+    if repair and drifts:
+        with db_transaction.atomic():
+            for user_id, currency, _, (income, expense, count) in drifts:
+                if count:
+                    UserTotals.objects.update_or_create(
+                        user_id=user_id, currency=currency,
+                        defaults={'income': income, 'expense': expense, 'count': count},
+                    )
+                else:
+                    UserTotals.objects.filter(user_id=user_id, currency=currency).delete()
+        logger.warning(f"Repaired {len(drifts)} drifted user totals")
+
+    return drifts
+
+
+def user_totals(user):
+    """
+    Totalurile all-time ale unui utilizator, citite din UserTotals
+
+    Returns:
+        dict: {'income': ..., 'expense': ..., 'by_currency': {currency: {'income', 'expense'}}}
+    """
+    totals = {'income': Decimal('0'), 'expense': Decimal('0'), 'by_currency': {}}
+    for currency, income, expense in UserTotals.objects.filter(user=user).values_list(
+        'currency', 'income', 'expense'
+    ):
+        totals['income'] += income
+        totals['expense'] += expense
+        totals['by_currency'][currency] = {'income': income, 'expense': expense}
+    return totals
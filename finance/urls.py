@@ -20,12 +20,15 @@ urlpatterns = [
     path('accounts/create/', views.account_create, name='account_create'),
     path('accounts/<int:pk>/edit/', views.account_edit, name='account_edit'),
     path('accounts/<int:pk>/delete/', views.account_delete, name='account_delete'),
+    path('api/accounts/<int:pk>/balance-history/', views.account_balance_history, name='api_account_balance_history'),
+    path('api/net-worth/', views.net_worth_history_view, name='api_net_worth_history'),
     
     # Transactions
     path('transactions/', views.transaction_list, name='transaction_list'),
     path('transactions/create/', views.transaction_create, name='transaction_create'),
     path('transactions/<int:pk>/edit/', views.transaction_edit, name='transaction_edit'),
     path('transactions/<int:pk>/delete/', views.transaction_delete, name='transaction_delete'),
+    path('api/transactions/', views.transaction_feed, name='api_transactions'),
     
     # Budgets
     path('budgets/', views.budget_list, name='budget_list'),
@@ -40,6 +43,7 @@ urlpatterns = [
     
     # Reports
     path('reports/', views.reports, name='reports'),
+    path('api/reports/', views.report_data, name='api_reports'),
     
     # Bank Integration
     path('banks/', bank_views.bank_connections_list, name='bank_connections_list'),
@@ -54,6 +58,8 @@ urlpatterns = [
     path('banks/transactions/synced/', bank_views.bank_transactions_synced, name='bank_transactions_synced'),
     path('banks/<int:pk>/transactions/synced/', bank_views.bank_transactions_synced, name='bank_transactions_synced_one'),
     path('banks/dashboard/', bank_views.bank_dashboard, name='bank_dashboard'),
+    path('api/bank-sync/runs/', bank_views.bank_sync_runs, name='api_bank_sync_runs'),
+    path('api/bank-sync/jobs/<int:job_pk>/', bank_views.bank_sync_job_status, name='api_bank_sync_job'),
     
     # BT Pay Integration
     path('bt-pay/', bt_pay_views.bt_pay_websocket_dashboard, name='bt_pay_dashboard'),
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.db import transaction as db_transaction
 from django.db.models import Sum, Q, F
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -9,8 +10,15 @@ from decimal import Decimal
 from .models import Account, Transaction, Category, Budget, Savings, UserProfile
 from .forms import (
     TransactionForm, AccountForm, BudgetForm, 
-    SavingsForm, FilterTransactionForm
+    SavingsForm, FilterTransactionForm, BalanceHistoryForm, ReportForm
 )
+from .report_service import build_report, period_range
+from .budget_service import BudgetEvaluator
+from .dashboard_cache import get_dashboard
+from .http_cache import compact_json_response, http_cached, layout
+from .pagination import KeysetPaginator, parse_page_size
+from .balance_history import balance_history, net_worth_history
+from .ledger import ledger_entry, move_transaction, record_transaction, remove_transaction
 
 
 @login_required
@@ -22,37 +30,8 @@ def profile(request):
 @login_required
 def dashboard(request):
     """Pagina principală - Dashboard cu statistici generale"""
-    user = request.user
-    
-    # Conturi
-    accounts = user.accounts.all()
-    total_balance = accounts.aggregate(Sum('balance'))['balance__sum'] or 0
-    
-    # Tranzacții din ultima lună
-    today = timezone.now().date()
-    thirty_days_ago = today - timedelta(days=30)
-    
-    recent_transactions = user.transactions.filter(
-        date__gte=thirty_days_ago
-    ).order_by('-date')[:10]
-    
-    # Statistici venituri vs cheltuieli - TOTAL ALL TIME
-    total_expenses = user.transactions.filter(type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_income = user.transactions.filter(type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Bugete
-    current_month = today.replace(day=1)
-    budgets = user.budgets.filter(month=current_month)
-    
-    context = {
-        'accounts': accounts,
-        'total_balance': total_balance,
-        'recent_transactions': recent_transactions,
-        'total_expenses': total_expenses,
-        'total_income': total_income,
-        'net_income': total_income - total_expenses,
-        'budgets': budgets,
-    }
+    # Conturi, totaluri, tranzacții recente și bugete - din cache per utilizator
+    context = get_dashboard(request.user)
     return render(request, 'finance/dashboard.html', context)
 
 
@@ -77,15 +56,69 @@ def account_detail(request, pk):
     return render(request, 'finance/account_detail.html', context)
 
 
+def _history_params(request):
+    """Parametrii validați pentru istoricul soldului, sau (None, erori)"""
+    form = BalanceHistoryForm(request.GET)
+    if not form.is_valid():
+        return None, form.errors
+    end = form.cleaned_data['end_date'] or timezone.now().date()
+    start = form.cleaned_data['start_date'] or end - timedelta(days=365)
+    if (end - start).days > BalanceHistoryForm.MAX_DAYS:
+        start = end - timedelta(days=BalanceHistoryForm.MAX_DAYS)
+    return (start, end, form.cleaned_data['interval'] or None), None
+
+
+def _history_points(points):
+    return [{'date': day.isoformat(), 'balance': float(balance)} for day, balance in points]
+
+
+@login_required
+def account_balance_history(request, pk):
+    """Seria zilnică (eșantionată) a soldului unui cont, pentru grafice"""
+    account = get_object_or_404(Account, pk=pk, user=request.user)
+    params, errors = _history_params(request)
+    if errors:
+        return JsonResponse({'success': False, 'errors': errors}, status=400)
+    
+    interval, points = balance_history(account, *params)
+    return JsonResponse({
+        'success': True,
+        'account_id': account.pk,
+        'currency': account.currency,
+        'interval': interval,
+        'points': _history_points(points),
+    })
+
+
+@login_required
+def net_worth_history_view(request):
+    """Seria patrimoniului net al utilizatorului, pe monedă"""
+    params, errors = _history_params(request)
+    if errors:
+        return JsonResponse({'success': False, 'errors': errors}, status=400)
+    
+    interval, series = net_worth_history(request.user, *params)
+    return JsonResponse({
+        'success': True,
+        'interval': interval,
+        'series': {currency: _history_points(points) for currency, points in series.items()},
+    })
+
+
 @login_required
 def account_transactions(request, pk):
     """Toate tranzacțiile pentru un anumit cont"""
     account = get_object_or_404(Account, pk=pk, user=request.user)
-    transactions = account.transactions.all().order_by('-date')
+    paginator = KeysetPaginator(
+        account.transactions.select_related('category'),
+        per_page=parse_page_size(request.GET.get('per_page'))
+    )
+    page = paginator.page(request.GET.get('cursor'))
     
     context = {
         'account': account,
-        'transactions': transactions,
+        'transactions': page.items,
+        'page': page,
     }
     return render(request, 'finance/account_transactions.html', context)
 
@@ -137,60 +170,101 @@ def account_delete(request, pk):
     return render(request, 'finance/confirm_delete.html', context)
 
 
-@login_required
-def transaction_list(request):
-    """Listă cu tranzacțiile utilizatorului"""
-    transactions = request.user.transactions.all()
-    form = FilterTransactionForm()
+def _filtered_transactions(request):
+    """Tranzacțiile utilizatorului filtrate după FilterTransactionForm"""
+    transactions = request.user.transactions.select_related('account', 'category')
+    form = FilterTransactionForm(request.GET or None)
+    form.fields['account'].queryset = request.user.accounts.all()
     
     # Filtrare
-    if request.GET:
-        form = FilterTransactionForm(request.GET)
-        
-        account = request.GET.get('account')
-        category = request.GET.get('category')
-        type_filter = request.GET.get('type')
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
+    if form.is_bound and form.is_valid():
+        data = form.cleaned_data
         
-        if account:
-            transactions = transactions.filter(account_id=account)
-        if category:
-            transactions = transactions.filter(category_id=category)
-        if type_filter:
-            transactions = transactions.filter(type=type_filter)
-        if start_date:
-            transactions = transactions.filter(date__gte=start_date)
-        if end_date:
-            transactions = transactions.filter(date__lte=end_date)
-    
-    transactions = transactions.order_by('-date')
+        if data['account']:
+            transactions = transactions.filter(account=data['account'])
+        if data['category']:
+            transactions = transactions.filter(category=data['category'])
+        if data['type']:
+            transactions = transactions.filter(type=data['type'])
+        if data['start_date']:
+            transactions = transactions.filter(date__gte=data['start_date'])
+        if data['end_date']:
+            transactions = transactions.filter(date__lte=data['end_date'])
+    
+    return transactions, form
+
+
+def _filter_querystring(request):
+    """Query string-ul filtrelor, fără cursor, pentru link-ul paginii următoare"""
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    return params.urlencode()
+
+
+@login_required
+def transaction_list(request):
+    """Listă cu tranzacțiile utilizatorului (paginare keyset)"""
+    transactions, form = _filtered_transactions(request)
+    
+    paginator = KeysetPaginator(transactions, per_page=parse_page_size(request.GET.get('per_page')))
+    page = paginator.page(request.GET.get('cursor'))
     
     context = {
-        'transactions': transactions,
+        'transactions': page.items,
+        'page': page,
         'form': form,
+        'filter_query': _filter_querystring(request),
     }
     return render(request, 'finance/transaction_list.html', context)
 
 
+@login_required
+def transaction_feed(request):
+    """Variantă JSON a listei de tranzacții pentru infinite scroll"""
+    transactions, form = _filtered_transactions(request)
+    
+    if form.is_bound and not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    
+    paginator = KeysetPaginator(transactions, per_page=parse_page_size(request.GET.get('per_page')))
+    page = paginator.page(request.GET.get('cursor'))
+    
+    return JsonResponse({
+        'success': True,
+        'transactions': [
+            {
+                'id': t.id,
+                'date': t.date.isoformat(),
+                'time': t.time.isoformat() if t.time else None,
+                'account': t.account.name,
+                'account_id': t.account_id,
+                'category': t.category.name if t.category else None,
+                'category_id': t.category_id,
+                'type': t.type,
+                'amount': float(t.amount),
+                'currency': t.account.currency,
+                'description': t.description,
+            }
+            for t in page
+        ],
+        'count': len(page),
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    })
+
+
 @login_required
 def transaction_create(request):
     """Creare tranzacție nouă"""
     if request.method == 'POST':
         form = TransactionForm(request.POST)
+        form.fields['account'].queryset = request.user.accounts.all()
         if form.is_valid():
             transaction = form.save(commit=False)
             transaction.user = request.user
             
-            # Actualizează soldul contului
-            account = transaction.account
-            if transaction.type == 'expense':
-                account.balance -= transaction.amount
-            else:
-                account.balance += transaction.amount
-            account.save()
-            
-            transaction.save()
+            # Salvează tranzacția și actualizează soldul contului atomic
+            record_transaction(transaction)
             return redirect('finance:transaction_list')
     else:
         form = TransactionForm()
@@ -203,34 +277,24 @@ def transaction_create(request):
 @login_required
 def transaction_edit(request, pk):
     """Editare tranzacție"""
-    transaction = get_object_or_404(Transaction, pk=pk, user=request.user)
-    old_amount = transaction.amount
-    old_type = transaction.type
-    
     if request.method == 'POST':
-        form = TransactionForm(request.POST, instance=transaction)
-        if form.is_valid():
-            form.save()
+        with db_transaction.atomic():
+            # Blocăm rândul ca două editări simultane să nu aplice aceeași diferență
+            transaction = get_object_or_404(
+                Transaction.objects.select_for_update(), pk=pk, user=request.user
+            )
+            previous = ledger_entry(transaction)
             
-            # Actualizează soldul dacă s-a schimbat suma sau tipul
-            account = transaction.account
-            if old_type != transaction.type or old_amount != transaction.amount:
-                # Revert old transaction
-                if old_type == 'expense':
-                    account.balance += old_amount
-                else:
-                    account.balance -= old_amount
-                
-                # Apply new transaction
-                if transaction.type == 'expense':
-                    account.balance -= transaction.amount
-                else:
-                    account.balance += transaction.amount
+            form = TransactionForm(request.POST, instance=transaction)
+            form.fields['account'].queryset = request.user.accounts.all()
+            if form.is_valid():
+                form.save()
                 
-                account.save()
-            
-            return redirect('finance:transaction_list')
+                # Mută diferența pe sold (inclusiv la schimbarea contului)
+                move_transaction(previous, transaction)
+                return redirect('finance:transaction_list')
     else:
+        transaction = get_object_or_404(Transaction, pk=pk, user=request.user)
         form = TransactionForm(instance=transaction)
         form.fields['account'].queryset = request.user.accounts.all()
     
@@ -244,15 +308,8 @@ def transaction_delete(request, pk):
     transaction = get_object_or_404(Transaction, pk=pk, user=request.user)
     
     if request.method == 'POST':
-        # Revert transaction from account balance
-        account = transaction.account
-        if transaction.type == 'expense':
-            account.balance += transaction.amount
-        else:
-            account.balance -= transaction.amount
-        account.save()
-        
-        transaction.delete()
+        # Anulează efectul asupra soldului și șterge tranzacția atomic
+        remove_transaction(transaction)
         return redirect('finance:transaction_list')
     
     context = {'transaction': transaction}
@@ -262,20 +319,8 @@ def transaction_delete(request, pk):
 @login_required
 def budget_list(request):
     """Listă cu bugetele utilizatorului"""
-    budgets = request.user.budgets.all()
-    
-    # Calcul cheltuieli vs buget
-    for budget in budgets:
-        spent = request.user.transactions.filter(
-            category=budget.category,
-            type='expense',
-            date__year=budget.month.year,
-            date__month=budget.month.month
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        budget.spent = spent
-        budget.remaining = budget.amount - spent
-        budget.percentage = (spent / budget.amount * 100) if budget.amount > 0 else 0
+    # Calcul cheltuieli vs buget (o singură interogare pe rollup-ul lunar)
+    budgets = BudgetEvaluator.evaluate(request.user.budgets.all())
     
     context = {'budgets': budgets}
     return render(request, 'finance/budget_list.html', context)
@@ -368,44 +413,56 @@ def savings_delete(request, pk):
     return render(request, 'finance/confirm_delete.html', context)
 
 
+def _report(user, params):
+    """Raportul pentru parametrii din query string, sau (None, form) dacă sunt invalizi"""
+    form = ReportForm(params or None)
+    if form.is_bound and not form.is_valid():
+        return None, form
+    
+    data = form.cleaned_data if form.is_bound else {}
+    start, end = period_range(
+        data.get('period') or 'month',
+        data.get('date') or timezone.now().date(),
+        data.get('start_date'),
+        data.get('end_date'),
+    )
+    report = build_report(user, start, end, data.get('granularity') or None)
+    report['period'] = data.get('period') or 'month'
+    return report, form
+
+
 @login_required
 def reports(request):
-    """Rapoarte și analize"""
+    """Rapoarte și analize pe perioade arbitrare"""
     import json
     
-    user = request.user
-    today = timezone.now().date()
-    
-    # Cheltuieli și venituri pe categorii (luna curentă)
-    month_start = today.replace(day=1)
-    month_transactions = user.transactions.filter(date__gte=month_start)
-    
-    expense_by_category = {}
-    income_by_category = {}
-    
-    for category in Category.objects.all():
-        expenses = month_transactions.filter(
-            category=category,
-            type='expense'
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        income = month_transactions.filter(
-            category=category,
-            type='income'
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        if expenses > 0:
-            expense_by_category[category.name] = float(expenses)
-        if income > 0:
-            income_by_category[category.name] = float(income)
+    report, form = _report(request.user, request.GET)
+    if report is None:
+        # Parametri invalizi: afișăm erorile peste raportul lunii curente
+        report, _ = _report(request.user, {})
     
     context = {
-        'expense_by_category': json.dumps(expense_by_category),
-        'income_by_category': json.dumps(income_by_category),
+        'form': form if form.is_bound else ReportForm(initial={'period': 'month'}),
+        'report': report,
+        'report_json': json.dumps(report),
+        'expense_by_category': json.dumps(report['by_category']['expense']),
+        'income_by_category': json.dumps(report['by_category']['income']),
     }
     return render(request, 'finance/reports.html', context)
 
 
+@login_required
+@http_cached()
+def report_data(request):
+    """Raportul ca JSON gata de grafic (?layout=columns pentru serii pe coloane)"""
+    report, form = _report(request.user, request.GET)
+    if report is None:
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    
+    report['series'] = {type: layout(request, series) for type, series in report['series'].items()}
+    return compact_json_response({'success': True, **report})
+
+
 def bank_api_tokens_doc(request):
     """Afișează documentația pentru obținerea tokenurilor API bancare"""
     from django.conf import settings
@@ -115,16 +115,30 @@ AUTHENTICATION_BACKENDS = [
 
 WSGI_APPLICATION = 'moneymanager.wsgi.application'
 
+# Redis comun proceselor (web, daphne, run_sync_worker, run_sync_scheduler), opțional
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
 # OPTIONAL: Django Channels ASGI (install with: pip install channels daphne)
 try:
     from importlib import import_module
     import_module('daphne')
     ASGI_APPLICATION = 'moneymanager.asgi.application'
-    CHANNEL_LAYERS = {
-        'default': {
-            'BACKEND': 'channels.layers.InMemoryChannelLayer'
+    # run_sync_worker trimite progresul joburilor din alt proces decât daphne, deci ajunge
+    # în browser doar printr-un layer comun (Redis). InMemoryChannelLayer e privat fiecărui
+    # proces: fără REDIS_URL starea jobului se citește din /finance/api/bank-sync/jobs/<id>/
+    if REDIS_URL:
+        CHANNEL_LAYERS = {
+            'default': {
+                'BACKEND': 'channels_redis.core.RedisChannelLayer',
+                'CONFIG': {'hosts': [REDIS_URL]},
+            }
+        }
+    else:
+        CHANNEL_LAYERS = {
+            'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer'
+            }
         }
-    }
 except ImportError:
     # Daphne not installed, skip WebSocket support
     ASGI_APPLICATION = None
@@ -166,6 +180,94 @@ else:
     }
 
 
+# Cache
+# Implicit local-memory; în producție se poate seta ex: django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'moneymanager'),
+    }
+}
+
+# Starea circuit breaker-ului și a limitatorului de rată bancar trebuie să fie comună
+# proceselor (web, run_sync_worker, run_sync_scheduler), deci nu poate sta în locmem:
+# Redis dacă REDIS_URL e setat, altfel tabela de cache din DB (python manage.py createcachetable)
+if REDIS_URL:
+    CACHES['bank_limits'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    CACHES['bank_limits'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'finance_bank_limits_cache',
+    }
+BANK_API_LIMITS_CACHE_ALIAS = os.environ.get('BANK_API_LIMITS_CACHE_ALIAS', 'bank_limits')
+
+# Cache-ul pentru dashboard (alias din CACHES și durata în secunde)
+DASHBOARD_CACHE_ALIAS = os.environ.get('DASHBOARD_CACHE_ALIAS', 'default')
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '300'))
+
+
+# Sincronizare bancară: thread-uri în paralel, limite de concurență per bancă,
+# suprapunerea (zile) sincronizării incrementale față de cursorul fiecărui cont
+# și dimensiunea paginilor cerute de la API
+BANK_SYNC = {
+    'MAX_WORKERS': int(os.environ.get('BANK_SYNC_MAX_WORKERS', '8')),
+    'OVERLAP_DAYS': int(os.environ.get('BANK_SYNC_OVERLAP_DAYS', '3')),
+    'PAGE_SIZE': int(os.environ.get('BANK_SYNC_PAGE_SIZE', '500')),
+    # run_sync_scheduler: sincronizări simultane și limitele intervalului adaptiv (secunde)
+    'SCHEDULER': {
+        'MAX_CONCURRENT': int(os.environ.get('BANK_SYNC_SCHEDULER_CONCURRENCY', '4')),
+        'MIN_INTERVAL': 15 * 60,
+        'MAX_INTERVAL': 24 * 3600,
+        'JITTER': 0.1,
+    },
+    'DEFAULT_BANK_CONCURRENCY': 4,
+    'PER_BANK_CONCURRENCY': {
+        'bt': int(os.environ.get('BANK_SYNC_BT_CONCURRENCY', '4')),
+        'revolut': int(os.environ.get('BANK_SYNC_REVOLUT_CONCURRENCY', '4')),
+    },
+}
+
+# Protecția API-urilor bancare: circuit breaker (deschis după FAILURE_THRESHOLD eșecuri în
+# FAILURE_WINDOW secunde, probă după RECOVERY_TIMEOUT) și token bucket (RATE cereri/s,
+# rafală BURST) per bancă; starea e în cache-ul BANK_API_LIMITS_CACHE_ALIAS
+BANK_API_LIMITS = {
+    'default': {
+        'FAILURE_THRESHOLD': 5,
+        'FAILURE_WINDOW': 60,
+        'RECOVERY_TIMEOUT': 30,
+        'MAX_WAIT': 5.0,
+    },
+    'bt': {
+        'RATE': float(os.environ.get('BT_API_RATE', '5')),
+        'BURST': 10,
+    },
+    'revolut': {
+        'RATE': float(os.environ.get('REVOLUT_API_RATE', '10')),
+        'BURST': 20,
+    },
+}
+
+# Client HTTP pentru integrări: pool keep-alive, timeout-uri (secunde) și reîncercări
+# Cheile per serviciu ('bt', 'revolut', 'supabase', 'discord') suprascriu 'default'
+HTTP_CLIENT = {
+    'default': {
+        'POOL_CONNECTIONS': 10,
+        'POOL_MAXSIZE': int(os.environ.get('HTTP_CLIENT_POOL_MAXSIZE', '20')),
+        'CONNECT_TIMEOUT': 5,
+        'READ_TIMEOUT': 10,
+        'RETRIES': 3,
+        'BACKOFF_FACTOR': 0.5,
+        'BACKOFF_MAX': 30,
+        'BACKOFF_JITTER': 0.5,
+    },
+    'discord': {
+        'RETRIES': 2,
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 